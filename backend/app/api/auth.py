@@ -4,10 +4,12 @@ from pydantic import BaseModel, EmailStr
 from typing import Optional
 from datetime import datetime, timedelta
 from jose import JWTError, jwt
-from passlib.context import CryptContext
-from sqlalchemy.orm import Session
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
 from app import models
-from app.database import get_db
+from app.database import get_db, AsyncSessionLocal
+from app.user_cache import user_cache
+from app.passwords import password_hasher, HasherBusy
 
 # Configuration
 SECRET_KEY = "your-secret-key-change-in-production"  # TODO: Move to .env
@@ -16,8 +18,8 @@ ACCESS_TOKEN_EXPIRE_MINUTES = 480  # 8 hours
 
 router = APIRouter()
 
-# Password hashing
-pwd_context = CryptContext(schemes=["pbkdf2_sha256"], deprecated="auto")
+# Password hashing (rounds and pool size come from app.config)
+pwd_context = password_hasher.context
 
 # OAuth2 scheme
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
@@ -56,6 +58,35 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
 def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
+# Request handlers use the async versions below, which hash on the worker pool
+
+def _hasher_busy() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Too many logins in progress, please retry",
+        headers={"Retry-After": "1"},
+    )
+
+async def hash_password(password: str) -> str:
+    try:
+        return await password_hasher.hash(password)
+    except HasherBusy:
+        raise _hasher_busy()
+
+async def check_password(db: AsyncSession, user: models.User, password: str) -> bool:
+    """Verify a password, upgrading the stored hash if the work factor changed"""
+    # End the read transaction so the connection goes back to the pool while hashing
+    await db.commit()
+    try:
+        valid, new_hash = await password_hasher.verify_and_update(password, user.hashed_password)
+    except HasherBusy:
+        raise _hasher_busy()
+    if valid and new_hash:
+        user.hashed_password = new_hash
+        await db.commit()
+        user_cache.invalidate(user.username)
+    return valid
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     to_encode = data.copy()
     if expires_delta:
@@ -66,18 +97,22 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-def get_user_by_username(db: Session, username: str):
-    return db.query(models.User).filter(models.User.username == username).first()
+async def get_user_by_username(db: AsyncSession, username: str):
+    result = await db.execute(select(models.User).where(models.User.username == username))
+    return result.scalars().first()
 
-def authenticate_user(db: Session, username: str, password: str):
-    user = get_user_by_username(db, username)
+async def authenticate_user(db: AsyncSession, username: str, password: str):
+    user = await get_user_by_username(db, username)
     if not user:
         return False
-    if not verify_password(password, user.hashed_password):
+    if not await check_password(db, user, password):
         return False
     return user
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)):
+    return await get_user_from_token(db, token)
+
+async def get_user_from_token(db: AsyncSession, token: str):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -91,12 +126,31 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = De
         token_data = TokenData(username=username)
     except JWTError:
         raise credentials_exception
-    
-    user = get_user_by_username(db, username=token_data.username)
+
+    cached = user_cache.get(token_data.username)
+    if cached is not None:
+        # Attach to this request's session so handlers can still modify it
+        return await db.merge(cached, load=False)
+
+    user = await get_user_by_username(db, username=token_data.username)
     if user is None:
         raise credentials_exception
+    user_cache.put(token_data.username, user)
     return user
 
+async def authenticate_stream(token: Optional[str], authorization: Optional[str]) -> models.User:
+    """User for a Server-Sent Events request.
+
+    EventSource cannot set headers, so the token may come as `?token=`.
+    """
+    if authorization and authorization.lower().startswith("bearer "):
+        token = authorization[7:]
+    if not token:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Not authenticated")
+    # Short-lived session so an open stream does not hold a pooled connection
+    async with AsyncSessionLocal() as db:
+        return await get_user_from_token(db, token)
+
 async def get_current_active_user(current_user: models.User = Depends(get_current_user)):
     if not current_user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
@@ -116,19 +170,20 @@ def require_role(*allowed_roles):
 # --- API Endpoints ---
 
 @router.post("/auth/register", response_model=UserResponse)
-async def register(user: UserCreate, db: Session = Depends(get_db)):
+async def register(user: UserCreate, db: AsyncSession = Depends(get_db)):
     """Register a new user (admin only in production)"""
     # Check if username exists
-    if get_user_by_username(db, user.username):
+    if await get_user_by_username(db, user.username):
         raise HTTPException(status_code=400, detail="Username already registered")
     
     # Check if email exists
-    existing_email = db.query(models.User).filter(models.User.email == user.email).first()
+    result = await db.execute(select(models.User).where(models.User.email == user.email))
+    existing_email = result.scalars().first()
     if existing_email:
         raise HTTPException(status_code=400, detail="Email already registered")
     
     # Create new user
-    hashed_password = get_password_hash(user.password)
+    hashed_password = await hash_password(user.password)
     db_user = models.User(
         username=user.username,
         email=user.email,
@@ -136,8 +191,8 @@ async def register(user: UserCreate, db: Session = Depends(get_db)):
         role=user.role
     )
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
+    await db.refresh(db_user)
     return db_user
 
 class LoginRequest(BaseModel):
@@ -145,10 +200,10 @@ class LoginRequest(BaseModel):
     password: str
 
 @router.post("/auth/login-json", response_model=Token)
-async def login_json(credentials: LoginRequest, db: Session = Depends(get_db)):
+async def login_json(credentials: LoginRequest, db: AsyncSession = Depends(get_db)):
     """Login with JSON body (Workaround for form-data issues)"""
     print(f"DEBUG LOGIN: Check for {credentials.username}")
-    user = get_user_by_username(db, credentials.username)
+    user = await get_user_by_username(db, credentials.username)
     if not user:
         print("DEBUG LOGIN: User not found")
         raise HTTPException(
@@ -157,7 +212,7 @@ async def login_json(credentials: LoginRequest, db: Session = Depends(get_db)):
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    if not verify_password(credentials.password, user.hashed_password):
+    if not await check_password(db, user, credentials.password):
         print(f"DEBUG LOGIN: Password wrong for {credentials.username}")
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -177,10 +232,10 @@ async def login_json(credentials: LoginRequest, db: Session = Depends(get_db)):
     }
 
 @router.post("/auth/login", response_model=Token)
-async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
+async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_db)):
     """Login and get access token"""
     try:
-        user = authenticate_user(db, form_data.username, form_data.password)
+        user = await authenticate_user(db, form_data.username, form_data.password)
         if not user:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
@@ -211,11 +266,11 @@ async def get_me(current_user: models.User = Depends(get_current_active_user)):
 
 # Seed admin user if none exists
 @router.post("/auth/seed-admin")
-async def seed_admin(db: Session = Depends(get_db)):
+async def seed_admin(db: AsyncSession = Depends(get_db)):
     """Create default admin user if no users exist (for initial setup only)"""
     try:
         print("DEBUG: Checking user count...")
-        user_count = db.query(models.User).count()
+        user_count = await db.scalar(select(func.count()).select_from(models.User))
         if user_count > 0:
             raise HTTPException(status_code=400, detail="Users already exist. Cannot seed.")
         
@@ -223,12 +278,12 @@ async def seed_admin(db: Session = Depends(get_db)):
         admin_user = models.User(
             username="admin",
             email="admin@restaurant.local",
-            hashed_password=get_password_hash("admin123"),
+            hashed_password=await hash_password("admin123"),
             role="admin"
         )
         db.add(admin_user)
-        db.commit()
-        db.refresh(admin_user)
+        await db.commit()
+        await db.refresh(admin_user)
         print("DEBUG: Admin user created successfully")
         return {"message": "Admin user created", "username": "admin", "password": "admin123"}
     except Exception as e:
@@ -0,0 +1,90 @@
+from fastapi import APIRouter, Depends, HTTPException, Header, Query
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+from typing import List, Optional
+from datetime import datetime
+from sqlalchemy.ext.asyncio import AsyncSession
+from app import models, inventory_ledger, low_stock
+from app.database import get_db
+from app.api.auth import get_current_user, require_role, authenticate_stream
+from app.events import sse_events
+
+router = APIRouter(prefix="/inventory", tags=["inventory"])
+
+class StockAsOf(BaseModel):
+    product_id: int
+    as_of: datetime
+    quantity: int
+    # Snapshot the answer started from (None before the first compaction)
+    snapshot_as_of: Optional[datetime] = None
+
+class StockMismatch(BaseModel):
+    product_id: int
+    stock_quantity: int
+    ledger_quantity: int
+    difference: int
+
+class ConsistencyReport(BaseModel):
+    checked_at: datetime
+    consistent: bool
+    mismatches: List[StockMismatch]
+
+class LowStockAlert(BaseModel):
+    product_id: int
+    name: Optional[str]
+    stock_quantity: int
+    low_stock_threshold: int
+
+class LowStockAlerts(BaseModel):
+    count: int
+    # When this worker last re-read the full set
+    loaded_at: Optional[datetime]
+    items: List[LowStockAlert]
+
+def _alert_items() -> List[dict]:
+    return [item._asdict() for item in low_stock.low_stock.items()]
+
+@router.get("/alerts", response_model=LowStockAlerts)
+async def get_low_stock_alerts(current_user: models.User = Depends(get_current_user)):
+    """Products at or below their low-stock threshold, lowest first (answered from memory)"""
+    tracker = low_stock.low_stock
+    return {"count": len(tracker), "loaded_at": tracker.loaded_at, "items": _alert_items()}
+
+async def _alerts_snapshot():
+    return _alert_items()
+
+@router.get("/alerts/stream")
+async def stream_low_stock_alerts(
+    token: Optional[str] = Query(None),
+    authorization: Optional[str] = Header(None)
+):
+    """Server-Sent Events feed of low-stock alerts.
+
+    Sends one `snapshot` of the current low-stock list, then `low_stock`
+    when a product falls to its threshold and `restocked` when it recovers.
+    """
+    await authenticate_stream(token, authorization)
+    return StreamingResponse(
+        sse_events(low_stock.TOPIC, _alerts_snapshot),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@router.get("/{product_id}/stock", response_model=StockAsOf)
+async def get_stock_as_of(
+    product_id: int,
+    as_of: Optional[datetime] = None,
+    db: AsyncSession = Depends(get_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    """Stock of a product at `as_of` (naive UTC, default now)"""
+    result = await db.run_sync(inventory_ledger.stock_as_of, product_id, as_of or datetime.utcnow())
+    if result is None:
+        raise HTTPException(status_code=404, detail="Product not found")
+    return result
+
+@router.get("/consistency", response_model=ConsistencyReport, dependencies=[Depends(require_role("admin"))])
+async def check_consistency(db: AsyncSession = Depends(get_db)):
+    """Compare each product's stock with its latest snapshot plus later ledger rows"""
+    mismatches = await db.run_sync(inventory_ledger.check_consistency)
+    return {"checked_at": datetime.utcnow(), "consistent": not mismatches, "mismatches": mismatches}
@@ -1,11 +1,14 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Header, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional, Iterable, Union
 from pydantic import BaseModel
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
 from app import models
-from app.database import get_db
-from app.api.auth import get_current_user
+from app.database import get_db, AsyncSessionLocal
+from app.api.auth import get_current_user, authenticate_stream
+from app.events import hub, sse_events
 
 router = APIRouter(prefix="/kitchen", tags=["kitchen"])
 
@@ -16,34 +19,84 @@ class KitchenOrderStart(BaseModel):
     kitchen_status: str
     items_json: List[dict]
     created_at: datetime
+    updated_at: Optional[datetime] = None
     # We might want customer name or table number if available
     
     class Config:
         from_attributes = True
 
+class KitchenOrderChanges(BaseModel):
+    orders: List[KitchenOrderStart]  # new or changed, still open
+    removed: List[str]  # served since the cursor
+    cursor: Optional[datetime]  # pass back as ?since= on the next poll
+
+KITCHEN_TOPIC = "kitchen"
+
+# Only the columns the Kitchen Display needs (no payment data)
+KITCHEN_COLUMNS = (
+    models.Order.id,
+    models.Order.status,
+    models.Order.kitchen_status,
+    models.Order.items_json,
+    models.Order.created_at,
+    models.Order.updated_at,
+)
+# Re-read a short window behind the cursor so a write that committed late
+# is not skipped; clients apply changes idempotently by order id
+CURSOR_OVERLAP = timedelta(seconds=5)
+
 class StatusUpdate(BaseModel):
     status: str # pending, preparing, ready, served
 
-@router.get("/orders", response_model=List[KitchenOrderStart])
-def get_kitchen_orders(
-    db: Session = Depends(get_db),
+def open_orders_query():
+    return (
+        select(*KITCHEN_COLUMNS)
+        .where(models.open_kitchen_orders_filter())
+        .order_by(models.Order.created_at.asc())
+    )
+
+def changed_orders_query(since: datetime):
+    return (
+        select(*KITCHEN_COLUMNS)
+        .where(models.Order.updated_at > since - CURSOR_OVERLAP)
+        .order_by(models.Order.updated_at.asc())
+    )
+
+@router.get("/orders", response_model=Union[List[KitchenOrderStart], KitchenOrderChanges])
+async def get_kitchen_orders(
+    since: Optional[datetime] = None,
+    db: AsyncSession = Depends(get_db),
     current_user: models.User = Depends(get_current_user)
 ):
-    # Fetch orders that are NOT served
-    orders = db.query(models.Order).filter(
-        models.Order.kitchen_status.in_(["pending", "preparing", "ready"])
-    ).order_by(models.Order.created_at.asc()).all()
-    
-    return orders
+    """Open orders, or with `?since=<cursor>` only orders changed after it.
+
+    Rows are read as plain tuples from a slim projection; no ORM objects.
+    """
+    if since is None:
+        # Fetch orders that are NOT served
+        rows = await db.execute(open_orders_query())
+        return [dict(row._mapping) for row in rows]
+
+    if since.tzinfo is not None:
+        since = since.astimezone(timezone.utc).replace(tzinfo=None)
+    orders, removed = [], []
+    cursor = since
+    for row in await db.execute(changed_orders_query(since)):
+        if row.kitchen_status in models.OPEN_KITCHEN_STATUSES:
+            orders.append(dict(row._mapping))
+        else:
+            removed.append(row.id)
+        cursor = max(cursor, row.updated_at)
+    return {"orders": orders, "removed": removed, "cursor": cursor}
 
 @router.post("/orders/{order_id}/status")
-def update_kitchen_status(
+async def update_kitchen_status(
     order_id: str,
     status_update: StatusUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: models.User = Depends(get_current_user)
 ):
-    order = db.query(models.Order).filter(models.Order.id == order_id).first()
+    order = await db.get(models.Order, order_id)
     if not order:
         raise HTTPException(status_code=404, detail="Order not found")
         
@@ -53,6 +106,55 @@ def update_kitchen_status(
         raise HTTPException(status_code=400, detail="Invalid status")
         
     order.kitchen_status = status_update.status
-    db.commit()
+    await db.commit()
+
+    if order.kitchen_status not in models.OPEN_KITCHEN_STATUSES:
+        hub.publish(KITCHEN_TOPIC, "order_removed", {"id": order.id})
+    else:
+        hub.publish(KITCHEN_TOPIC, "status_changed", {"id": order.id, "kitchen_status": order.kitchen_status})
     
     return {"message": "Status updated", "new_status": order.kitchen_status}
+
+# --- Push feed ---
+
+def publish_new_orders(orders: Iterable):
+    """Announce freshly synced orders to connected Kitchen Displays"""
+    if not hub.subscriber_count(KITCHEN_TOPIC):
+        return
+    seen = set()
+    for order in orders:
+        if order.id in seen:
+            continue
+        seen.add(order.id)
+        payload = KitchenOrderStart(
+            id=order.id,
+            status=order.status,
+            kitchen_status="pending",
+            items_json=order.items,
+            created_at=order.created_at,
+        )
+        hub.publish(KITCHEN_TOPIC, "order_created", payload.model_dump(mode="json"))
+
+async def _snapshot():
+    # Short-lived session so an open stream does not hold a pooled connection
+    async with AsyncSessionLocal() as db:
+        rows = await db.execute(open_orders_query())
+        return [KitchenOrderStart(**row._mapping).model_dump(mode="json") for row in rows]
+
+@router.get("/stream")
+async def stream_kitchen_orders(
+    token: Optional[str] = Query(None),
+    authorization: Optional[str] = Header(None)
+):
+    """Server-Sent Events feed for the Kitchen Display.
+
+    Sends one `snapshot` of open orders, then `order_created`,
+    `status_changed` and `order_removed` events as they happen. EventSource
+    cannot set headers, so the token may also be passed as `?token=`.
+    """
+    await authenticate_stream(token, authorization)
+    return StreamingResponse(
+        sse_events(KITCHEN_TOPIC, _snapshot),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
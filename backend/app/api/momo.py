@@ -1,15 +1,16 @@
-from fastapi import APIRouter, HTTPException, BackgroundTasks
+import hmac
+from fastapi import APIRouter, HTTPException, Depends, Header
 from pydantic import BaseModel
 from typing import Optional
-import uuid
-import time
-import asyncio
+from sqlalchemy.ext.asyncio import AsyncSession
+from app import config, momo_payments
+from app.database import get_db
+from app.api.auth import require_role
 
 router = APIRouter(prefix="/momo", tags=["momo"])
 
-# In-memory store for mock transactions
-# In production, this would be in the database
-mock_transactions = {}
+# Longest a status request may wait for the payment to finish
+MAX_STATUS_WAIT_SECONDS = 30
 
 class PaymentRequest(BaseModel):
     items: list
@@ -24,45 +25,58 @@ class PaymentResponse(BaseModel):
 
 class PaymentStatus(BaseModel):
     transaction_id: str
-    status: str # 'PENDING', 'SUCCESS', 'FAILED'
-
-async def simulate_user_approval(transaction_id: str):
-    """Simulate the user approving the USSD prompt after a delay"""
-    await asyncio.sleep(5) # Wait 5 seconds
-    if transaction_id in mock_transactions:
-        mock_transactions[transaction_id]['status'] = 'SUCCESS'
-        print(f"Mock MoMo: Transaction {transaction_id} approved by user.")
+    status: str # 'PENDING', 'SUCCESS', 'FAILED', 'EXPIRED'
 
 @router.post("/request", response_model=PaymentResponse)
-async def request_payment(request: PaymentRequest, background_tasks: BackgroundTasks):
+async def request_payment(request: PaymentRequest, db: AsyncSession = Depends(get_db)):
     print(f"Mock MoMo: Request received for {request.phone} - GHS {request.total_amount}")
-    
-    transaction_id = str(uuid.uuid4())
-    
-    # Store initial pending state
-    mock_transactions[transaction_id] = {
-        'status': 'PENDING',
-        'amount': request.total_amount,
-        'phone': request.phone,
-        'provider': request.provider,
-        'created_at': time.time()
-    }
-    
-    # Schedule the mock approval
-    background_tasks.add_task(simulate_user_approval, transaction_id)
-    
+
+    transaction = await momo_payments.create_transaction(
+        db, request.total_amount, request.phone, request.provider
+    )
+
     return {
-        "transaction_id": transaction_id,
-        "status": "PENDING",
+        "transaction_id": transaction.id,
+        "status": transaction.status,
         "message": "Payment request sent. Please approve on your phone."
     }
 
-@router.get("/status/{transaction_id}")
-async def check_status(transaction_id: str):
-    if transaction_id not in mock_transactions:
+@router.get("/status/{transaction_id}", response_model=PaymentStatus)
+async def check_status(transaction_id: str, wait: int = 0, db: AsyncSession = Depends(get_db)):
+    """Payment status. With `wait` (seconds, long-poll), a pending payment
+    is answered as soon as it finishes instead of after the next poll."""
+    wait = min(max(wait, 0), MAX_STATUS_WAIT_SECONDS)
+    status = await momo_payments.wait_for_status(db, transaction_id, wait)
+    if status is None:
         raise HTTPException(status_code=404, detail="Transaction not found")
-        
+
     return {
         "transaction_id": transaction_id,
-        "status": mock_transactions[transaction_id]['status']
+        "status": status
     }
+
+def callback_authorized(adapter: str, token: Optional[str]) -> bool:
+    """Callbacks must carry MOMO_CALLBACK_SECRET. Without a secret configured,
+    only the simulator's own callbacks are accepted, and only while the
+    simulator is the active adapter; real providers are refused."""
+    if config.MOMO_CALLBACK_SECRET:
+        return token is not None and hmac.compare_digest(token, config.MOMO_CALLBACK_SECRET)
+    return adapter == momo_payments.SimulatorAdapter.name and config.MOMO_ADAPTER == adapter
+
+@router.post("/callback/{adapter}")
+async def provider_callback(adapter: str, payload: dict, x_callback_token: Optional[str] = Header(None)):
+    """Webhook the payment provider calls when the customer approves or declines"""
+    if not callback_authorized(adapter, x_callback_token):
+        raise HTTPException(status_code=401, detail="Invalid callback token")
+    try:
+        change = momo_payments.get_adapter(adapter).parse_callback(payload)
+        applied = await momo_payments.apply_update(change)
+    except (KeyError, ValueError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid callback: {e}")
+    # Acknowledge repeats too, so the provider stops retrying
+    return {"transaction_id": change.transaction_id, "applied": applied}
+
+@router.get("/state/stats", dependencies=[Depends(require_role("admin"))])
+async def state_stats():
+    """Size and approximate memory of this worker's cached payment statuses"""
+    return momo_payments.state.memory_report()
@@ -0,0 +1,39 @@
+from fastapi import APIRouter, Depends, HTTPException
+from pydantic import BaseModel
+from typing import List, Optional
+from datetime import datetime
+from sqlalchemy.ext.asyncio import AsyncSession
+from app import models, archive
+from app.database import get_db
+from app.api.auth import get_current_user
+
+router = APIRouter(prefix="/orders", tags=["orders"])
+
+class OrderDetail(BaseModel):
+    id: str
+    shift_id: Optional[int] = None
+    total_amount: Optional[float] = None
+    total_tax: Optional[float] = None
+    status: Optional[str] = None
+    payment_method: Optional[str] = None
+    amount_tendered: Optional[float] = None
+    change_due: Optional[float] = None
+    reference_number: Optional[str] = None
+    kitchen_status: Optional[str] = None
+    created_at: Optional[datetime] = None
+    items_json: Optional[List[dict]] = None
+    # True when the order was read from a monthly archive table
+    archived: bool = False
+
+@router.get("/{order_id}", response_model=OrderDetail)
+async def get_order(
+    order_id: str,
+    db: AsyncSession = Depends(get_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    """One order by ID, whether it is still in `orders` or already archived"""
+    found = await db.run_sync(archive.get_order, order_id)
+    if found is None:
+        raise HTTPException(status_code=404, detail="Order not found")
+    row, archived = found
+    return OrderDetail(**row, archived=archived)
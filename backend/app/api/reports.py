@@ -0,0 +1,241 @@
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+from typing import List, Optional
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app import exports, models, rollups, tax_audit
+from app.database import AsyncSessionLocal, get_db
+from app.api.auth import require_role
+from app.order_items import top_sellers_query
+from app.tax import split_tax
+
+router = APIRouter(prefix="/reports", tags=["reports"], dependencies=[Depends(require_role("admin"))])
+
+# Reports are served from the rollup tables, never by scanning orders
+MAX_REPORT_DAYS = 366
+DEFAULT_REPORT_DAYS = 7
+
+class SalesBucket(BaseModel):
+    start: datetime
+    order_count: int
+    gross_total: float
+    tax_total: float
+
+class PaymentMethodSales(BaseModel):
+    payment_method: str
+    order_count: int
+    gross_total: float
+
+class CategorySales(BaseModel):
+    category: str
+    quantity: int
+    net_sales: float
+    tax_total: float
+
+class TaxSummary(BaseModel):
+    gross_total: float
+    tax_total: float
+    net_total: float
+    nhil: float
+    getfund: float
+    covid: float
+    vat: float
+
+class TaxDiscrepancyResponse(BaseModel):
+    order_id: str
+    order_created_at: Optional[datetime]
+    expected_tax: float
+    reported_tax: Optional[float]
+    expected_total: float
+    reported_total: Optional[float]
+    detected_at: datetime
+
+class ProductSales(BaseModel):
+    product_id: int
+    name: Optional[str]
+    quantity: int
+
+def report_range(start: Optional[datetime], end: Optional[datetime]):
+    end = end or datetime.utcnow()
+    start = start or end - timedelta(days=DEFAULT_REPORT_DAYS)
+    if start >= end:
+        raise HTTPException(status_code=400, detail="start must be before end")
+    if end - start > timedelta(days=MAX_REPORT_DAYS):
+        raise HTTPException(status_code=400, detail=f"Range is limited to {MAX_REPORT_DAYS} days")
+    return start, end
+
+async def _hourly(db: AsyncSession, start: datetime, end: datetime):
+    # Partial hours at the edges are reported whole
+    return (await db.execute(rollups.sales_query(rollups.hour_bucket(start), end))).all()
+
+@router.get("/sales", response_model=List[SalesBucket])
+async def sales(
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    granularity: str = "day",
+    db: AsyncSession = Depends(get_db)
+):
+    if granularity not in ("hour", "day"):
+        raise HTTPException(status_code=400, detail="granularity must be 'hour' or 'day'")
+    start, end = report_range(start, end)
+    buckets = defaultdict(lambda: [0, 0.0, 0.0])
+    for row in await _hourly(db, start, end):
+        key = row.bucket_start if granularity == "hour" else row.bucket_start.replace(hour=0)
+        buckets[key][0] += row.order_count
+        buckets[key][1] += row.gross_total
+        buckets[key][2] += row.tax_total
+    return [
+        SalesBucket(start=key, order_count=v[0], gross_total=round(v[1], 2), tax_total=round(v[2], 2))
+        for key, v in sorted(buckets.items())
+    ]
+
+@router.get("/payment-methods", response_model=List[PaymentMethodSales])
+async def payment_methods(
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    db: AsyncSession = Depends(get_db)
+):
+    start, end = report_range(start, end)
+    totals = defaultdict(lambda: [0, 0.0])
+    for row in await _hourly(db, start, end):
+        totals[row.payment_method][0] += row.order_count
+        totals[row.payment_method][1] += row.gross_total
+    return sorted(
+        (PaymentMethodSales(payment_method=method, order_count=v[0], gross_total=round(v[1], 2))
+         for method, v in totals.items()),
+        key=lambda r: r.gross_total, reverse=True
+    )
+
+@router.get("/categories", response_model=List[CategorySales])
+async def categories(
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    db: AsyncSession = Depends(get_db)
+):
+    start, end = report_range(start, end)
+    # Category rollups are daily: a partial last day is reported whole, but
+    # an `end` at midnight stops before that day, like the other reports
+    if end.time() != time.min:
+        end += timedelta(days=1)
+    rows = (await db.execute(rollups.category_query(start, end))).all()
+    totals = defaultdict(lambda: [0, 0.0, 0.0])
+    for row in rows:
+        totals[row.category][0] += row.quantity
+        totals[row.category][1] += row.net_sales
+        totals[row.category][2] += row.tax_total
+    return sorted(
+        (CategorySales(category=category, quantity=v[0], net_sales=round(v[1], 2), tax_total=round(v[2], 2))
+         for category, v in totals.items()),
+        key=lambda r: r.net_sales, reverse=True
+    )
+
+@router.get("/tax", response_model=TaxSummary)
+async def tax_summary(
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    db: AsyncSession = Depends(get_db)
+):
+    start, end = report_range(start, end)
+    rows = await _hourly(db, start, end)
+    gross = sum(row.gross_total for row in rows)
+    tax = sum(row.tax_total for row in rows)
+    # Split the tax actually collected, so the components add up to tax_total
+    components = split_tax(tax)
+    return TaxSummary(
+        gross_total=round(gross, 2), tax_total=round(tax, 2), net_total=round(gross - tax, 2),
+        **{name: round(value, 2) for name, value in components.items()}
+    )
+
+@router.get("/tax-discrepancies", response_model=List[TaxDiscrepancyResponse])
+async def tax_discrepancies(
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    limit: int = 100,
+    db: AsyncSession = Depends(get_db)
+):
+    """Orders whose reported tax or total disagrees with the server's tax engine"""
+    start, end = report_range(start, end)
+    rows = (await db.execute(tax_audit.discrepancies_query(start, end, min(limit, 1000)))).all()
+    return [TaxDiscrepancyResponse(**row._mapping) for row in rows]
+
+@router.get("/top-products", response_model=List[ProductSales])
+async def top_products(
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    limit: int = 10,
+    db: AsyncSession = Depends(get_db)
+):
+    start, end = report_range(start, end)
+    rows = (await db.execute(top_sellers_query(start, end, min(limit, 100)))).all()
+    names = dict((await db.execute(
+        select(models.Product.id, models.Product.name)
+        .where(models.Product.id.in_([r.product_id for r in rows]))
+    )).all()) if rows else {}
+    return [ProductSales(product_id=r.product_id, name=names.get(r.product_id), quantity=r.quantity) for r in rows]
+
+# --- Accounting exports ---
+
+EXPORT_MEDIA_TYPES = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
+
+def _export_response(name: str, chunks, file_format: str, gzip: bool) -> StreamingResponse:
+    filename = f"{name}.{file_format}" + (".gz" if gzip else "")
+    return StreamingResponse(
+        chunks,
+        media_type="application/gzip" if gzip else EXPORT_MEDIA_TYPES[file_format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+def _check_export(format: str, start: Optional[datetime], end: Optional[datetime]):
+    if format not in exports.FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of {', '.join(exports.FORMATS)}")
+    if start is not None and end is not None and start >= end:
+        raise HTTPException(status_code=400, detail="start must be before end")
+
+@router.get("/export/orders")
+async def export_orders(
+    format: str = "csv",
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    shift_id: Optional[int] = None,
+    gzip: bool = False,
+):
+    """Stream orders, archived ones included, as CSV or NDJSON.
+
+    Unlike the reports above this reads the orders themselves, so the range
+    is not limited; the export is streamed in batches whatever its size.
+    """
+    _check_export(format, start, end)
+    async with AsyncSessionLocal() as db:
+        sources = await db.run_sync(exports.order_export_queries, start, end, shift_id)
+    chunks = exports.encode(exports.keyset_rows(sources), exports.ORDER_COLUMNS, format, gzip)
+    return _export_response("orders", chunks, format, gzip)
+
+@router.get("/export/inventory-logs")
+async def export_inventory_logs(
+    format: str = "csv",
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    shift_id: Optional[int] = None,
+    gzip: bool = False,
+):
+    """Stream inventory log entries as CSV or NDJSON.
+
+    Logs are not tied to a shift, so shift_id narrows the range to the
+    shift's start and end (or now, if it is still open).
+    """
+    _check_export(format, start, end)
+    if shift_id is not None:
+        async with AsyncSessionLocal() as db:
+            window = await db.run_sync(exports.shift_window, shift_id)
+        if window is None:
+            raise HTTPException(status_code=404, detail="Shift not found")
+        shift_start, shift_end = window
+        start = max(start, shift_start) if start else shift_start
+        if shift_end is not None:
+            end = min(end, shift_end) if end else shift_end
+    sources = [exports.inventory_log_export_query(start, end)]
+    chunks = exports.encode(exports.keyset_rows(sources), exports.INVENTORY_LOG_COLUMNS, format, gzip)
+    return _export_response("inventory_logs", chunks, format, gzip)
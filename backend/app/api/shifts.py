@@ -1,9 +1,10 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy import select, func, and_, or_, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel, validator
-from typing import Optional, List
+from typing import Iterable, Optional, List
 from datetime import datetime
-from app import models
+from app import archive, models
 from app.database import get_db
 from app.api.auth import get_current_user
 
@@ -31,23 +32,139 @@ class ShiftResponse(BaseModel):
     class Config:
         from_attributes = True
 
+class PaymentMethodTotal(BaseModel):
+    payment_method: str
+    order_count: int
+    total: float
+
+class ShiftReconciliation(BaseModel):
+    order_count: int
+    total_sales: float
+    opening_cash: float
+    cash_sales: float
+    cash_received: float
+    change_given: float
+    # opening_cash + cash_received - change_given
+    expected_cash: float
+    counted_cash: Optional[float]
+    # counted_cash - expected_cash (negative means the drawer is short)
+    difference: Optional[float]
+    by_payment_method: List[PaymentMethodTotal]
+
+class ShiftCloseResponse(ShiftResponse):
+    reconciliation: ShiftReconciliation
+
 # Wait, the correct way to computed field from ORM in Pydantic V2 is using @field_validator with mode='before' 
 # BUT getting the parent object is hard.
 # EASIER WAY: Flatten it in the API function.
 
 
+def active_shift_query(user_id: int):
+    return select(models.Shift).where(
+        models.Shift.user_id == user_id,
+        models.Shift.is_active == True
+    )
+
+CASH = "cash"
+
+def shift_totals_query(shift_id: int, archive_months: Iterable[str] = ()):
+    """Per payment method totals of a shift's orders, including those in `archive_months`"""
+    tables = [models.Order.__table__] + [archive.archive_table(month) for month in archive_months]
+    # Hot orders are served from ix_orders_shift_close_out without touching the orders table
+    orders = union_all(*(
+        select(t.c.payment_method, t.c.total_amount, t.c.amount_tendered, t.c.change_due)
+        .where(t.c.shift_id == shift_id, t.c.status != "void")
+        for t in tables
+    )).subquery()
+    return (
+        select(
+            orders.c.payment_method,
+            func.count().label("order_count"),
+            func.coalesce(func.sum(orders.c.total_amount), 0.0).label("total"),
+            func.coalesce(func.sum(func.coalesce(orders.c.amount_tendered, orders.c.total_amount)), 0.0).label("received"),
+            func.coalesce(func.sum(func.coalesce(orders.c.change_due, 0.0)), 0.0).label("change"),
+        )
+        .group_by(orders.c.payment_method)
+    )
+
+def shift_archive_months(archived: Iterable[str], shift: models.Shift) -> List[str]:
+    # Archives are split by month of created_at, so only the shift's months can hold its orders
+    low = archive.month_key(shift.start_time)
+    high = archive.month_key(shift.end_time or datetime.utcnow())
+    return [month for month in archived if low <= month <= high]
+
+async def reconcile_shift(db: AsyncSession, shift: models.Shift) -> ShiftReconciliation:
+    months = shift_archive_months(await db.run_sync(archive.archived_months), shift)
+    rows = (await db.execute(shift_totals_query(shift.id, months))).all()
+    cash = next((row for row in rows if row.payment_method == CASH), None)
+    cash_received = cash.received if cash else 0.0
+    change_given = cash.change if cash else 0.0
+    expected = (shift.opening_cash or 0.0) + cash_received - change_given
+    return ShiftReconciliation(
+        order_count=sum(row.order_count for row in rows),
+        total_sales=round(sum(row.total for row in rows), 2),
+        opening_cash=shift.opening_cash or 0.0,
+        cash_sales=round(cash.total if cash else 0.0, 2),
+        cash_received=round(cash_received, 2),
+        change_given=round(change_given, 2),
+        expected_cash=round(expected, 2),
+        counted_cash=shift.closing_cash,
+        difference=round(shift.closing_cash - expected, 2) if shift.closing_cash is not None else None,
+        by_payment_method=[
+            PaymentMethodTotal(payment_method=row.payment_method or "unknown", order_count=row.order_count, total=round(row.total, 2))
+            for row in rows
+        ],
+    )
+
+async def get_own_shift(db: AsyncSession, shift_id: int, current_user: models.User) -> models.Shift:
+    shift = await db.get(models.Shift, shift_id)
+    if not shift:
+        raise HTTPException(status_code=404, detail="Shift not found")
+    if shift.user_id != current_user.id and current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Not authorized to access this shift")
+    return shift
+
+MAX_HISTORY_PAGE = 100
+
+def shift_history_query(
+    limit: int,
+    before_time: Optional[datetime] = None,
+    before_id: Optional[int] = None,
+    user_id: Optional[int] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+):
+    # Username comes from the join, so a page is a single query
+    query = (
+        select(models.Shift, models.User.username)
+        .outerjoin(models.User, models.User.id == models.Shift.user_id)
+        .order_by(models.Shift.start_time.desc(), models.Shift.id.desc())
+        .limit(limit)
+    )
+    if user_id is not None:
+        query = query.where(models.Shift.user_id == user_id)
+    if start is not None:
+        query = query.where(models.Shift.start_time >= start)
+    if end is not None:
+        query = query.where(models.Shift.start_time < end)
+    if before_time is not None and before_id is not None:
+        query = query.where(or_(
+            models.Shift.start_time < before_time,
+            and_(models.Shift.start_time == before_time, models.Shift.id < before_id)
+        ))
+    elif before_time is not None:
+        query = query.where(models.Shift.start_time < before_time)
+    return query
+
 # Endpoints
 @router.post("/start", response_model=ShiftResponse)
-def start_shift(
+async def start_shift(
     shift: ShiftStart, 
-    db: Session = Depends(get_db), 
+    db: AsyncSession = Depends(get_db), 
     current_user: models.User = Depends(get_current_user)
 ):
     # Check if user already has an active shift
-    active_shift = db.query(models.Shift).filter(
-        models.Shift.user_id == current_user.id,
-        models.Shift.is_active == True
-    ).first()
+    active_shift = (await db.scalars(active_shift_query(current_user.id))).first()
     
     if active_shift:
         raise HTTPException(status_code=400, detail="You already have an active shift.")
@@ -59,23 +176,18 @@ def start_shift(
         is_active=True
     )
     db.add(new_shift)
-    db.commit()
-    db.refresh(new_shift)
+    await db.commit()
+    await db.refresh(new_shift)
     return new_shift
 
-@router.post("/{shift_id}/end", response_model=ShiftResponse)
-def end_shift(
+@router.post("/{shift_id}/end", response_model=ShiftCloseResponse)
+async def end_shift(
     shift_id: int, 
     shift_data: ShiftEnd,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: models.User = Depends(get_current_user)
 ):
-    shift = db.query(models.Shift).filter(models.Shift.id == shift_id).first()
-    if not shift:
-        raise HTTPException(status_code=404, detail="Shift not found")
-        
-    if shift.user_id != current_user.id and current_user.role != "admin":
-        raise HTTPException(status_code=403, detail="Not authorized to close this shift")
+    shift = await get_own_shift(db, shift_id, current_user)
         
     if not shift.is_active:
         raise HTTPException(status_code=400, detail="Shift is already closed")
@@ -85,44 +197,53 @@ def end_shift(
     shift.end_time = datetime.utcnow()
     shift.is_active = False
     
-    db.commit()
-    db.refresh(shift)
-    return shift
+    await db.commit()
+    await db.refresh(shift)
+    return ShiftCloseResponse(
+        **ShiftResponse.model_validate(shift).model_dump(),
+        reconciliation=await reconcile_shift(db, shift)
+    )
+
+@router.get("/{shift_id}/reconciliation", response_model=ShiftReconciliation)
+async def get_shift_reconciliation(
+    shift_id: int,
+    db: AsyncSession = Depends(get_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    # Recomputed on demand, so orders synced after close-out are included
+    shift = await get_own_shift(db, shift_id, current_user)
+    return await reconcile_shift(db, shift)
 
 @router.get("/active", response_model=Optional[ShiftResponse])
-def get_active_shift(
-    db: Session = Depends(get_db),
+async def get_active_shift(
+    db: AsyncSession = Depends(get_db),
     current_user: models.User = Depends(get_current_user)
 ):
-    shift = db.query(models.Shift).filter(
-        models.Shift.user_id == current_user.id,
-        models.Shift.is_active == True
-    ).first()
+    shift = (await db.scalars(active_shift_query(current_user.id))).first()
     return shift
 
 @router.get("/history", response_model=List[ShiftResponse])
-def get_shift_history(
+async def get_shift_history(
     limit: int = 20,
-    db: Session = Depends(get_db),
+    before_time: Optional[datetime] = None,
+    before_id: Optional[int] = None,
+    user_id: Optional[int] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    db: AsyncSession = Depends(get_db),
     current_user: models.User = Depends(get_current_user)
 ):
+    """Newest shifts first. Pass the last row's start_time and id as
+    before_time / before_id to fetch the next page."""
+    if before_id is not None and before_time is None:
+        raise HTTPException(status_code=400, detail="before_id requires before_time")
     # Admins see all, others see own
-    query = db.query(models.Shift)
     if current_user.role != "admin":
-        query = query.filter(models.Shift.user_id == current_user.id)
-        
-    shifts = query.order_by(models.Shift.start_time.desc()).limit(limit).all()
-    
-    # Manually populate username for response
-    # We can do this because we are returning a list of Pydantic models (implicitly)
-    # But to set a property on a SQLAlchemy model that isn't a column is tricky unless we convert to dict.
-    # Or strict Pydantic parsing.
-    
-    results = []
-    for shift in shifts:
-        shift_dict = shift.__dict__.copy()
-        if shift.user:
-            shift_dict['username'] = shift.user.username
-        results.append(shift_dict)
-        
-    return results
+        user_id = current_user.id
+    query = shift_history_query(
+        min(max(limit, 1), MAX_HISTORY_PAGE), before_time, before_id, user_id, start, end
+    )
+    return [
+        ShiftResponse(username=row.username, **ShiftResponse.model_validate(row.Shift).model_dump(exclude={"username"}))
+        for row in (await db.execute(query)).all()
+    ]
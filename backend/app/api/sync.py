@@ -1,11 +1,21 @@
-from fastapi import APIRouter, HTTPException, Depends
-from pydantic import BaseModel
-from typing import List, Optional, Any
-from datetime import datetime
+from fastapi import APIRouter, HTTPException, Depends, Header, Response, UploadFile, File
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, ValidationError, field_validator
+from typing import List, Optional, Any, Dict, Iterable, Set
+from datetime import datetime, timezone
+from collections import defaultdict
+from sqlalchemy import select, insert, update, delete, bindparam, and_, or_
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from app import models
-from app.database import get_db
+from sqlalchemy.ext.asyncio import AsyncSession
+from app import models, archive, catalog, catalog_io, rollups, tax_audit, low_stock
+from app.order_items import build_order_item_rows, item_product_id, item_quantity
+from app.tax import verify_order_taxes
+from app.database import get_db, AsyncSessionLocal
+from app.api.auth import get_current_user, require_role
+from app.api.kitchen import publish_new_orders
 import json
+import asyncio
 
 router = APIRouter()
 
@@ -28,79 +38,340 @@ class OrderSchema(BaseModel):
     amount_tendered: Optional[float] = None
     change_due: Optional[float] = None
     reference_number: Optional[str] = None
+    shift_id: Optional[int] = None
 
-@router.post("/sync/orders")
-async def sync_orders(orders: List[OrderSchema], db: Session = Depends(get_db)):
-    synced_count = 0
+    @field_validator("created_at")
+    @classmethod
+    def to_naive_utc(cls, value: datetime) -> datetime:
+        # Columns hold naive UTC; PostgreSQL drivers reject offset-aware values
+        if value.tzinfo is not None:
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        return value
+
+# SQLite caps bound parameters per statement, so large IN lists are chunked
+IN_CLAUSE_CHUNK = 500
+
+def _chunked(values: list, size: int = IN_CLAUSE_CHUNK):
+    for i in range(0, len(values), size):
+        yield values[i:i + size]
+
+def _existing_order_ids(db: Session, order_ids: List[str]) -> Set[str]:
+    existing = set()
+    for chunk in _chunked(order_ids):
+        rows = db.execute(select(models.Order.id).where(models.Order.id.in_(chunk)))
+        existing.update(row[0] for row in rows)
+    return existing
+
+def _load_product_categories(db: Session, product_ids: List[int]) -> Dict[int, Optional[str]]:
+    # Only existence and category are read; stock is never loaded into Python
+    categories = {}
+    for chunk in _chunked(product_ids):
+        rows = db.execute(select(models.Product.id, models.Product.category).where(models.Product.id.in_(chunk)))
+        categories.update(rows.all())
+    return categories
+
+_products = models.Product.__table__
+
+# Executed once per batch with one parameter set per product. The database
+# computes the new stock, so concurrent syncs never overwrite each other.
+_decrement_stock = (
+    update(_products)
+    .where(_products.c.id == bindparam("decrement_product_id"))
+    .values(
+        stock_quantity=_products.c.stock_quantity - bindparam("decrement_quantity"),
+        version=bindparam("decrement_version"),
+    )
+)
+
+def _assign_shifts(db: Session, orders: List[OrderSchema]) -> Dict[str, Optional[int]]:
+    """Shift each order belongs to.
+
+    The POS sends the shift that was open when the sale was rung up. Orders
+    without one (or with an unknown one) go to the latest shift that was
+    open at their created_at.
+    """
+    first = min(o.created_at for o in orders)
+    last = max(o.created_at for o in orders)
+    claimed = {o.shift_id for o in orders} - {None}
+    shifts = db.execute(
+        select(models.Shift.id, models.Shift.start_time, models.Shift.end_time)
+        .where(or_(
+            models.Shift.id.in_(claimed),
+            and_(
+                models.Shift.start_time <= last,
+                or_(models.Shift.end_time.is_(None), models.Shift.end_time >= first)
+            )
+        ))
+        .order_by(models.Shift.start_time.desc())
+    ).all()
+    known = {shift.id for shift in shifts}
+
+    assigned = {}
+    for order_data in orders:
+        if order_data.shift_id in known:
+            assigned[order_data.id] = order_data.shift_id
+            continue
+        assigned[order_data.id] = next((
+            shift.id for shift in shifts
+            if shift.start_time <= order_data.created_at
+            and (shift.end_time is None or order_data.created_at <= shift.end_time)
+        ), None)
+    return assigned
+
+def ingest_orders(db: Session, orders: List[OrderSchema], catalog_version: Optional[int] = None) -> List[str]:
+    """Set-based ingest of a batch of offline orders.
+
+    One IN query finds duplicates (plus a lookup in the archive for each
+    month that has one), one checks every referenced product, one
+    finds the shifts the orders fall in, stock decrements are summed per
+    product and applied as atomic UPDATEs, and the Order / OrderItem /
+    InventoryLog rows go in as bulk inserts; the reporting rollups are
+    updated in the same transaction. Reported totals are checked against
+    the server's tax engine and disagreeing orders are flagged, not
+    rejected. Returns the IDs actually inserted; does not commit.
+
+    Sold products get a new catalog version, reserved here only if stock
+    actually changed. Callers that ingest a batch in several savepoints
+    pass one `catalog_version`, reserved for the whole batch.
+    """
+    # Drop repeats inside the payload as well as orders already on the server
+    unique = {}
     for order_data in orders:
-        # Check if order exists
-        existing_order = db.query(models.Order).filter(models.Order.id == order_data.id).first()
-        if existing_order:
-            continue # Skip or update? Skip for now implies idempotency
-
-        new_order = models.Order(
-            id=order_data.id,
-            total_amount=order_data.total_amount,
-            total_tax=order_data.total_tax,
-            status=order_data.status,
-            payment_method=order_data.payment_method,
-            created_at=order_data.created_at,
-            items_json=order_data.items,
-            amount_tendered=order_data.amount_tendered,
-            change_due=order_data.change_due,
-            reference_number=order_data.reference_number
-        )
-        db.add(new_order)
-        
-        # Process Inventory for each item
+        unique.setdefault(order_data.id, order_data)
+    existing = _existing_order_ids(db, list(unique))
+    # Old orders resent by a terminal may already have moved to the archive
+    existing |= archive.archived_order_ids(
+        db, ((o.id, o.created_at) for order_id, o in unique.items() if order_id not in existing)
+    )
+    new_orders = [o for order_id, o in unique.items() if order_id not in existing]
+    if not new_orders:
+        return []
+
+    # Frontend items: {productId, name, price, quantity, ...}
+    product_ids = {item_product_id(item) for o in new_orders for item in o.items} - {None}
+    products = _load_product_categories(db, list(product_ids))
+    shifts = _assign_shifts(db, new_orders)
+
+    order_rows = []
+    item_rows = []
+    log_rows = []
+    decrements = defaultdict(int)
+    for order_data in new_orders:
+        order_rows.append({
+            "id": order_data.id,
+            "shift_id": shifts[order_data.id],
+            "total_amount": order_data.total_amount,
+            "total_tax": order_data.total_tax,
+            "status": order_data.status,
+            "payment_method": order_data.payment_method,
+            "created_at": order_data.created_at,
+            "items_json": order_data.items,
+            "amount_tendered": order_data.amount_tendered,
+            "change_due": order_data.change_due,
+            "reference_number": order_data.reference_number,
+        })
+        item_rows.extend(build_order_item_rows(
+            order_data.id, order_data.created_at, order_data.items, order_data.total_tax, products.keys()
+        ))
         for item in order_data.items:
-            # Frontend items: {id, name, price, quantity, ...}
-            product_id = item.get('id')
-            quantity = item.get('quantity', 1)
-            
-            if product_id:
-                product = db.query(models.Product).filter(models.Product.id == product_id).first()
-                if product:
-                    # Decrement stock (allow negative for offline sync consistency)
-                    product.stock_quantity -= quantity
-                    
-                    # Create Inventory Log
-                    log = models.InventoryLog(
-                        product_id=product.id,
-                        quantity_change=-quantity,
-                        reason="sale",
-                        timestamp=order_data.created_at
-                    )
-                    db.add(log)
-        
-        synced_count += 1
-    
+            product_id = item_product_id(item)
+            if product_id not in products:
+                continue
+            quantity = item_quantity(item)
+            decrements[product_id] += quantity
+            log_rows.append({
+                "product_id": product_id,
+                "quantity_change": -quantity,
+                "reason": "sale",
+                "timestamp": order_data.created_at,
+            })
+
+    db.execute(insert(models.Order), order_rows)
+    if item_rows:
+        db.execute(insert(models.OrderItem), item_rows)
+    if log_rows:
+        db.execute(insert(models.InventoryLog), log_rows)
+    delta = rollups.delta_for_orders(
+        new_orders, item_rows, products
+    )
+    if delta:
+        delta.apply(db)
+    mismatches = verify_order_taxes(
+        (o.id, o.items, o.total_amount, o.total_tax) for o in new_orders
+    )
+    if mismatches:
+        tax_audit.record_discrepancies(db, tax_audit.discrepancy_rows(
+            mismatches, {o.id: o.created_at for o in new_orders}
+        ))
+
+    # Decrement stock (allow negative for offline sync consistency)
+    decrements = {product_id: quantity for product_id, quantity in decrements.items() if quantity}
+    if decrements:
+        # catalog_state is a single row every stock change locks, so it is
+        # taken last, just before the caller commits
+        if catalog_version is None:
+            catalog_version = catalog.bump_catalog_version(db)
+        db.execute(_decrement_stock, [
+            {"decrement_product_id": product_id, "decrement_quantity": quantity, "decrement_version": catalog_version}
+            # Fixed order, so concurrent syncs lock product rows in the same sequence
+            for product_id, quantity in sorted(decrements.items())
+        ])
+
+    return [o.id for o in new_orders]
+
+def _touched_products(orders: Iterable[OrderSchema]) -> Set[int]:
+    return {item_product_id(item) for o in orders for item in o.items} - {None}
+
+@router.post("/sync/orders")
+async def sync_orders(orders: List[OrderSchema], db: AsyncSession = Depends(get_db)):
     try:
-        db.commit()
+        accepted = set(await db.run_sync(ingest_orders, orders))
+        await db.commit()
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
 
+    synced_count = len(accepted)
+    publish_new_orders(o for o in orders if o.id in accepted)
+    # Only the products this batch sold are re-checked against their threshold
+    await low_stock.refresh(db, _touched_products(o for o in orders if o.id in accepted))
+
     return {"status": "success", "synced_count": synced_count}
 
-@router.get("/sync/products")
-async def get_products(db: Session = Depends(get_db)):
-    products = db.query(models.Product).all()
-    
-    # If no products in DB, seed with defaults
-    if not products:
-        defaults = [
-            models.Product(name="Jollof Rice", price=45.00, category="Main", tax_group="VAT_standard", stock_quantity=50),
-            models.Product(name="Fried Rice", price=40.00, category="Main", tax_group="VAT_standard", stock_quantity=50),
-            models.Product(name="Grilled Tilapia", price=75.00, category="Main", tax_group="VAT_standard", stock_quantity=20),
-            models.Product(name="Kelewele", price=20.00, category="Side", tax_group="VAT_standard", stock_quantity=100)
-        ]
-        for p in defaults:
-            db.add(p)
+# Chunked, resumable sync
+DEFAULT_SYNC_CHUNK = 100
+MAX_SYNC_CHUNK = 1000
+
+class OrderSyncResult(BaseModel):
+    id: Optional[str] = None
+    status: str  # accepted, duplicate, rejected
+    error: Optional[str] = None
+
+class ChunkedSyncResponse(BaseModel):
+    results: List[OrderSyncResult]
+    accepted: int
+    duplicates: int
+    rejected: int
+    # Index of the first order the client must resend (== len(payload) when done)
+    cursor: int
+    complete: bool
+
+def _ingest_chunk(db: Session, chunk: List[OrderSchema]) -> Dict[str, OrderSyncResult]:
+    """Ingest one chunk; if the bulk path fails, isolate the bad orders."""
+    try:
+        accepted = set(ingest_orders(db, chunk))
         db.commit()
-        products = db.query(models.Product).all()
-        
-    return products
+        return {
+            o.id: OrderSyncResult(id=o.id, status="accepted" if o.id in accepted else "duplicate")
+            for o in chunk
+        }
+    except Exception:
+        db.rollback()
+
+    # One catalog version for the whole chunk, not one per order
+    version = catalog.bump_catalog_version(db) if _touched_products(chunk) else None
+    outcome = {}
+    for order_data in chunk:
+        try:
+            with db.begin_nested():
+                accepted = ingest_orders(db, [order_data], version)
+            status = "accepted" if accepted else "duplicate"
+            outcome[order_data.id] = OrderSyncResult(id=order_data.id, status=status)
+        except Exception as e:
+            outcome[order_data.id] = OrderSyncResult(id=order_data.id, status="rejected", error=str(e))
+    db.commit()
+    return outcome
+
+@router.post("/sync/orders/chunked", response_model=ChunkedSyncResponse)
+async def sync_orders_chunked(
+    orders: List[dict],
+    chunk_size: int = DEFAULT_SYNC_CHUNK,
+    db: AsyncSession = Depends(get_db)
+):
+    """Sync orders in fixed-size chunks, committing each chunk separately.
+
+    Every order gets its own accepted/duplicate/rejected result. If a chunk
+    cannot be committed the response stops there and `cursor` tells the
+    terminal where to resume, so acknowledged orders are never resent.
+    """
+    chunk_size = max(1, min(chunk_size, MAX_SYNC_CHUNK))
+    results: List[OrderSyncResult] = []
+    cursor = 0
+
+    for start in range(0, len(orders), chunk_size):
+        raw_chunk = orders[start:start + chunk_size]
+
+        # Validate per order so one malformed row does not fail the request
+        chunk_results: List[Optional[OrderSyncResult]] = []
+        valid = []
+        for raw in raw_chunk:
+            try:
+                order_data = OrderSchema.model_validate(raw)
+            except ValidationError as e:
+                chunk_results.append(OrderSyncResult(
+                    id=raw.get("id") if isinstance(raw, dict) else None,
+                    status="rejected",
+                    error=str(e.errors()[0].get("msg", "invalid order"))
+                ))
+                continue
+            chunk_results.append(None)
+            valid.append(order_data)
+
+        try:
+            outcome = await db.run_sync(_ingest_chunk, valid)
+        except Exception:
+            await db.rollback()
+            break
+
+        accepted = [o for o in valid if outcome[o.id].status == "accepted"]
+        publish_new_orders(accepted)
+        await low_stock.refresh(db, _touched_products(accepted))
+        it = iter(valid)
+        results.extend(r if r is not None else outcome[next(it).id] for r in chunk_results)
+        cursor = start + len(raw_chunk)
+
+    return {
+        "results": results,
+        "accepted": sum(1 for r in results if r.status == "accepted"),
+        "duplicates": sum(1 for r in results if r.status == "duplicate"),
+        "rejected": sum(1 for r in results if r.status == "rejected"),
+        "cursor": cursor,
+        "complete": cursor == len(orders),
+    }
+
+@router.get("/sync/products")
+async def get_products(
+    response: Response,
+    since: Optional[int] = None,
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_db)
+):
+    """Full catalog, or with `?since=<version>` only what changed after it.
+
+    The ETag carries the catalog version, so an unchanged catalog costs a 304.
+    """
+    version = await db.run_sync(catalog.get_catalog_version)
+    etag = f'"catalog-{version}"'
+    if if_none_match == etag:
+        return Response(status_code=304, headers={"ETag": etag, "X-Catalog-Version": str(version)})
+    response.headers["ETag"] = etag
+    response.headers["X-Catalog-Version"] = str(version)
+
+    if since is None:
+        return (await db.scalars(select(models.Product))).all()
+
+    # A cursor from the future means the terminal saw another database; resend everything
+    if since > version:
+        products = (await db.scalars(select(models.Product))).all()
+        return {"version": version, "full": True, "products": products, "deleted": []}
+
+    changed = (await db.scalars(
+        select(models.Product).where(models.Product.version > since)
+    )).all()
+    deleted = (await db.scalars(
+        select(models.ProductTombstone.product_id).where(models.ProductTombstone.version > since)
+    )).all()
+    return {"version": version, "full": False, "products": changed, "deleted": list(deleted)}
 
 # Product CRUD Endpoints
 class ProductSchema(BaseModel):
@@ -114,7 +385,7 @@ class ProductSchema(BaseModel):
     unit: str = "item"
 
 @router.post("/products")
-async def create_product(product: ProductSchema, db: Session = Depends(get_db)):
+async def create_product(product: ProductSchema, db: AsyncSession = Depends(get_db)):
     new_product = models.Product(
         name=product.name,
         price=product.price,
@@ -125,13 +396,16 @@ async def create_product(product: ProductSchema, db: Session = Depends(get_db)):
         unit=product.unit
     )
     db.add(new_product)
-    db.commit()
-    db.refresh(new_product)
+    await db.flush()
+    await db.run_sync(catalog.mark_product_changed, new_product)
+    await db.commit()
+    await db.refresh(new_product)
+    await low_stock.refresh(db, [new_product.id])
     return new_product
 
 @router.put("/products/{product_id}")
-async def update_product(product_id: int, product: ProductSchema, db: Session = Depends(get_db)):
-    existing = db.query(models.Product).filter(models.Product.id == product_id).first()
+async def update_product(product_id: int, product: ProductSchema, db: AsyncSession = Depends(get_db)):
+    existing = await db.get(models.Product, product_id)
     if not existing:
         raise HTTPException(status_code=404, detail="Product not found")
     
@@ -139,21 +413,121 @@ async def update_product(product_id: int, product: ProductSchema, db: Session =
     existing.price = product.price
     existing.category = product.category
     existing.tax_group = product.tax_group
-    # Update stock fields
-    existing.stock_quantity = product.stock_quantity
+    # Update stock fields. The change is applied as a delta and recorded in the
+    # ledger, so sales synced meanwhile are kept and snapshots stay consistent.
+    adjustment = product.stock_quantity - existing.stock_quantity
+    if adjustment:
+        existing.stock_quantity = models.Product.stock_quantity + adjustment
+        db.add(models.InventoryLog(product_id=product_id, quantity_change=adjustment, reason="adjustment"))
     existing.low_stock_threshold = product.low_stock_threshold
     existing.unit = product.unit
+    await db.run_sync(catalog.mark_product_changed, existing)
     
-    db.commit()
-    db.refresh(existing)
+    await db.commit()
+    await db.refresh(existing)
+    await low_stock.refresh(db, [product_id])
     return existing
 
 @router.delete("/products/{product_id}")
-async def delete_product(product_id: int, db: Session = Depends(get_db)):
-    existing = db.query(models.Product).filter(models.Product.id == product_id).first()
+async def delete_product(product_id: int, db: AsyncSession = Depends(get_db)):
+    existing = await db.get(models.Product, product_id)
     if not existing:
         raise HTTPException(status_code=404, detail="Product not found")
     
-    db.delete(existing)
-    db.commit()
+    await db.delete(existing)
+    await db.execute(delete(models.InventorySnapshot).where(models.InventorySnapshot.product_id == product_id))
+    await db.run_sync(catalog.mark_product_deleted, product_id)
+    try:
+        await db.commit()
+    except IntegrityError:
+        # Backends that enforce foreign keys refuse to orphan inventory history
+        await db.rollback()
+        raise HTTPException(status_code=409, detail="Product has sales or inventory history")
+    await low_stock.refresh(db, [product_id])
     return {"status": "deleted", "id": product_id}
+
+# Bulk catalog import/export
+class ImportRowError(BaseModel):
+    row: int  # Data row number in the upload (1 = first row after any header)
+    error: str
+
+class ProductImportReport(BaseModel):
+    dry_run: bool
+    rows: int
+    created: int
+    updated: int
+    failed: int
+    batches: int
+    # Catalog version of the last saved batch (None for dry runs)
+    catalog_version: Optional[int]
+    errors: List[ImportRowError]
+    errors_truncated: bool
+
+@router.post("/products/import", response_model=ProductImportReport, dependencies=[Depends(require_role("admin"))])
+async def import_products(
+    file: UploadFile = File(...),
+    format: Optional[str] = None,
+    dry_run: bool = False,
+    batch_size: int = catalog_io.IMPORT_BATCH_SIZE,
+    db: AsyncSession = Depends(get_db)
+):
+    """Create or update products from a CSV or NDJSON upload.
+
+    Columns match /products/export. Rows with an `id` update that product;
+    rows without one update the product with the same name or create it.
+    Empty cells leave a field unchanged. Each batch of `batch_size` rows is
+    one transaction and one catalog version. With `dry_run` nothing is kept,
+    but every row is validated and reported as if it were.
+    """
+    file_format = catalog_io.detect_format(format, file.filename, file.content_type)
+    if file_format is None:
+        raise HTTPException(status_code=400, detail=f"format must be one of {', '.join(catalog_io.FORMATS)}")
+    batch_size = max(1, min(batch_size, catalog_io.MAX_IMPORT_BATCH_SIZE))
+    # The upload is spooled by the server. Reading, decoding and validating
+    # a batch blocks, so it runs in a worker thread; only the writes use the session.
+    report = catalog_io.ImportReport(dry_run)
+    rows = catalog_io.read_rows(file.file, file_format)
+    while batch := await asyncio.to_thread(catalog_io.next_batch, rows, report, batch_size):
+        await db.run_sync(catalog_io.save_batch, report, batch)
+    if not dry_run and (report.created or report.updated):
+        await db.run_sync(low_stock.reload)
+    return report.as_dict()
+
+EXPORT_MEDIA_TYPES = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
+
+async def _export_chunks(file_format: str):
+    after_id = None
+    first = True
+    while True:
+        # A short session per batch, so a slow download never holds a connection
+        async with AsyncSessionLocal() as db:
+            rows = await db.run_sync(catalog_io.export_batch, after_id)
+        if rows or first:
+            yield catalog_io.format_rows(rows, file_format, header=first)
+        if not rows:
+            return
+        first = False
+        after_id = rows[-1][0]
+
+@router.get("/products/export")
+async def export_products(
+    format: str = "csv",
+    current_user: models.User = Depends(get_current_user)
+):
+    """Stream the whole catalog as CSV or NDJSON.
+
+    X-Catalog-Version is the version when the export started; products
+    changed while it ran are picked up by /sync/products?since=<version>.
+    """
+    if format not in catalog_io.FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of {', '.join(catalog_io.FORMATS)}")
+    async with AsyncSessionLocal() as db:
+        version = await db.run_sync(catalog.get_catalog_version)
+    return StreamingResponse(
+        _export_chunks(format),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={
+            "Content-Disposition": f'attachment; filename="products.{format}"',
+            "X-Catalog-Version": str(version),
+        },
+    )
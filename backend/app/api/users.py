@@ -1,10 +1,12 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel, EmailStr
 from typing import List, Optional
 from app import models
 from app.database import get_db
-from app.api.auth import get_current_user, get_password_hash
+from app.api.auth import get_current_user, hash_password, check_password
+from app.user_cache import user_cache
 
 router = APIRouter(prefix="/users", tags=["users"])
 
@@ -38,26 +40,26 @@ def check_admin(user: models.User):
         raise HTTPException(status_code=403, detail="Not authorized. Admin access required.")
 
 @router.get("/", response_model=List[UserResponse])
-def get_users(
-    db: Session = Depends(get_db), 
+async def get_users(
+    db: AsyncSession = Depends(get_db), 
     current_user: models.User = Depends(get_current_user)
 ):
     check_admin(current_user)
-    return db.query(models.User).all()
+    return (await db.scalars(select(models.User))).all()
 
 @router.post("/", response_model=UserResponse)
-def create_user(
+async def create_user(
     user: UserCreate, 
-    db: Session = Depends(get_db), 
+    db: AsyncSession = Depends(get_db), 
     current_user: models.User = Depends(get_current_user)
 ):
     check_admin(current_user)
     
-    existing = db.query(models.User).filter(models.User.username == user.username).first()
+    existing = (await db.scalars(select(models.User).where(models.User.username == user.username))).first()
     if existing:
         raise HTTPException(status_code=400, detail="Username already registered")
         
-    hashed_password = get_password_hash(user.password)
+    hashed_password = await hash_password(user.password)
     
     new_user = models.User(
         username=user.username,
@@ -67,8 +69,8 @@ def create_user(
         is_active=True
     )
     db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    await db.commit()
+    await db.refresh(new_user)
     return new_user
 
 class PasswordChange(BaseModel):
@@ -76,34 +78,70 @@ class PasswordChange(BaseModel):
     new_password: str
 
 @router.put("/password")
-def change_password(
+async def change_password(
     pwd_data: PasswordChange,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: models.User = Depends(get_current_user)
 ):
-    from app.api.auth import verify_password
-    if not verify_password(pwd_data.old_password, current_user.hashed_password):
+    if not await check_password(db, current_user, pwd_data.old_password):
         raise HTTPException(status_code=400, detail="Incorrect old password")
     
-    current_user.hashed_password = get_password_hash(pwd_data.new_password)
-    db.commit()
+    current_user.hashed_password = await hash_password(pwd_data.new_password)
+    await db.commit()
+    user_cache.invalidate(current_user.username)
     return {"message": "Password updated successfully"}
 
+@router.get("/cache/stats")
+async def get_user_cache_stats(current_user: models.User = Depends(get_current_user)):
+    check_admin(current_user)
+    return user_cache.stats()
+
+@router.put("/{user_id}", response_model=UserResponse)
+async def update_user(
+    user_id: int,
+    user_data: UserUpdate,
+    db: AsyncSession = Depends(get_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    check_admin(current_user)
+
+    user = await db.get(models.User, user_id)
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    old_username = user.username
+    changes = user_data.model_dump(exclude_unset=True)
+    if "username" in changes and changes["username"] != old_username:
+        taken = (await db.scalars(select(models.User).where(models.User.username == changes["username"]))).first()
+        if taken:
+            raise HTTPException(status_code=400, detail="Username already registered")
+    if "password" in changes:
+        user.hashed_password = await hash_password(changes.pop("password"))
+    for field, value in changes.items():
+        setattr(user, field, value)
+
+    await db.commit()
+    await db.refresh(user)
+    user_cache.invalidate(old_username, user.username)
+    return user
+
 @router.delete("/{user_id}")
-def delete_user(
+async def delete_user(
     user_id: int, 
-    db: Session = Depends(get_db), 
+    db: AsyncSession = Depends(get_db), 
     current_user: models.User = Depends(get_current_user)
 ):
     check_admin(current_user)
     
-    user_to_delete = db.query(models.User).filter(models.User.id == user_id).first()
+    user_to_delete = await db.get(models.User, user_id)
     if not user_to_delete:
         raise HTTPException(status_code=404, detail="User not found")
         
     if user_to_delete.id == current_user.id:
         raise HTTPException(status_code=400, detail="Cannot delete yourself")
     
-    db.delete(user_to_delete)
-    db.commit()
+    username = user_to_delete.username
+    await db.delete(user_to_delete)
+    await db.commit()
+    user_cache.invalidate(username)
     return {"message": "User deleted"}
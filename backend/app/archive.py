@@ -0,0 +1,186 @@
+"""Hot/cold split of the orders table.
+
+Served orders older than ARCHIVE_AFTER_DAYS move to one table per month of
+their created_at (orders_archive_YYYY_MM, listed in order_archives), so
+`orders` only holds recent and open orders and its indexes stay small.
+Each batch is copied and deleted in one transaction, so an order is
+always in exactly one table.
+
+Order items stay in order_items (the reporting table, read by time range).
+Reads by ID go through get_order, which falls back to the archives.
+Because an order's month is fixed by its created_at, sync can still check
+a resent order for duplicates with a single primary-key lookup.
+"""
+import time
+import asyncio
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+from sqlalchemy import Column, Index, MetaData, Table, select, insert, delete, update, union_all
+from sqlalchemy.engine import Engine
+from app import config, models
+
+ARCHIVE_PREFIX = "orders_archive_"
+# SQLite caps bound parameters per statement
+_CHUNK = 500
+
+_orders = models.Order.__table__
+_archive_metadata = MetaData()
+
+def month_key(moment: datetime) -> str:
+    return f"{moment.year:04d}_{moment.month:02d}"
+
+def archive_table(month: str) -> Table:
+    """Table holding the archived orders created in `month` (YYYY_MM)"""
+    name = ARCHIVE_PREFIX + month
+    table = _archive_metadata.tables.get(name)
+    if table is None:
+        # Same columns as orders; no foreign keys, so users and shifts can still be removed
+        table = Table(name, _archive_metadata, *(
+            Column(c.name, c.type, primary_key=c.primary_key, nullable=c.nullable)
+            for c in _orders.columns
+        ))
+        # Time-ordered reads (exports) walk this instead of sorting the month
+        Index(f"ix_{name}_created_at", table.c.created_at)
+    return table
+
+def archived_months(conn) -> List[str]:
+    """Months that have an archive table, newest first (conn may be a Session or Connection)"""
+    return list(conn.execute(
+        select(models.OrderArchive.month).order_by(models.OrderArchive.month.desc())
+    ).scalars())
+
+def order_tables(conn) -> List[Table]:
+    """orders followed by every archive table, for jobs that must see all history"""
+    return [_orders] + [archive_table(month) for month in archived_months(conn)]
+
+def archive_horizon(now: Optional[datetime] = None, days: int = None) -> datetime:
+    days = config.ARCHIVE_AFTER_DAYS if days is None else days
+    return (now or datetime.utcnow()) - timedelta(days=days)
+
+# --- Reads ---
+
+def archived_order_ids(conn, orders: Iterable[Tuple[str, datetime]]) -> Set[str]:
+    """Which of these (id, created_at) pairs are already archived.
+
+    The month of created_at names the one table an order can be in, so
+    each order costs one primary-key probe, and only when that month has
+    an archive. No age cutoff applies: archive_orders.py and other workers
+    may archive with a different horizon than this worker's config.
+    """
+    by_month: Dict[str, List[str]] = {}
+    for order_id, created_at in orders:
+        if created_at is not None:
+            by_month.setdefault(month_key(created_at), []).append(order_id)
+    if not by_month:
+        return set()
+
+    found = set()
+    for month in set(by_month) & set(archived_months(conn)):
+        table = archive_table(month)
+        ids = by_month[month]
+        for start in range(0, len(ids), _CHUNK):
+            found.update(conn.execute(
+                select(table.c.id).where(table.c.id.in_(ids[start:start + _CHUNK]))
+            ).scalars())
+    return found
+
+def get_order(conn, order_id: str) -> Optional[Tuple[dict, bool]]:
+    """Order columns by ID from the hot table, else from the archives: (row, archived)"""
+    row = conn.execute(select(_orders).where(_orders.c.id == order_id)).mappings().first()
+    if row is not None:
+        return dict(row), False
+    months = archived_months(conn)
+    if not months:
+        return None
+    # One statement probing each archive's primary key
+    lookup = union_all(*(
+        select(archive_table(month)).where(archive_table(month).c.id == order_id)
+        for month in months
+    ))
+    row = conn.execute(lookup).mappings().first()
+    return (dict(row), True) if row is not None else None
+
+# --- Archival ---
+
+def _ensure_archive(conn, month: str) -> Table:
+    table = archive_table(month)
+    table.create(bind=conn, checkfirst=True)
+    exists = conn.execute(
+        select(models.OrderArchive.month).where(models.OrderArchive.month == month)
+    ).first()
+    if exists is None:
+        conn.execute(insert(models.OrderArchive).values(month=month, table_name=table.name, order_count=0))
+    return table
+
+def archive_candidates_query(horizon: datetime, limit: int):
+    # Oldest first along ix_orders_created_at
+    return (
+        select(_orders.c.id, _orders.c.created_at)
+        .where(_orders.c.created_at < horizon, _orders.c.kitchen_status == "served")
+        .order_by(_orders.c.created_at)
+        .limit(limit)
+    )
+
+def _archive_batch(conn, horizon: datetime, batch_size: int) -> int:
+    candidates = conn.execute(archive_candidates_query(horizon, batch_size)).all()
+    by_month: Dict[str, List[str]] = {}
+    for order_id, created_at in candidates:
+        by_month.setdefault(month_key(created_at), []).append(order_id)
+
+    for month, ids in by_month.items():
+        table = _ensure_archive(conn, month)
+        conn.execute(insert(table).from_select(
+            [c.name for c in _orders.columns],
+            select(*_orders.columns).where(_orders.c.id.in_(ids))
+        ))
+        conn.execute(delete(_orders).where(_orders.c.id.in_(ids)))
+        conn.execute(
+            update(models.OrderArchive)
+            .where(models.OrderArchive.month == month)
+            .values(order_count=models.OrderArchive.order_count + len(ids), updated_at=datetime.utcnow())
+        )
+    return len(candidates)
+
+def archive_orders(
+    engine: Engine,
+    now: Optional[datetime] = None,
+    older_than_days: int = None,
+    batch_size: int = None,
+    max_rows_per_second: int = None,
+    log: Callable[[str], None] = print,
+) -> int:
+    """Move served orders older than the horizon into monthly archives.
+
+    Runs in short transactions of `batch_size` orders, sleeping between them
+    so no more than `max_rows_per_second` orders move per second. Returns the
+    number of orders archived.
+    """
+    older_than_days = config.ARCHIVE_AFTER_DAYS if older_than_days is None else older_than_days
+    batch_size = batch_size or config.ARCHIVE_BATCH_SIZE
+    max_rows_per_second = max_rows_per_second or config.ARCHIVE_MAX_ROWS_PER_SECOND
+    if not older_than_days:
+        return 0
+    horizon = archive_horizon(now, older_than_days)
+
+    total = 0
+    while True:
+        started = time.monotonic()
+        with engine.begin() as conn:
+            moved = _archive_batch(conn, horizon, batch_size)
+        if not moved:
+            return total
+        total += moved
+        log(f"Archived {total} orders")
+        pause = moved / max_rows_per_second - (time.monotonic() - started)
+        if pause > 0:
+            time.sleep(pause)
+
+async def run_archiver(engine: Engine, interval: float = None):
+    interval = interval or config.ARCHIVE_INTERVAL_SECONDS
+    while True:
+        try:
+            await asyncio.to_thread(archive_orders, engine, None, None, None, None, lambda message: None)
+        except Exception as e:
+            # e.g. another worker archived the same batch; the next run carries on
+            print(f"Order archival error: {e}")
+        await asyncio.sleep(interval)
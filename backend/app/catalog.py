@@ -0,0 +1,60 @@
+from typing import Optional
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+from app import models
+
+DEFAULT_PRODUCTS = [
+    dict(name="Jollof Rice", price=45.00, category="Main", tax_group="VAT_standard", stock_quantity=50),
+    dict(name="Fried Rice", price=40.00, category="Main", tax_group="VAT_standard", stock_quantity=50),
+    dict(name="Grilled Tilapia", price=75.00, category="Main", tax_group="VAT_standard", stock_quantity=20),
+    dict(name="Kelewele", price=20.00, category="Side", tax_group="VAT_standard", stock_quantity=100),
+]
+
+def get_catalog_version(db: Session) -> int:
+    version = db.execute(
+        select(models.CatalogState.version).where(models.CatalogState.id == 1)
+    ).scalar()
+    return version or 0
+
+def bump_catalog_version(db: Session) -> int:
+    """Reserve the next catalog version. Call once per write transaction."""
+    result = db.execute(
+        update(models.CatalogState)
+        .where(models.CatalogState.id == 1)
+        .values(version=models.CatalogState.version + 1)
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount == 0:
+        db.add(models.CatalogState(id=1, version=1))
+        db.flush()
+        return 1
+    return get_catalog_version(db)
+
+def mark_product_changed(db: Session, product: models.Product, version: Optional[int] = None) -> int:
+    if version is None:
+        version = bump_catalog_version(db)
+    product.version = version
+    # A re-used ID is no longer deleted
+    db.query(models.ProductTombstone).filter(
+        models.ProductTombstone.product_id == product.id
+    ).delete(synchronize_session=False)
+    return version
+
+def mark_product_deleted(db: Session, product_id: int, version: Optional[int] = None) -> int:
+    if version is None:
+        version = bump_catalog_version(db)
+    tombstone = db.get(models.ProductTombstone, product_id)
+    if tombstone:
+        tombstone.version = version
+    else:
+        db.add(models.ProductTombstone(product_id=product_id, version=version))
+    return version
+
+def seed_default_products(db: Session) -> bool:
+    """Insert the default menu into an empty catalog. Runs at startup, not on reads."""
+    if db.query(models.Product.id).first() is not None:
+        return False
+    version = bump_catalog_version(db)
+    db.add_all(models.Product(version=version, **p) for p in DEFAULT_PRODUCTS)
+    db.commit()
+    return True
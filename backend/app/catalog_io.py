@@ -0,0 +1,348 @@
+"""Bulk catalog import and export (CSV or NDJSON).
+
+Imports are parsed row by row from the uploaded file and written in
+batches: each batch is one transaction with one catalog version bump,
+however many products it touches. Rows that fail validation are reported
+with their row number and skipped. If a batch fails as a whole, its rows
+are retried one by one in savepoints, so only the bad rows are lost.
+Counts are only reported for rows that were committed. A dry run
+validates and applies every batch, then rolls it back.
+
+Exports walk the catalog by id in keyset batches, so memory stays flat
+and no transaction stays open while the client downloads.
+"""
+import csv
+import io
+import json
+import math
+from typing import IO, Any, Dict, Iterable, Iterator, List, Optional, Tuple
+from pydantic import BaseModel, ValidationError, field_validator
+from sqlalchemy import select, insert, delete
+from sqlalchemy.orm import Session
+from app import models, catalog
+
+FORMATS = ("csv", "ndjson")
+IMPORT_BATCH_SIZE = 500
+MAX_IMPORT_BATCH_SIZE = 5000
+EXPORT_BATCH_SIZE = 500
+_IN_CHUNK = 500
+# Per-row errors beyond this are counted but not listed
+MAX_REPORTED_ERRORS = 1000
+# Integer columns are 32-bit on PostgreSQL
+INT_MIN, INT_MAX = -2**31, 2**31 - 1
+
+# Import/export columns, in export order
+COLUMNS = ["id", "name", "price", "category", "tax_group", "stock_quantity", "low_stock_threshold", "unit"]
+# Needed to create a product; updates may send any subset
+REQUIRED_FOR_CREATE = ("name", "price", "category", "tax_group")
+
+class ProductImportRow(BaseModel):
+    id: Optional[int] = None
+    name: Optional[str] = None
+    price: Optional[float] = None
+    category: Optional[str] = None
+    tax_group: Optional[str] = None
+    stock_quantity: Optional[int] = None
+    low_stock_threshold: Optional[int] = None
+    unit: Optional[str] = None
+
+    @field_validator("name")
+    @classmethod
+    def name_not_blank(cls, value):
+        if value is not None and not value.strip():
+            raise ValueError("name must not be blank")
+        return value.strip() if value is not None else value
+
+    @field_validator("price", "low_stock_threshold")
+    @classmethod
+    def not_negative(cls, value):
+        if value is not None and value < 0:
+            raise ValueError("must not be negative")
+        return value
+
+    @field_validator("price")
+    @classmethod
+    def finite(cls, value):
+        if value is not None and not math.isfinite(value):
+            raise ValueError("must be a finite number")
+        return value
+
+    @field_validator("id", "stock_quantity", "low_stock_threshold")
+    @classmethod
+    def fits_integer_column(cls, value):
+        if value is not None and not INT_MIN <= value <= INT_MAX:
+            raise ValueError(f"must be between {INT_MIN} and {INT_MAX}")
+        return value
+
+def detect_format(format: Optional[str], filename: Optional[str], content_type: Optional[str]) -> Optional[str]:
+    if format:
+        return format.lower() if format.lower() in FORMATS else None
+    if filename and filename.lower().endswith((".ndjson", ".jsonl")):
+        return "ndjson"
+    if content_type and "ndjson" in content_type:
+        return "ndjson"
+    return "csv"
+
+# --- Parsing ---
+
+def read_rows(binary: IO[bytes], format: str) -> Iterator[Tuple[int, Any]]:
+    """(row number, raw row) pairs, read from the file as they are needed"""
+    text = io.TextIOWrapper(binary, encoding="utf-8-sig", newline="")
+    if format == "csv":
+        for number, row in enumerate(csv.DictReader(text), start=1):
+            # Empty cells mean "leave unchanged", not an empty value
+            yield number, {key: value for key, value in row.items() if key and value not in ("", None)}
+        return
+    for number, line in enumerate(text, start=1):
+        if not line.strip():
+            continue
+        try:
+            yield number, json.loads(line)
+        except ValueError as e:
+            yield number, e
+
+def _validate(raw) -> ProductImportRow:
+    if isinstance(raw, ValueError):
+        raise ValueError(f"invalid JSON: {raw}")
+    if not isinstance(raw, dict):
+        raise ValueError("row must be an object")
+    return ProductImportRow.model_validate(raw)
+
+def _error_text(error: Exception) -> str:
+    if isinstance(error, ValidationError):
+        first = error.errors()[0]
+        field = ".".join(str(part) for part in first.get("loc", ()))
+        return f"{field}: {first.get('msg')}" if field else first.get("msg")
+    return str(error)
+
+# --- Import ---
+
+class ImportReport:
+    def __init__(self, dry_run: bool):
+        self.dry_run = dry_run
+        self.rows = 0
+        self.created = 0
+        self.updated = 0
+        self.failed = 0
+        self.batches = 0
+        self.catalog_version: Optional[int] = None
+        self.errors: List[Dict[str, Any]] = []
+
+    def fail(self, row: int, error: str):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"row": row, "error": error})
+
+    def add(self, outcome: "BatchOutcome"):
+        """Count a batch (or row) once its transaction has committed"""
+        self.created += outcome.created
+        self.updated += outcome.updated
+        for row, error in outcome.errors:
+            self.fail(row, error)
+        # A dry run keeps nothing, so it has no version to report
+        if outcome.version is not None and not self.dry_run:
+            self.catalog_version = max(self.catalog_version or 0, outcome.version)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "dry_run": self.dry_run,
+            "rows": self.rows,
+            "created": self.created,
+            "updated": self.updated,
+            "failed": self.failed,
+            "batches": self.batches,
+            "catalog_version": self.catalog_version,
+            "errors": sorted(self.errors, key=lambda error: error["row"]),
+            "errors_truncated": self.failed > len(self.errors),
+        }
+
+class BatchOutcome:
+    """What one batch did; only added to the report after it commits"""
+    def __init__(self):
+        self.created = 0
+        self.updated = 0
+        self.errors: List[Tuple[int, str]] = []
+        self.version: Optional[int] = None
+
+    @classmethod
+    def failed(cls, rows: Iterable[int], error: str) -> "BatchOutcome":
+        outcome = cls()
+        outcome.errors = [(row, error) for row in rows]
+        return outcome
+
+def _load_products(db: Session, column, values: list) -> List[models.Product]:
+    products = []
+    # SQLite caps bound parameters per statement
+    for start in range(0, len(values), _IN_CHUNK):
+        products += db.scalars(select(models.Product).where(column.in_(values[start:start + _IN_CHUNK])))
+    return products
+
+def _apply_batch(db: Session, batch: List[Tuple[int, ProductImportRow]], version: int) -> BatchOutcome:
+    """Upsert one batch in the session's transaction (not committed here).
+
+    Rows with an id update that product; rows without one update the
+    product with the same name, or create it. Every row is stamped with
+    `version`, reserved once by the caller for the whole batch.
+    """
+    ids = list({row.id for _, row in batch if row.id is not None})
+    names = list({row.name for _, row in batch if row.id is None and row.name})
+    by_id = {p.id: p for p in _load_products(db, models.Product.id, ids)}
+    by_name = {}
+    for product in sorted(_load_products(db, models.Product.name, names), key=lambda p: p.id):
+        by_name.setdefault(product.name, product)
+
+    outcome = BatchOutcome()
+    changed: Dict[int, models.Product] = {}
+    known_stock: Dict[int, int] = {}
+    adjustments = []
+    created = []
+    for number, row in batch:
+        if row.id is not None:
+            product = by_id.get(row.id)
+            if product is None:
+                outcome.errors.append((number, f"id {row.id}: product not found"))
+                continue
+        else:
+            product = by_name.get(row.name)
+        fields = row.model_dump(exclude_unset=True, exclude={"id"})
+
+        if product is None:
+            missing = [name for name in REQUIRED_FOR_CREATE if fields.get(name) is None]
+            if missing:
+                outcome.errors.append((number, f"missing {', '.join(missing)} for a new product"))
+                continue
+            product = models.Product(version=version, **fields)
+            db.add(product)
+            created.append(product)
+            # Later rows in this batch with the same name update it
+            by_name[product.name] = product
+            continue
+
+        if product.id is None:
+            # Created earlier in this batch
+            for name, value in fields.items():
+                setattr(product, name, value)
+            continue
+
+        stock = fields.pop("stock_quantity", None)
+        for name, value in fields.items():
+            setattr(product, name, value)
+        if stock is not None:
+            current = known_stock.setdefault(product.id, product.stock_quantity)
+            if stock != current:
+                adjustments.append((product.id, stock - current))
+                known_stock[product.id] = stock
+        product.version = version
+        changed[product.id] = product
+        outcome.updated += 1
+
+    # Stock changes are applied as a delta and logged, like PUT /products/{id},
+    # so sales synced meanwhile are kept
+    for product_id, stock in known_stock.items():
+        adjustment = stock - changed[product_id].stock_quantity
+        if adjustment:
+            changed[product_id].stock_quantity = models.Product.stock_quantity + adjustment
+    db.flush()
+    outcome.created = len(created)
+    if adjustments:
+        db.execute(insert(models.InventoryLog), [
+            {"product_id": product_id, "quantity_change": change, "reason": "adjustment"}
+            for product_id, change in adjustments
+        ])
+    # Re-imported IDs, and IDs the database re-used for new products, are no longer deleted
+    touched = list(changed) + [product.id for product in created]
+    if touched:
+        db.execute(delete(models.ProductTombstone).where(models.ProductTombstone.product_id.in_(touched)))
+    outcome.version = version
+    return outcome
+
+def _error_message(error: Exception) -> str:
+    # Database errors carry the driver's message; the SQL is noise in a report
+    return str(getattr(error, "orig", None) or error)
+
+def _import_batch(db: Session, batch: List[Tuple[int, ProductImportRow]], dry_run: bool) -> List[BatchOutcome]:
+    """Apply and commit (or roll back) one batch.
+
+    If the batch fails, its rows are retried one by one in savepoints,
+    like order sync does, so one bad row does not lose the others. The
+    retried rows share one catalog version, reserved outside the savepoints.
+    """
+    finish = db.rollback if dry_run else db.commit
+    try:
+        outcome = _apply_batch(db, batch, catalog.bump_catalog_version(db))
+        finish()
+        return [outcome]
+    except Exception:
+        db.rollback()
+
+    version = catalog.bump_catalog_version(db)
+    outcomes = []
+    for number, row in batch:
+        try:
+            with db.begin_nested():
+                outcomes.append(_apply_batch(db, [(number, row)], version))
+        except Exception as e:
+            outcomes.append(BatchOutcome.failed([number], f"not saved: {_error_message(e)}"))
+    finish()
+    return outcomes
+
+def next_batch(rows: Iterator[Tuple[int, Any]], report: ImportReport, batch_size: int = IMPORT_BATCH_SIZE) -> List[Tuple[int, ProductImportRow]]:
+    """Read and validate rows until `batch_size` are valid; empty once the file is done.
+
+    Invalid rows are reported and skipped. Touches no database, so the
+    endpoint runs it in a worker thread, off the event loop.
+    """
+    batch: List[Tuple[int, ProductImportRow]] = []
+    for number, raw in rows:
+        report.rows += 1
+        try:
+            batch.append((number, _validate(raw)))
+        except (ValueError, ValidationError) as e:
+            report.fail(number, _error_text(e))
+            continue
+        if len(batch) >= batch_size:
+            break
+    return batch
+
+def save_batch(db: Session, report: ImportReport, batch: List[Tuple[int, ProductImportRow]]):
+    """Write one validated batch and count what was committed"""
+    try:
+        outcomes = _import_batch(db, batch, report.dry_run)
+    except Exception as e:
+        # The commit itself failed, so nothing in the batch was kept
+        db.rollback()
+        outcomes = [BatchOutcome.failed([number for number, _ in batch], f"batch not saved: {_error_message(e)}")]
+    for outcome in outcomes:
+        report.add(outcome)
+    report.batches += 1
+
+def import_products(
+    db: Session,
+    rows: Iterable[Tuple[int, Any]],
+    dry_run: bool = False,
+    batch_size: int = IMPORT_BATCH_SIZE,
+) -> ImportReport:
+    """Validate and upsert rows, committing every `batch_size` valid rows"""
+    report = ImportReport(dry_run)
+    rows = iter(rows)
+    while batch := next_batch(rows, report, batch_size):
+        save_batch(db, report, batch)
+    return report
+
+# --- Export ---
+
+def export_batch(db: Session, after_id: Optional[int], limit: int = EXPORT_BATCH_SIZE) -> List[tuple]:
+    query = select(*(getattr(models.Product, name) for name in COLUMNS)).order_by(models.Product.id).limit(limit)
+    if after_id is not None:
+        query = query.where(models.Product.id > after_id)
+    return db.execute(query).all()
+
+def format_rows(rows: List[tuple], format: str, header: bool = False) -> str:
+    if format == "ndjson":
+        return "".join(json.dumps(dict(zip(COLUMNS, row))) + "\n" for row in rows)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    if header:
+        writer.writerow(COLUMNS)
+    writer.writerows(rows)
+    return buffer.getvalue()
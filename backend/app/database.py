@@ -1,16 +1,99 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.orm import sessionmaker, declarative_base
+from app import config
 
-SQLALCHEMY_DATABASE_URL = "sqlite:///./restaurant_v2.db"
+# Async drivers used for each backend when ASYNC_DATABASE_URL is not set
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+}
 
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
-)
+def normalize_url(url: str) -> str:
+    # Hosting providers often hand out postgres:// URLs, which SQLAlchemy rejects
+    if url.startswith("postgres://"):
+        url = "postgresql://" + url[len("postgres://"):]
+    # Pin the driver we ship (psycopg2) rather than SQLAlchemy's default
+    if url.startswith("postgresql://"):
+        url = "postgresql+psycopg2://" + url[len("postgresql://"):]
+    return url
+
+def to_async_url(url: str) -> str:
+    parsed = make_url(normalize_url(url))
+    driver = ASYNC_DRIVERS.get(parsed.drivername)
+    if driver is None:
+        raise ValueError(f"No async driver configured for {parsed.drivername}; set ASYNC_DATABASE_URL")
+    return parsed.set(drivername=driver).render_as_string(hide_password=False)
+
+def is_sqlite(url: str) -> bool:
+    return make_url(url).get_backend_name() == "sqlite"
+
+SQLALCHEMY_DATABASE_URL = normalize_url(config.DATABASE_URL)
+ASYNC_DATABASE_URL = config.ASYNC_DATABASE_URL or to_async_url(SQLALCHEMY_DATABASE_URL)
+
+def sqlite_pragmas(profile: str = config.DB_PROFILE) -> dict:
+    if profile != "production":
+        return {}
+    return {
+        "journal_mode": config.SQLITE_JOURNAL_MODE,
+        "synchronous": config.SQLITE_SYNCHRONOUS,
+        "busy_timeout": config.SQLITE_BUSY_TIMEOUT_MS,
+        # Negative cache_size is in KiB rather than pages
+        "cache_size": -config.SQLITE_CACHE_SIZE_KB,
+        "mmap_size": config.SQLITE_MMAP_SIZE,
+        "temp_store": "MEMORY",
+    }
+
+def _install_pragmas(sync_engine, profile: str):
+    pragmas = sqlite_pragmas(profile)
+    if not pragmas:
+        return
+
+    # Pragmas are per connection, so apply them as each pooled connection opens
+    @event.listens_for(sync_engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+def _engine_args(url: str) -> dict:
+    args = {
+        "pool_size": config.DB_POOL_SIZE,
+        "max_overflow": config.DB_MAX_OVERFLOW,
+        "pool_timeout": config.DB_POOL_TIMEOUT,
+        "pool_recycle": config.DB_POOL_RECYCLE,
+        "pool_pre_ping": config.DB_POOL_PRE_PING,
+    }
+    if is_sqlite(url) and make_url(url).drivername == "sqlite":
+        args["connect_args"] = {"check_same_thread": False}
+    return args
+
+def create_db_engine(url: str = SQLALCHEMY_DATABASE_URL, profile: str = config.DB_PROFILE):
+    """Synchronous engine for scripts, migrations and startup tasks"""
+    url = normalize_url(url)
+    db_engine = create_engine(url, **_engine_args(url))
+    if is_sqlite(url):
+        _install_pragmas(db_engine, profile)
+    return db_engine
+
+def create_async_db_engine(url: str = ASYNC_DATABASE_URL, profile: str = config.DB_PROFILE):
+    """Async engine used by the API so queries never block the event loop"""
+    db_engine = create_async_engine(url, **_engine_args(url))
+    if is_sqlite(url):
+        _install_pragmas(db_engine.sync_engine, profile)
+    return db_engine
+
+engine = create_db_engine()
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
-def get_db():
-    db = SessionLocal()
-    try:
+async_engine = create_async_db_engine()
+AsyncSessionLocal = async_sessionmaker(
+    async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+)
+
+async def get_db():
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
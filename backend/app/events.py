@@ -0,0 +1,92 @@
+import asyncio
+import json
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Set
+
+# Events a slow subscriber may fall behind by before it is told to resync
+SUBSCRIBER_QUEUE_SIZE = 1000
+# Comment line sent on idle Server-Sent Events streams so proxies keep them open
+KEEPALIVE_SECONDS = 15
+
+class Subscription:
+    def __init__(self, hub: "EventHub", topic: str):
+        self.hub = hub
+        self.topic = topic
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        # Set when events were dropped; the consumer must reload a snapshot
+        self.overflowed = False
+
+    async def get(self, timeout: float = None):
+        return await asyncio.wait_for(self.queue.get(), timeout)
+
+    def reset(self):
+        """Drop queued events after the consumer has reloaded a snapshot"""
+        self.overflowed = False
+        while not self.queue.empty():
+            self.queue.get_nowait()
+
+    def close(self):
+        self.hub.unsubscribe(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+class EventHub:
+    """In-process pub/sub for pushing changes to connected screens.
+
+    Publishing never blocks: each subscriber has a bounded queue, and one
+    that falls behind is flagged to resync instead of slowing the publisher.
+    Events only reach subscribers in the same worker process.
+    """
+
+    def __init__(self):
+        self._subscribers: Dict[str, Set[Subscription]] = {}
+
+    def subscribe(self, topic: str) -> Subscription:
+        subscription = Subscription(self, topic)
+        self._subscribers.setdefault(topic, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        self._subscribers.get(subscription.topic, set()).discard(subscription)
+
+    def subscriber_count(self, topic: str) -> int:
+        return len(self._subscribers.get(topic, ()))
+
+    def publish(self, topic: str, event_type: str, data: Any):
+        for subscription in list(self._subscribers.get(topic, ())):
+            try:
+                subscription.queue.put_nowait({"type": event_type, "data": data})
+            except asyncio.QueueFull:
+                subscription.overflowed = True
+
+hub = EventHub()
+
+# --- Server-Sent Events ---
+
+def sse(event_type: str, data) -> str:
+    return f"event: {event_type}\ndata: {json.dumps(data)}\n\n"
+
+async def sse_events(topic: str, snapshot: Callable[[], Awaitable[Any]]) -> AsyncIterator[str]:
+    """One `snapshot` event, then each `topic` event as it arrives.
+
+    Subscribes when the stream starts, before the snapshot is read, so no
+    change falls in between, and unsubscribes however the stream ends. A
+    stream that never starts never subscribes. A subscriber that fell
+    behind gets a fresh snapshot.
+    """
+    with hub.subscribe(topic) as subscription:
+        yield sse("snapshot", await snapshot())
+        while True:
+            if subscription.overflowed:
+                # Fell too far behind; start over from a fresh snapshot
+                subscription.reset()
+                yield sse("snapshot", await snapshot())
+            try:
+                event = await subscription.get(timeout=KEEPALIVE_SECONDS)
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"
+                continue
+            yield sse(event["type"], event["data"])
@@ -0,0 +1,134 @@
+"""Streaming CSV/NDJSON exports of orders and inventory logs for accounting.
+
+Rows are read in keyset batches on (time, id), each batch in its own short
+session, and written out as soon as they are formatted, optionally through
+a gzip compressor. Memory use is one batch, however long the export.
+Archived orders are included: the monthly archive tables overlapping the
+range are exported first, then the live orders table, each in time order.
+"""
+import csv
+import io
+import json
+import zlib
+from datetime import datetime
+from typing import Any, AsyncIterator, List, Optional, Sequence, Tuple
+from sqlalchemy import select, and_, or_
+from sqlalchemy.orm import Session
+from app import archive, models
+from app.database import AsyncSessionLocal
+
+FORMATS = ("csv", "ndjson")
+EXPORT_BATCH_SIZE = 1000
+
+ORDER_COLUMNS = [
+    "id", "created_at", "shift_id", "user_id", "status", "payment_method", "total_amount", "total_tax",
+    "amount_tendered", "change_due", "reference_number", "kitchen_status", "items_json",
+]
+INVENTORY_LOG_COLUMNS = ["id", "timestamp", "product_id", "product_name", "quantity_change", "reason", "user_id"]
+
+# --- Queries ---
+
+def order_export_queries(
+    db: Session, start: Optional[datetime], end: Optional[datetime], shift_id: Optional[int]
+) -> List[tuple]:
+    """(query, time column, id column) per table holding orders in the range"""
+    low = archive.month_key(start) if start else None
+    high = archive.month_key(end) if end else None
+    tables = [
+        archive.archive_table(month) for month in sorted(archive.archived_months(db))
+        if (low is None or month >= low) and (high is None or month <= high)
+    ]
+    tables.append(models.Order.__table__)
+
+    queries = []
+    for table in tables:
+        query = select(*(table.c[name] for name in ORDER_COLUMNS))
+        if start is not None:
+            query = query.where(table.c.created_at >= start)
+        if end is not None:
+            query = query.where(table.c.created_at < end)
+        if shift_id is not None:
+            query = query.where(table.c.shift_id == shift_id)
+        queries.append((query, table.c.created_at, table.c.id))
+    return queries
+
+def inventory_log_export_query(start: Optional[datetime], end: Optional[datetime]) -> tuple:
+    logs = models.InventoryLog.__table__
+    query = (
+        select(logs.c.id, logs.c.timestamp, logs.c.product_id, models.Product.name.label("product_name"),
+               logs.c.quantity_change, logs.c.reason, logs.c.user_id)
+        .outerjoin(models.Product, models.Product.id == logs.c.product_id)
+    )
+    if start is not None:
+        query = query.where(logs.c.timestamp >= start)
+    if end is not None:
+        query = query.where(logs.c.timestamp < end)
+    return query, logs.c.timestamp, logs.c.id
+
+def shift_window(db: Session, shift_id: int) -> Optional[Tuple[datetime, Optional[datetime]]]:
+    # Inventory logs carry no shift; a shift filter means the shift's time window
+    return db.execute(
+        select(models.Shift.start_time, models.Shift.end_time).where(models.Shift.id == shift_id)
+    ).first()
+
+def page_query(query, time_column, id_column, after: Optional[tuple], limit: int):
+    """The next batch after the (time, id) key `after`"""
+    if after is not None:
+        after_time, after_id = after
+        query = query.where(or_(time_column > after_time, and_(time_column == after_time, id_column > after_id)))
+    return query.order_by(time_column, id_column).limit(limit)
+
+def _page(db: Session, query, time_column, id_column, after: Optional[tuple], limit: int):
+    return db.execute(page_query(query, time_column, id_column, after, limit)).all()
+
+async def keyset_rows(sources: Sequence[tuple], batch_size: int = EXPORT_BATCH_SIZE) -> AsyncIterator[list]:
+    """Batches of rows from each (query, time column, id column) in turn"""
+    for query, time_column, id_column in sources:
+        after = None
+        while True:
+            # A short session per batch, so a slow download never holds a connection
+            async with AsyncSessionLocal() as db:
+                rows = await db.run_sync(_page, query, time_column, id_column, after, batch_size)
+            if not rows:
+                break
+            yield rows
+            last = rows[-1]._mapping
+            after = (last[time_column.name], last[id_column.name])
+
+# --- Encoding ---
+
+def _value(value: Any, nested_as_json: bool):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if nested_as_json and isinstance(value, (list, dict)):
+        return json.dumps(value)
+    return value
+
+def format_rows(rows: list, columns: List[str], file_format: str, header: bool = False) -> str:
+    if file_format == "ndjson":
+        return "".join(
+            json.dumps({name: _value(value, False) for name, value in zip(columns, row)}) + "\n" for row in rows
+        )
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    if header:
+        writer.writerow(columns)
+    writer.writerows([_value(value, True) for value in row] for row in rows)
+    return buffer.getvalue()
+
+async def encode(batches: AsyncIterator[list], columns: List[str], file_format: str, gzip: bool = False) -> AsyncIterator[bytes]:
+    """Formatted (and optionally gzipped) bytes, one chunk per batch"""
+    compressor = zlib.compressobj(wbits=31) if gzip else None  # wbits=31: gzip container
+    if file_format == "csv":
+        # The header goes out even when nothing matches
+        chunk = format_rows([], columns, file_format, header=True).encode()
+        data = compressor.compress(chunk) if compressor else chunk
+        if data:
+            yield data
+    async for rows in batches:
+        chunk = format_rows(rows, columns, file_format).encode()
+        data = compressor.compress(chunk) if compressor else chunk
+        if data:
+            yield data
+    if compressor:
+        yield compressor.flush()
@@ -0,0 +1,194 @@
+"""Inventory snapshots: stock at a point in time without replaying the ledger.
+
+A snapshot row holds a product's stock at `as_of` (midnight UTC), counting
+every inventory_logs row with `timestamp < as_of` and `id <= last_log_id`.
+Rows synced late (offline orders are stamped with their sale time) have
+a higher id than the snapshot's watermark, so they are still counted.
+Stock at any moment is the latest snapshot plus the log rows it does not
+cover, which the (product_id, timestamp) index serves directly.
+
+A product's first snapshot is an opening balance at EPOCH, derived from its
+current stock minus its whole ledger. Later snapshots roll forward from
+the ledger only, so check_consistency catches stock changed without a log.
+"""
+import asyncio
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+from sqlalchemy import select, func, and_, insert, update
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from app import config, models
+
+EPOCH = datetime(1970, 1, 1)
+
+def day_start(moment: datetime) -> datetime:
+    return moment.replace(hour=0, minute=0, second=0, microsecond=0)
+
+def _latest_snapshots(db: Session) -> Dict[int, models.InventorySnapshot]:
+    snapshots = models.InventorySnapshot
+    latest = (
+        select(snapshots.product_id, func.max(snapshots.as_of).label("as_of"))
+        .group_by(snapshots.product_id)
+        .subquery()
+    )
+    rows = db.scalars(
+        select(snapshots).join(
+            latest, and_(snapshots.product_id == latest.c.product_id, snapshots.as_of == latest.c.as_of)
+        )
+    )
+    return {row.product_id: row for row in rows}
+
+def compact(engine: Engine, now: Optional[datetime] = None, log=print) -> int:
+    """Write daily snapshots for every day that ended since the last run.
+    Returns the number of snapshot rows written."""
+    logs = models.InventoryLog
+    cutoff = day_start(now or datetime.utcnow())
+    with Session(engine) as db:
+        watermark = db.scalar(select(func.max(logs.id))) or 0
+        latest = _latest_snapshots(db)
+
+        # Read before the openings are added, so a first run scans the whole ledger
+        snapshots = models.InventorySnapshot
+        last_watermark, last_cutoff = db.execute(
+            select(func.max(snapshots.last_log_id), func.max(snapshots.as_of))
+        ).one()
+
+        # Opening balances for products that have never been snapshotted
+        unsnapshotted = db.execute(
+            select(
+                models.Product.id,
+                models.Product.stock_quantity - func.coalesce(
+                    select(func.sum(logs.quantity_change)).where(logs.product_id == models.Product.id)
+                    .scalar_subquery(), 0
+                ),
+            ).where(models.Product.id.not_in(list(latest)) if latest else True)
+        ).all()
+        openings = [
+            {"product_id": product_id, "as_of": EPOCH, "quantity": opening, "last_log_id": 0}
+            for product_id, opening in unsnapshotted
+        ]
+        if openings:
+            db.execute(insert(models.InventorySnapshot), openings)
+            for row in openings:
+                latest[row["product_id"]] = models.InventorySnapshot(**row)
+
+        # Ledger rows not yet covered by each product's latest snapshot. After
+        # a run, every uncovered row up to its watermark is stamped at or after
+        # its cutoff, so new ids plus rows since the last cutoff are enough.
+        columns = select(logs.id, logs.product_id, logs.quantity_change, logs.timestamp)
+        last_watermark = last_watermark or 0
+        pending = db.execute(columns.where(
+            logs.id > last_watermark, logs.id <= watermark, logs.timestamp < cutoff
+        )).all()
+        if last_cutoff is not None:
+            pending += db.execute(columns.where(
+                logs.timestamp >= last_cutoff, logs.timestamp < cutoff, logs.id <= last_watermark
+            )).all()
+
+        changes = defaultdict(lambda: defaultdict(int))  # product -> day boundary -> quantity
+        for row in pending:
+            snapshot = latest.get(row.product_id)
+            if snapshot is None or (row.id <= snapshot.last_log_id and row.timestamp < snapshot.as_of):
+                continue  # Already counted
+            # Late rows go into the first new snapshot
+            boundary = max(day_start(row.timestamp) + timedelta(days=1), snapshot.as_of + timedelta(days=1))
+            changes[row.product_id][min(boundary, cutoff)] += row.quantity_change or 0
+
+        new_rows = []
+        for product_id, by_day in changes.items():
+            snapshot = latest[product_id]
+            quantity = snapshot.quantity
+            for boundary in sorted(by_day):
+                quantity += by_day[boundary]
+                if boundary == snapshot.as_of:
+                    # Already compacted today: fold rows synced since into that snapshot
+                    db.execute(
+                        update(snapshots)
+                        .where(snapshots.product_id == product_id, snapshots.as_of == boundary)
+                        .values(quantity=quantity, last_log_id=watermark)
+                    )
+                    continue
+                new_rows.append({
+                    "product_id": product_id, "as_of": boundary,
+                    "quantity": quantity, "last_log_id": watermark,
+                })
+        if new_rows:
+            db.execute(insert(models.InventorySnapshot), new_rows)
+        db.commit()
+    written = len(openings) + len(new_rows)
+    log(f"Inventory compaction: {written} snapshots written up to {cutoff:%Y-%m-%d}")
+    return written
+
+def _uncovered_sum(product_id: int, snapshot_as_of, snapshot_watermark, until=None):
+    """Sum of the product's log rows a snapshot does not cover (before `until`)"""
+    logs = models.InventoryLog
+    tail = select(func.coalesce(func.sum(logs.quantity_change), 0)).where(
+        logs.product_id == product_id, logs.timestamp >= snapshot_as_of
+    )
+    if until is not None:
+        tail = tail.where(logs.timestamp < until)
+    # Rows synced after the snapshot are found by id. `+ 0` keeps the planner
+    # from walking the product's whole history through the product index.
+    late = select(func.coalesce(func.sum(logs.quantity_change), 0)).where(
+        logs.id > snapshot_watermark, logs.product_id + 0 == product_id, logs.timestamp < snapshot_as_of
+    )
+    return tail.scalar_subquery() + late.scalar_subquery()
+
+def snapshot_at_query(product_id: int, moment: datetime):
+    snapshots = models.InventorySnapshot
+    return (
+        select(snapshots)
+        .where(snapshots.product_id == product_id, snapshots.as_of <= moment)
+        .order_by(snapshots.as_of.desc())
+        .limit(1)
+    )
+
+def stock_as_of(db: Session, product_id: int, moment: datetime) -> Optional[dict]:
+    """Stock at `moment`: nearest snapshot plus the log rows after it"""
+    snapshot = db.scalars(snapshot_at_query(product_id, moment)).first()
+    if snapshot is None:
+        # Not compacted yet: walk back from the current stock instead
+        logs = models.InventoryLog
+        quantity = db.scalar(
+            select(models.Product.stock_quantity - func.coalesce(
+                select(func.sum(logs.quantity_change))
+                .where(logs.product_id == product_id, logs.timestamp >= moment).scalar_subquery(), 0
+            )).where(models.Product.id == product_id)
+        )
+        if quantity is None:
+            return None
+        return {"product_id": product_id, "as_of": moment, "quantity": quantity, "snapshot_as_of": None}
+    quantity = snapshot.quantity + db.scalar(
+        select(_uncovered_sum(product_id, snapshot.as_of, snapshot.last_log_id, until=moment))
+    )
+    return {"product_id": product_id, "as_of": moment, "quantity": quantity, "snapshot_as_of": snapshot.as_of}
+
+def check_consistency(db: Session) -> List[dict]:
+    """Products whose stock differs from latest snapshot + uncovered log rows"""
+    mismatches = []
+    for product_id, snapshot in _latest_snapshots(db).items():
+        # Stock and ledger read in one statement, so a concurrent sync cannot split them
+        stock, uncovered = db.execute(
+            select(models.Product.stock_quantity, _uncovered_sum(product_id, snapshot.as_of, snapshot.last_log_id))
+            .where(models.Product.id == product_id)
+        ).one_or_none() or (None, None)
+        if stock is None:
+            continue  # Product deleted
+        expected = snapshot.quantity + uncovered
+        if stock != expected:
+            mismatches.append({
+                "product_id": product_id, "stock_quantity": stock,
+                "ledger_quantity": expected, "difference": stock - expected,
+            })
+    return mismatches
+
+async def run_compaction(engine: Engine, interval: float = None):
+    interval = interval or config.INVENTORY_COMPACTION_INTERVAL_SECONDS
+    while True:
+        try:
+            await asyncio.to_thread(compact, engine, None, lambda message: None)
+        except Exception as e:
+            # e.g. another worker compacted at the same moment; the next run catches up
+            print(f"Inventory compaction error: {e}")
+        await asyncio.sleep(interval)
@@ -0,0 +1,110 @@
+"""Products at or below their low-stock threshold, kept in memory.
+
+The set is loaded once at startup. After that, every stock change re-reads
+only the products it touched and compares them with the set: a product
+joining it is a `low_stock` alert, one leaving it is `restocked`. Alerts go
+to the event hub, and GET /inventory/alerts answers from memory.
+
+Each worker keeps its own set and only sees the changes it made, so the
+set is also re-read every LOW_STOCK_RESYNC_SECONDS to pick up changes made
+by other workers.
+"""
+import asyncio
+from datetime import datetime
+from typing import Dict, Iterable, List, NamedTuple, Tuple
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from app import config, models
+from app.database import AsyncSessionLocal
+from app.events import hub
+
+TOPIC = "inventory"
+# SQLite caps bound parameters per statement
+_CHUNK = 500
+
+class LowStockItem(NamedTuple):
+    product_id: int
+    name: str
+    stock_quantity: int
+    low_stock_threshold: int
+
+def is_low(stock_quantity, low_stock_threshold) -> bool:
+    return (stock_quantity or 0) <= (low_stock_threshold or 0)
+
+_COLUMNS = (models.Product.id, models.Product.name, models.Product.stock_quantity, models.Product.low_stock_threshold)
+
+def low_stock_query():
+    # Products are the menu, so this scan is small; it only runs at startup and on resync
+    return select(*_COLUMNS).where(models.Product.stock_quantity <= models.Product.low_stock_threshold)
+
+class LowStockSet:
+    def __init__(self):
+        self._items: Dict[int, LowStockItem] = {}
+        self.loaded_at = None
+
+    def __contains__(self, product_id: int) -> bool:
+        return product_id in self._items
+
+    def __len__(self):
+        return len(self._items)
+
+    def items(self) -> List[LowStockItem]:
+        return sorted(self._items.values(), key=lambda item: item.stock_quantity - item.low_stock_threshold)
+
+    def observe(self, rows: Iterable[tuple], removed: Iterable[int] = ()) -> List[Tuple[str, LowStockItem]]:
+        """Apply current levels of some products; returns the threshold crossings"""
+        events = []
+        for row in rows:
+            item = LowStockItem(*row)
+            if is_low(item.stock_quantity, item.low_stock_threshold):
+                if item.product_id not in self._items:
+                    events.append(("low_stock", item))
+                self._items[item.product_id] = item
+            elif self._items.pop(item.product_id, None) is not None:
+                events.append(("restocked", item))
+        for product_id in removed:
+            self._items.pop(product_id, None)
+        return events
+
+    def replace(self, rows: Iterable[tuple]) -> List[Tuple[str, LowStockItem]]:
+        """Swap in a full reload; returns what changed relative to the old set"""
+        fresh = {row[0]: LowStockItem(*row) for row in rows}
+        events = [("low_stock", item) for product_id, item in fresh.items() if product_id not in self._items]
+        events += [("restocked", item) for product_id, item in self._items.items() if product_id not in fresh]
+        self._items = fresh
+        self.loaded_at = datetime.utcnow()
+        return events
+
+low_stock = LowStockSet()
+
+def _publish(events: List[Tuple[str, LowStockItem]]):
+    for event_type, item in events:
+        hub.publish(TOPIC, event_type, item._asdict())
+
+def _read_levels(db: Session, product_ids: List[int]):
+    rows = []
+    for start in range(0, len(product_ids), _CHUNK):
+        rows += db.execute(select(*_COLUMNS).where(models.Product.id.in_(product_ids[start:start + _CHUNK]))).all()
+    return rows
+
+async def refresh(db, product_ids: Iterable[int]):
+    """Re-check the given products after their stock or threshold changed (AsyncSession)"""
+    product_ids = sorted(set(product_ids))
+    if not product_ids:
+        return
+    rows = await db.run_sync(_read_levels, product_ids)
+    found = {row[0] for row in rows}
+    _publish(low_stock.observe(rows, removed=set(product_ids) - found))
+
+def reload(db: Session):
+    _publish(low_stock.replace(db.execute(low_stock_query()).all()))
+
+async def run_resync(interval: float = None):
+    interval = interval or config.LOW_STOCK_RESYNC_SECONDS
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            async with AsyncSessionLocal() as db:
+                await db.run_sync(reload)
+        except Exception as e:
+            print(f"Low-stock resync error: {e}")
@@ -1,8 +1,38 @@
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
-from app.api import sync, auth, shifts, users, kitchen, momo
+from app.api import sync, auth, shifts, users, kitchen, momo, reports, inventory, orders
+from app import archive, catalog, config, migrations, momo_payments, inventory_ledger, low_stock
+from app.database import engine, async_engine, AsyncSessionLocal
 from fastapi.middleware.cors import CORSMiddleware
 
-app = FastAPI(title="Ghana Restaurant OS Backend")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Cheap schema version check; migrations only run when the database is behind
+    migrations.ensure_schema(engine, auto_migrate=config.AUTO_MIGRATE)
+
+    # Seed the default menu once at startup instead of on every catalog read
+    async with AsyncSessionLocal() as db:
+        await db.run_sync(catalog.seed_default_products)
+        # One read of the products at or below their threshold; kept current by syncs
+        await db.run_sync(low_stock.reload)
+
+    background = [
+        # Expire MoMo payments nobody approved
+        asyncio.create_task(momo_payments.run_sweeper()),
+        # Roll the inventory ledger into daily snapshots
+        asyncio.create_task(inventory_ledger.run_compaction(engine)),
+        # Pick up low-stock changes made by other workers
+        asyncio.create_task(low_stock.run_resync()),
+        # Move old served orders out of the hot orders table
+        asyncio.create_task(archive.run_archiver(engine)),
+    ]
+    yield
+    for task in background:
+        task.cancel()
+    await async_engine.dispose()
+
+app = FastAPI(title="Ghana Restaurant OS Backend", lifespan=lifespan)
 
 # Allow CORS for development
 app.add_middleware(
@@ -11,6 +41,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Catalog-Version"],
 )
 
 app.include_router(sync.router)
@@ -19,11 +50,9 @@ app.include_router(shifts.router)
 app.include_router(users.router)
 app.include_router(kitchen.router)
 app.include_router(momo.router)
-
-# Create tables on startup
-from app.database import engine
-from app import models
-models.Base.metadata.create_all(bind=engine)
+app.include_router(reports.router)
+app.include_router(inventory.router)
+app.include_router(orders.router)
 
 @app.get("/")
 def read_root():
@@ -0,0 +1,332 @@
+"""Versioned schema migrations.
+
+The applied version lives in the single-row `schema_version` table. Worker
+startup only reads that row; upgrades run through `python migrate.py` (or at
+startup when AUTO_MIGRATE is on) under a lock held in the same row, so
+several workers booting together never migrate concurrently.
+
+To change the schema, update app/models.py and append a Migration to
+MIGRATIONS. Migration steps must be idempotent: a legacy database without a
+recorded version replays every step from the start.
+"""
+import os
+import time
+import socket
+from datetime import datetime, timedelta
+from typing import Callable, List, NamedTuple, Optional
+from sqlalchemy import inspect, select, update, insert, or_
+from sqlalchemy.engine import Engine
+from sqlalchemy.schema import CreateIndex
+from sqlalchemy.exc import IntegrityError, OperationalError, ProgrammingError
+from app import models
+
+LOCK_TTL = timedelta(minutes=10)
+LOCK_WAIT_SECONDS = 120
+DEFAULT_BATCH_SIZE = 1000
+
+class SchemaError(RuntimeError):
+    pass
+
+class Migration(NamedTuple):
+    version: int
+    description: str
+    apply: Callable[[Engine], None]
+
+# --- Helpers for migration steps ---
+
+def has_table(engine: Engine, table_name: str) -> bool:
+    return inspect(engine).has_table(table_name)
+
+def has_column(engine: Engine, table_name: str, column_name: str) -> bool:
+    return any(c["name"] == column_name for c in inspect(engine).get_columns(table_name))
+
+def add_column(engine: Engine, column) -> bool:
+    """ALTER TABLE ... ADD COLUMN for a model column, if it is missing"""
+    table = column.table.name
+    if has_column(engine, table, column.name):
+        return False
+    ddl = f"ALTER TABLE {table} ADD COLUMN {column.name} {column.type.compile(dialect=engine.dialect)}"
+    if column.default is not None and column.default.is_scalar:
+        ddl += f" DEFAULT {column.default.arg!r}"
+    with engine.begin() as conn:
+        conn.exec_driver_sql(ddl)
+    return True
+
+def create_tables(engine: Engine, *model_classes):
+    for model in model_classes:
+        model.__table__.create(bind=engine, checkfirst=True)
+
+def create_index_online(engine: Engine, index) -> bool:
+    """Create an index without blocking writers where the backend allows it.
+
+    PostgreSQL builds it CONCURRENTLY (outside a transaction). SQLite has no
+    online index build, so the index is created in one short statement.
+    """
+    existing = {ix["name"] for ix in inspect(engine).get_indexes(index.table.name)}
+    if index.name in existing:
+        return False
+    if engine.dialect.name == "postgresql":
+        ddl = str(CreateIndex(index).compile(dialect=engine.dialect))
+        ddl = ddl.replace("CREATE INDEX", "CREATE INDEX CONCURRENTLY", 1)
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            conn.exec_driver_sql(ddl)
+    else:
+        index.create(bind=engine)
+    return True
+
+def backfill_in_batches(engine: Engine, select_batch, apply_batch, batch_size: int = DEFAULT_BATCH_SIZE) -> int:
+    """Run a data change in short transactions so the database stays writable.
+
+    `select_batch(conn, after_key, limit)` returns rows ordered by key, with
+    the key first; `apply_batch(conn, rows)` writes them. Returns rows processed.
+    """
+    after_key = None
+    total = 0
+    while True:
+        with engine.begin() as conn:
+            rows = select_batch(conn, after_key, batch_size)
+            if not rows:
+                return total
+            apply_batch(conn, rows)
+        total += len(rows)
+        after_key = rows[-1][0]
+
+def analyze(engine: Engine):
+    # Refresh planner statistics so new indexes are picked up
+    with engine.begin() as conn:
+        conn.exec_driver_sql("ANALYZE")
+
+# --- Migrations ---
+
+def _baseline(engine: Engine):
+    create_tables(
+        engine, models.User, models.Shift, models.Product, models.Customer,
+        models.Order, models.InventoryLog
+    )
+
+def _order_payment_columns(engine: Engine):
+    add_column(engine, models.Order.__table__.c.amount_tendered)
+    add_column(engine, models.Order.__table__.c.change_due)
+    add_column(engine, models.Order.__table__.c.reference_number)
+
+def _catalog_versioning(engine: Engine):
+    add_column(engine, models.Product.__table__.c.version)
+    create_index_online(engine, _index(models.Product, "ix_products_version"))
+    create_tables(engine, models.ProductTombstone, models.CatalogState)
+
+def _hot_path_indexes(engine: Engine):
+    for table, name in [
+        (models.Order, "ix_orders_open_kitchen_created_at"),
+        (models.Shift, "ix_shifts_user_active"),
+        (models.Shift, "ix_shifts_user_start_time"),
+        (models.Shift, "ix_shifts_start_time"),
+        (models.InventoryLog, "ix_inventory_logs_product_timestamp"),
+    ]:
+        create_index_online(engine, _index(table, name))
+    analyze(engine)
+
+def _order_updated_at(engine: Engine):
+    add_column(engine, models.Order.__table__.c.updated_at)
+    orders = models.Order.__table__
+
+    def select_batch(conn, after_key, limit):
+        query = select(orders.c.id).where(orders.c.updated_at.is_(None))
+        if after_key is not None:
+            query = query.where(orders.c.id > after_key)
+        return conn.execute(query.order_by(orders.c.id).limit(limit)).fetchall()
+
+    def apply_batch(conn, rows):
+        conn.execute(
+            update(orders)
+            .where(orders.c.id.in_([row[0] for row in rows]))
+            .values(updated_at=orders.c.created_at)
+        )
+
+    backfill_in_batches(engine, select_batch, apply_batch)
+    create_index_online(engine, _index(models.Order, "ix_orders_updated_at"))
+
+def _order_items(engine: Engine):
+    # Existing orders are normalized separately by backfill_order_items.py
+    create_tables(engine, models.OrderItem)
+
+def _sales_rollups(engine: Engine):
+    # Existing orders are folded in separately by rebuild_rollups.py
+    create_tables(engine, models.SalesHourly, models.CategorySalesDaily)
+
+def _order_shifts(engine: Engine):
+    # Link existing orders to the latest shift that was open when they were created
+    orders = models.Order.__table__
+    shifts = models.Shift.__table__
+    containing_shift = (
+        select(shifts.c.id)
+        .where(
+            shifts.c.start_time <= orders.c.created_at,
+            or_(shifts.c.end_time.is_(None), shifts.c.end_time >= orders.c.created_at)
+        )
+        .order_by(shifts.c.start_time.desc())
+        .limit(1)
+        .scalar_subquery()
+    )
+
+    def select_batch(conn, after_key, limit):
+        query = select(orders.c.id).where(orders.c.shift_id.is_(None))
+        if after_key is not None:
+            query = query.where(orders.c.id > after_key)
+        return conn.execute(query.order_by(orders.c.id).limit(limit)).fetchall()
+
+    def apply_batch(conn, rows):
+        conn.execute(
+            update(orders)
+            .where(orders.c.id.in_([row[0] for row in rows]))
+            .values(shift_id=containing_shift)
+        )
+
+    backfill_in_batches(engine, select_batch, apply_batch)
+    create_index_online(engine, _index(models.Order, "ix_orders_shift_close_out"))
+
+def _momo_transactions(engine: Engine):
+    create_tables(engine, models.MomoTransaction)
+
+def _inventory_snapshots(engine: Engine):
+    # Snapshots are written by the compaction job (compact_inventory.py)
+    create_tables(engine, models.InventorySnapshot)
+    create_index_online(engine, _index(models.InventoryLog, "ix_inventory_logs_timestamp"))
+
+def _tax_discrepancies(engine: Engine):
+    # Existing orders are checked separately by verify_order_tax.py
+    create_tables(engine, models.TaxDiscrepancy)
+
+def _order_archives(engine: Engine):
+    create_tables(engine, models.OrderArchive)
+    create_index_online(engine, _index(models.Order, "ix_orders_created_at"))
+    # order_items keep pointing at orders that moved to an archive table.
+    # SQLite does not enforce the old foreign key, so only PostgreSQL drops it.
+    if engine.dialect.name == "postgresql":
+        for fk in inspect(engine).get_foreign_keys("order_items"):
+            if fk["referred_table"] == "orders":
+                with engine.begin() as conn:
+                    conn.exec_driver_sql(f'ALTER TABLE order_items DROP CONSTRAINT "{fk["name"]}"')
+
+def _index(model, name: str):
+    return next(ix for ix in model.__table__.indexes if ix.name == name)
+
+MIGRATIONS: List[Migration] = [
+    Migration(1, "baseline tables", _baseline),
+    Migration(2, "orders: amount_tendered, change_due, reference_number", _order_payment_columns),
+    Migration(3, "products: catalog version and tombstones", _catalog_versioning),
+    Migration(4, "indexes for kitchen, shift and inventory queries", _hot_path_indexes),
+    Migration(5, "orders: updated_at for incremental kitchen polls", _order_updated_at),
+    Migration(6, "order_items table", _order_items),
+    Migration(7, "sales rollup tables for reports", _sales_rollups),
+    Migration(8, "orders: link to shifts for close-out", _order_shifts),
+    Migration(9, "momo_transactions table", _momo_transactions),
+    Migration(10, "inventory snapshots", _inventory_snapshots),
+    Migration(11, "tax_discrepancies table", _tax_discrepancies),
+    Migration(12, "order archives", _order_archives),
+]
+
+LATEST_VERSION = MIGRATIONS[-1].version
+
+# --- Version bookkeeping ---
+
+def current_version(engine: Engine) -> Optional[int]:
+    """Recorded schema version, or None if nothing has been recorded yet"""
+    try:
+        with engine.connect() as conn:
+            return conn.execute(
+                select(models.SchemaVersion.version).where(models.SchemaVersion.id == 1)
+            ).scalar()
+    except (OperationalError, ProgrammingError):
+        # schema_version table does not exist yet
+        return None
+
+def _ensure_version_row(engine: Engine):
+    try:
+        models.SchemaVersion.__table__.create(bind=engine, checkfirst=True)
+    except (OperationalError, ProgrammingError):
+        pass  # Another worker created it first
+    try:
+        with engine.begin() as conn:
+            conn.execute(insert(models.SchemaVersion).values(id=1, version=0))
+    except IntegrityError:
+        pass
+
+def _acquire_lock(engine: Engine, owner: str) -> bool:
+    now = datetime.utcnow()
+    with engine.begin() as conn:
+        result = conn.execute(
+            update(models.SchemaVersion)
+            .where(
+                models.SchemaVersion.id == 1,
+                or_(models.SchemaVersion.lock_owner.is_(None), models.SchemaVersion.lock_expires < now)
+            )
+            .values(lock_owner=owner, lock_expires=now + LOCK_TTL)
+        )
+        return result.rowcount == 1
+
+def _record_version(engine: Engine, owner: str, version: int):
+    # Recording a step also extends the lock for the next one
+    now = datetime.utcnow()
+    with engine.begin() as conn:
+        conn.execute(
+            update(models.SchemaVersion)
+            .where(models.SchemaVersion.id == 1, models.SchemaVersion.lock_owner == owner)
+            .values(version=version, applied_at=now, lock_expires=now + LOCK_TTL)
+        )
+
+def _release_lock(engine: Engine, owner: str):
+    with engine.begin() as conn:
+        conn.execute(
+            update(models.SchemaVersion)
+            .where(models.SchemaVersion.id == 1, models.SchemaVersion.lock_owner == owner)
+            .values(lock_owner=None, lock_expires=None)
+        )
+
+def _is_empty_database(engine: Engine) -> bool:
+    tables = set(inspect(engine).get_table_names())
+    return not (tables - {models.SchemaVersion.__tablename__})
+
+def upgrade(engine: Engine, target: int = LATEST_VERSION, log: Callable[[str], None] = print) -> int:
+    """Apply pending migrations up to `target`. Returns the resulting version."""
+    _ensure_version_row(engine)
+    owner = f"{socket.gethostname()}:{os.getpid()}"
+    deadline = time.monotonic() + LOCK_WAIT_SECONDS
+    while not _acquire_lock(engine, owner):
+        if (current_version(engine) or 0) >= target:
+            return current_version(engine)
+        if time.monotonic() > deadline:
+            raise SchemaError("Timed out waiting for another process to finish migrating")
+        time.sleep(0.5)
+
+    try:
+        version = current_version(engine) or 0
+        if version == 0 and _is_empty_database(engine):
+            # Fresh database: build the current schema directly
+            log(f"Creating schema at version {target}...")
+            models.Base.metadata.create_all(bind=engine)
+            _record_version(engine, owner, target)
+            return target
+
+        for migration in MIGRATIONS:
+            if version < migration.version <= target:
+                log(f"Applying migration {migration.version}: {migration.description}...")
+                started = time.perf_counter()
+                migration.apply(engine)
+                _record_version(engine, owner, migration.version)
+                version = migration.version
+                log(f"Migration {migration.version} applied in {time.perf_counter() - started:.2f}s.")
+        return version
+    finally:
+        _release_lock(engine, owner)
+
+def ensure_schema(engine: Engine, auto_migrate: bool = True):
+    """Startup check: one indexed read of the schema version."""
+    version = current_version(engine)
+    if version is not None and version >= LATEST_VERSION:
+        return
+    if not auto_migrate:
+        raise SchemaError(
+            f"Database schema is at version {version or 0}, expected {LATEST_VERSION}. "
+            "Run `python migrate.py` before starting the API."
+        )
+    upgrade(engine)
@@ -1,9 +1,12 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean, ForeignKey, JSON
+from sqlalchemy import Column, Integer, String, Float, Date, DateTime, Boolean, ForeignKey, JSON, Index, bindparam
 from sqlalchemy.orm import relationship, declarative_base
 from datetime import datetime
 
 Base = declarative_base()
 
+# Kitchen statuses still shown on the Kitchen Display
+OPEN_KITCHEN_STATUSES = ("pending", "preparing", "ready")
+
 class User(Base):
     __tablename__ = "users"
     id = Column(Integer, primary_key=True, index=True)
@@ -42,6 +45,31 @@ class Product(Base):
     stock_quantity = Column(Integer, default=100)
     low_stock_threshold = Column(Integer, default=10)
     unit = Column(String, default="pieces")  # pieces, kg, liters
+    # Catalog version at which this product last changed (for delta sync)
+    version = Column(Integer, default=0, index=True)
+
+class ProductTombstone(Base):
+    """Remembers deleted products so delta syncs can tell terminals to drop them"""
+    __tablename__ = "product_tombstones"
+    product_id = Column(Integer, primary_key=True)
+    version = Column(Integer, index=True)
+    deleted_at = Column(DateTime, default=datetime.utcnow)
+
+class CatalogState(Base):
+    """Single-row counter holding the current catalog version"""
+    __tablename__ = "catalog_state"
+    id = Column(Integer, primary_key=True)
+    version = Column(Integer, default=0)
+
+class SchemaVersion(Base):
+    """Single-row record of the applied schema migration (see app/migrations.py)"""
+    __tablename__ = "schema_version"
+    id = Column(Integer, primary_key=True)
+    version = Column(Integer, default=0)
+    applied_at = Column(DateTime, nullable=True)
+    # Upgrade lock so only one worker migrates at a time
+    lock_owner = Column(String, nullable=True)
+    lock_expires = Column(DateTime, nullable=True)
 
 class Customer(Base):
     __tablename__ = "customers"
@@ -70,6 +98,8 @@ class Order(Base):
     kitchen_status = Column(String, default="pending")  # pending, preparing, ready, served
     kitchen_notes = Column(String, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
+    # Server time of the last change (kitchen ?since= cursor)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     # Store items as JSON for simplicity in MVP
     items_json = Column(JSON)
@@ -77,6 +107,41 @@ class Order(Base):
     user = relationship("User", back_populates="orders")
     shift = relationship("Shift", back_populates="orders")
     customer = relationship("Customer", back_populates="orders")
+    items = relationship("OrderItem", back_populates="order", primaryjoin="Order.id == foreign(OrderItem.order_id)")
+
+class OrderItem(Base):
+    """One line of an order, normalized from Order.items_json for reporting"""
+    __tablename__ = "order_items"
+    id = Column(Integer, primary_key=True)
+    # No foreign key: orders move to archive tables (app/archive.py) while their items stay
+    order_id = Column(String, nullable=False, index=True)
+    product_id = Column(Integer, ForeignKey("products.id"), nullable=True)
+    name = Column(String)
+    quantity = Column(Integer)
+    unit_price = Column(Float)
+    tax_amount = Column(Float, default=0.0)
+    # Copied from the order so time-window aggregates need no join
+    created_at = Column(DateTime)
+
+    order = relationship("Order", back_populates="items", primaryjoin="foreign(OrderItem.order_id) == Order.id")
+
+# --- Reporting rollups (kept current by sync_orders, rebuilt by rebuild_rollups.py) ---
+
+class SalesHourly(Base):
+    __tablename__ = "sales_hourly"
+    bucket_start = Column(DateTime, primary_key=True)  # UTC hour
+    payment_method = Column(String, primary_key=True)
+    order_count = Column(Integer, default=0)
+    gross_total = Column(Float, default=0.0)
+    tax_total = Column(Float, default=0.0)
+
+class CategorySalesDaily(Base):
+    __tablename__ = "sales_category_daily"
+    day = Column(Date, primary_key=True)  # UTC date
+    category = Column(String, primary_key=True)
+    quantity = Column(Integer, default=0)
+    net_sales = Column(Float, default=0.0)
+    tax_total = Column(Float, default=0.0)
 
 class InventoryLog(Base):
     __tablename__ = "inventory_logs"
@@ -86,3 +151,99 @@ class InventoryLog(Base):
     reason = Column(String)  # restock, sale, damage, adjustment
     user_id = Column(Integer, ForeignKey("users.id"), nullable=True)
     timestamp = Column(DateTime, default=datetime.utcnow)
+
+class InventorySnapshot(Base):
+    """Stock of a product at `as_of`, written by the compaction job (app/inventory_ledger.py)"""
+    __tablename__ = "inventory_snapshots"
+    # No foreign key: snapshots must not stop a product from being deleted
+    product_id = Column(Integer, primary_key=True)
+    as_of = Column(DateTime, primary_key=True)  # Midnight UTC
+    quantity = Column(Integer)
+    # Highest inventory_logs.id counted; later ids were synced after the snapshot
+    last_log_id = Column(Integer)
+
+class TaxDiscrepancy(Base):
+    """Order whose reported tax or total disagrees with app/tax.py (see app/tax_audit.py)"""
+    __tablename__ = "tax_discrepancies"
+    order_id = Column(String, primary_key=True)
+    order_created_at = Column(DateTime)
+    expected_tax = Column(Float)
+    reported_tax = Column(Float, nullable=True)
+    expected_total = Column(Float)
+    reported_total = Column(Float, nullable=True)
+    detected_at = Column(DateTime, default=datetime.utcnow)
+
+class OrderArchive(Base):
+    """One monthly archive table of served orders (see app/archive.py)"""
+    __tablename__ = "order_archives"
+    month = Column(String, primary_key=True)  # YYYY_MM of the orders' created_at
+    table_name = Column(String)
+    order_count = Column(Integer, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class MomoTransaction(Base):
+    __tablename__ = "momo_transactions"
+    id = Column(String, primary_key=True)  # UUID handed to the POS
+    adapter = Column(String)  # Integration that carries the request (simulator, ...)
+    provider = Column(String)  # Network: mtn, vodafone, airteltigo
+    phone = Column(String)
+    amount = Column(Float)
+    status = Column(String, default="PENDING")  # PENDING, SUCCESS, FAILED, EXPIRED
+    provider_reference = Column(String, nullable=True)
+    failure_reason = Column(String, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    expires_at = Column(DateTime)
+
+# --- Indexes for hot query paths ---
+
+def open_kitchen_orders_filter():
+    """WHERE clause for orders still on the Kitchen Display.
+
+    Rendered with literal values so SQLite can match it against the partial
+    index below (bound parameters never match a partial index predicate).
+    """
+    return Order.kitchen_status.in_(
+        bindparam("open_kitchen_statuses", OPEN_KITCHEN_STATUSES, expanding=True, literal_execute=True)
+    )
+
+_open_orders_predicate = Order.kitchen_status.in_(OPEN_KITCHEN_STATUSES)
+
+# Kitchen poll: open orders oldest first. Only open orders are indexed, so the
+# index stays small no matter how many served orders accumulate.
+Index(
+    "ix_orders_open_kitchen_created_at", Order.created_at,
+    sqlite_where=_open_orders_predicate, postgresql_where=_open_orders_predicate
+)
+
+# Incremental kitchen polls (?since=)
+Index("ix_orders_updated_at", Order.updated_at)
+
+# Archival picks the oldest orders first
+Index("ix_orders_created_at", Order.created_at)
+
+# Shift close-out: one covering index scan per shift
+Index(
+    "ix_orders_shift_close_out", Order.shift_id, Order.payment_method, Order.status,
+    Order.total_amount, Order.amount_tendered, Order.change_due
+)
+
+# Active shift lookup and per-user shift history
+Index("ix_shifts_user_active", Shift.user_id, Shift.is_active)
+Index("ix_shifts_user_start_time", Shift.user_id, Shift.start_time)
+Index("ix_shifts_start_time", Shift.start_time)
+
+# Sales by product over a time window ("top sellers this week")
+Index("ix_order_items_created_product", OrderItem.created_at, OrderItem.product_id, OrderItem.quantity)
+
+# Per-product inventory history
+Index("ix_inventory_logs_product_timestamp", InventoryLog.product_id, InventoryLog.timestamp)
+
+# Ledger rows by time across products (snapshot compaction)
+Index("ix_inventory_logs_timestamp", InventoryLog.timestamp)
+
+# Tax discrepancies by order date
+Index("ix_tax_discrepancies_order_created_at", TaxDiscrepancy.order_created_at)
+
+# Sweep of pending MoMo payments whose approval window has passed
+Index("ix_momo_transactions_status_expires", MomoTransaction.status, MomoTransaction.expires_at)
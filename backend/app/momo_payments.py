@@ -0,0 +1,205 @@
+"""Mobile Money payment lifecycle.
+
+Transactions live in `momo_transactions`, so they survive restarts and every
+worker sees the same state. A MomoAdapter talks to the payment provider; its
+result arrives later through `apply_update` (from a provider callback, or
+from the simulator). Status changes are published on the "momo" event topic
+so waiting clients are answered immediately.
+"""
+import asyncio
+import uuid
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta
+from typing import Dict, NamedTuple, Optional, Type
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from app import config, models
+from app.database import AsyncSessionLocal
+from app.events import hub
+from app.momo_state import TransactionStateStore
+
+PENDING = "PENDING"
+SUCCESS = "SUCCESS"
+FAILED = "FAILED"
+EXPIRED = "EXPIRED"
+FINAL_STATUSES = {SUCCESS, FAILED, EXPIRED}
+
+TOPIC = "momo"
+state = TransactionStateStore(config.MOMO_STATE_MAX_ENTRIES, config.MOMO_STATE_TTL_SECONDS)
+# A waiter re-reads the row this often, to catch updates made by another worker
+RECHECK_SECONDS = 2.0
+
+class CallbackUpdate(NamedTuple):
+    transaction_id: str
+    status: str
+    reference: Optional[str] = None
+    reason: Optional[str] = None
+
+class MomoAdapter(ABC):
+    """Interface to a Mobile Money provider"""
+    name = ""
+
+    @abstractmethod
+    async def request_payment(self, transaction: models.MomoTransaction) -> Optional[str]:
+        """Send the approval prompt to the customer's phone. Returns the
+        provider's reference, if it issues one up front."""
+
+    @abstractmethod
+    def parse_callback(self, payload: dict) -> CallbackUpdate:
+        """Translate a provider callback body into a status update"""
+
+class SimulatorAdapter(MomoAdapter):
+    """Local stand-in: every request is approved after a short delay"""
+    name = "simulator"
+
+    def __init__(self, delay_seconds: float = None):
+        self.delay = config.MOMO_SIMULATOR_DELAY_SECONDS if delay_seconds is None else delay_seconds
+        self._tasks = set()
+
+    async def request_payment(self, transaction: models.MomoTransaction) -> Optional[str]:
+        reference = f"SIM-{uuid.uuid4().hex[:10].upper()}"
+        task = asyncio.create_task(self._approve_later(transaction.id, reference))
+        # Keep a reference so the task is not garbage collected mid-sleep
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return reference
+
+    async def _approve_later(self, transaction_id: str, reference: str):
+        await asyncio.sleep(self.delay)
+        if await apply_update(CallbackUpdate(transaction_id, SUCCESS, reference)):
+            print(f"Mock MoMo: Transaction {transaction_id} approved by user.")
+
+    def parse_callback(self, payload: dict) -> CallbackUpdate:
+        return CallbackUpdate(
+            transaction_id=payload["transaction_id"],
+            status=str(payload["status"]).upper(),
+            reference=payload.get("reference"),
+            reason=payload.get("reason"),
+        )
+
+ADAPTERS: Dict[str, Type[MomoAdapter]] = {
+    SimulatorAdapter.name: SimulatorAdapter,
+}
+_adapters: Dict[str, MomoAdapter] = {}
+
+def get_adapter(name: Optional[str] = None) -> MomoAdapter:
+    name = name or config.MOMO_ADAPTER
+    if name not in _adapters:
+        if name not in ADAPTERS:
+            raise KeyError(f"Unknown MoMo adapter: {name}")
+        _adapters[name] = ADAPTERS[name]()
+    return _adapters[name]
+
+def _publish(transaction_id: str, status: str):
+    state.put(transaction_id, status)
+    hub.publish(TOPIC, "status", {"transaction_id": transaction_id, "status": status})
+
+async def create_transaction(db: AsyncSession, amount: float, phone: str, provider: str) -> models.MomoTransaction:
+    adapter = get_adapter()
+    now = datetime.utcnow()
+    transaction = models.MomoTransaction(
+        id=str(uuid.uuid4()), adapter=adapter.name, provider=provider, phone=phone, amount=amount,
+        status=PENDING, created_at=now, updated_at=now,
+        expires_at=now + timedelta(seconds=config.MOMO_PAYMENT_TIMEOUT_SECONDS),
+    )
+    db.add(transaction)
+    # Commit before contacting the provider, so its callback always finds the row
+    await db.commit()
+    state.put(transaction.id, PENDING)
+    reference = await adapter.request_payment(transaction)
+    if reference:
+        transaction.provider_reference = reference
+        await db.commit()
+    return transaction
+
+async def apply_update(change: CallbackUpdate) -> bool:
+    """Move a pending transaction to its final status. Returns False if it
+    was unknown or already final (callbacks may be delivered twice)."""
+    if change.status not in FINAL_STATUSES:
+        raise ValueError(f"Invalid MoMo status: {change.status}")
+    values = {"status": change.status, "updated_at": datetime.utcnow()}
+    if change.reference:
+        values["provider_reference"] = change.reference
+    if change.reason:
+        values["failure_reason"] = change.reason
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            update(models.MomoTransaction)
+            .where(models.MomoTransaction.id == change.transaction_id, models.MomoTransaction.status == PENDING)
+            .values(**values)
+        )
+        await db.commit()
+    if result.rowcount:
+        _publish(change.transaction_id, change.status)
+    return bool(result.rowcount)
+
+async def get_status(db: AsyncSession, transaction_id: str) -> Optional[str]:
+    cached = state.get(transaction_id)
+    if cached in FINAL_STATUSES:
+        return cached
+    status = await db.scalar(
+        select(models.MomoTransaction.status).where(models.MomoTransaction.id == transaction_id)
+    )
+    if status is not None:
+        state.put(transaction_id, status)
+    return status
+
+async def wait_for_status(db: AsyncSession, transaction_id: str, timeout: float) -> Optional[str]:
+    """Current status, waiting up to `timeout` seconds for a pending payment to finish"""
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    # Subscribe before reading, so an update between the two is not missed
+    with hub.subscribe(TOPIC) as subscription:
+        while True:
+            status = await get_status(db, transaction_id)
+            # End the read so the next check sees other workers' commits
+            await db.commit()
+            remaining = deadline - loop.time()
+            if status != PENDING or remaining <= 0:
+                return status
+            recheck_at = loop.time() + min(remaining, RECHECK_SECONDS)
+            while loop.time() < recheck_at:
+                try:
+                    event = await subscription.get(timeout=recheck_at - loop.time())
+                except asyncio.TimeoutError:
+                    break
+                if event["data"]["transaction_id"] == transaction_id:
+                    return event["data"]["status"]
+            if subscription.overflowed:
+                subscription.reset()
+
+async def sweep_expired() -> int:
+    """Mark pending transactions past their approval window as EXPIRED"""
+    now = datetime.utcnow()
+    async with AsyncSessionLocal() as db:
+        expired = (await db.scalars(
+            select(models.MomoTransaction.id)
+            .where(models.MomoTransaction.status == PENDING, models.MomoTransaction.expires_at < now)
+        )).all()
+        state.expire()
+        if not expired:
+            return 0
+        await db.execute(
+            update(models.MomoTransaction)
+            .where(models.MomoTransaction.id.in_(expired), models.MomoTransaction.status == PENDING)
+            .values(status=EXPIRED, failure_reason="Approval timed out", updated_at=now)
+        )
+        # Some may have been paid in the meantime; only announce the ones this sweep expired
+        expired = (await db.scalars(
+            select(models.MomoTransaction.id)
+            .where(models.MomoTransaction.id.in_(expired), models.MomoTransaction.status == EXPIRED,
+                   models.MomoTransaction.updated_at == now)
+        )).all()
+        await db.commit()
+    for transaction_id in expired:
+        _publish(transaction_id, EXPIRED)
+    return len(expired)
+
+async def run_sweeper(interval: float = None):
+    interval = interval or config.MOMO_SWEEP_INTERVAL_SECONDS
+    while True:
+        try:
+            await sweep_expired()
+        except Exception as e:
+            print(f"MoMo sweeper error: {e}")
+        await asyncio.sleep(interval)
@@ -0,0 +1,93 @@
+import sys
+import time
+from collections import OrderedDict
+from typing import Optional
+
+FINAL_STATUSES = {"SUCCESS", "FAILED", "EXPIRED"}
+
+class TransactionState:
+    __slots__ = ("status", "expires")
+
+    def __init__(self, status: str, expires: float):
+        self.status = status
+        self.expires = expires
+
+class TransactionStateStore:
+    """Bounded, expiring in-process copy of MoMo transaction statuses.
+
+    A final status never changes, so status checks for finished payments
+    are answered from here without a database read. PENDING entries are
+    only a hint (another worker may have applied the callback) and are
+    re-read from the database by callers.
+
+    Entries live for `ttl_seconds` after their last status change. When
+    full, the oldest finished entry is evicted first, then the oldest
+    pending one. Every operation is O(1): pending and finished entries are
+    kept in two insertion-ordered dicts, so the oldest entries (which expire
+    first) sit at the front.
+    """
+
+    def __init__(self, max_size: int, ttl_seconds: float):
+        self.max_size = max_size
+        self.ttl = ttl_seconds
+        self._pending: "OrderedDict[str, TransactionState]" = OrderedDict()
+        self._final: "OrderedDict[str, TransactionState]" = OrderedDict()
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self):
+        return len(self._pending) + len(self._final)
+
+    def put(self, transaction_id: str, status: str):
+        if self.max_size <= 0:
+            return
+        self._pending.pop(transaction_id, None)
+        self._final.pop(transaction_id, None)
+        bucket = self._final if status in FINAL_STATUSES else self._pending
+        bucket[transaction_id] = TransactionState(status, time.monotonic() + self.ttl)
+        self.expire()
+        while len(self) > self.max_size:
+            (self._final or self._pending).popitem(last=False)
+            self.evictions += 1
+
+    def get(self, transaction_id: str) -> Optional[str]:
+        entry = self._final.get(transaction_id) or self._pending.get(transaction_id)
+        if entry is None:
+            return None
+        if entry.expires < time.monotonic():
+            self._final.pop(transaction_id, None)
+            self._pending.pop(transaction_id, None)
+            self.expirations += 1
+            return None
+        return entry.status
+
+    def expire(self) -> int:
+        """Drop entries past their TTL"""
+        now = time.monotonic()
+        removed = 0
+        for bucket in (self._pending, self._final):
+            while bucket:
+                transaction_id, entry = next(iter(bucket.items()))
+                if entry.expires >= now:
+                    break
+                del bucket[transaction_id]
+                removed += 1
+        self.expirations += removed
+        return removed
+
+    def memory_report(self) -> dict:
+        """Approximate bytes held: the dicts, keys and records"""
+        entries = list(self._pending.items()) + list(self._final.items())
+        total = sys.getsizeof(self._pending) + sys.getsizeof(self._final)
+        total += sum(sys.getsizeof(key) + sys.getsizeof(entry) for key, entry in entries)
+        return {
+            "entries": len(entries),
+            "pending": len(self._pending),
+            "final": len(self._final),
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "approx_bytes": total,
+            "bytes_per_entry": round(total / len(entries)) if entries else 0,
+        }
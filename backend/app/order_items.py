@@ -0,0 +1,106 @@
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Set
+from sqlalchemy import select, insert, func, exists
+from sqlalchemy.engine import Engine
+from app import archive, models
+from app.migrations import backfill_in_batches
+
+BACKFILL_BATCH_SIZE = 500
+
+# Terminals have sent line items under a few different keys over time
+def item_product_id(item: dict) -> Optional[int]:
+    for key in ("product_id", "productId", "id"):
+        value = item.get(key)
+        if value:
+            try:
+                return int(value)
+            except (TypeError, ValueError):
+                return None
+    return None
+
+def item_quantity(item: dict) -> int:
+    return item.get("quantity", 1)
+
+def item_unit_price(item: dict) -> float:
+    return float(item.get("price") or item.get("unit_price") or 0.0)
+
+def item_tax(item: dict) -> float:
+    return float(item.get("tax_amount") or item.get("taxAmount") or 0.0)
+
+def build_order_item_rows(
+    order_id: str,
+    created_at: datetime,
+    items: List[dict],
+    total_tax: Optional[float],
+    known_products: Set[int],
+) -> List[Dict[str, Any]]:
+    """order_items rows for one order's items_json.
+
+    The POS computes tax on the order subtotal and sends 0 per line, so when
+    no line carries tax the order's total_tax is spread by line value.
+    """
+    rows = []
+    for item in items or []:
+        product_id = item_product_id(item)
+        rows.append({
+            "order_id": order_id,
+            "product_id": product_id if product_id in known_products else None,
+            "name": item.get("name"),
+            "quantity": item_quantity(item),
+            "unit_price": item_unit_price(item),
+            "tax_amount": item_tax(item),
+            "created_at": created_at,
+        })
+
+    subtotal = sum(r["unit_price"] * r["quantity"] for r in rows)
+    if total_tax and subtotal and not any(r["tax_amount"] for r in rows):
+        for r in rows:
+            r["tax_amount"] = total_tax * r["unit_price"] * r["quantity"] / subtotal
+    return rows
+
+def top_sellers_query(start: datetime, end: Optional[datetime] = None, limit: int = 10):
+    quantity = func.sum(models.OrderItem.quantity).label("quantity")
+    query = (
+        select(models.OrderItem.product_id, quantity)
+        .where(models.OrderItem.created_at >= start, models.OrderItem.product_id.is_not(None))
+        .group_by(models.OrderItem.product_id)
+        .order_by(quantity.desc())
+        .limit(limit)
+    )
+    if end is not None:
+        query = query.where(models.OrderItem.created_at < end)
+    return query
+
+def backfill_order_items(engine: Engine, batch_size: int = BACKFILL_BATCH_SIZE, log=print) -> int:
+    """Normalize items_json of orders that have no order_items rows yet.
+
+    Walks orders, then each archive table, by primary key in short
+    transactions, so it can run against a live database and resume where
+    it stopped.
+    """
+    with engine.connect() as conn:
+        known_products = set(conn.execute(select(models.Product.id)).scalars())
+        tables = archive.order_tables(conn)
+
+    def select_batch(orders):
+        def select_rows(conn, after_key, limit):
+            query = (
+                select(orders.c.id, orders.c.created_at, orders.c.items_json, orders.c.total_tax)
+                .where(~exists().where(models.OrderItem.order_id == orders.c.id))
+                .order_by(orders.c.id)
+                .limit(limit)
+            )
+            if after_key is not None:
+                query = query.where(orders.c.id > after_key)
+            return conn.execute(query).fetchall()
+        return select_rows
+
+    def apply_batch(conn, rows):
+        item_rows = []
+        for order_id, created_at, items, total_tax in rows:
+            item_rows.extend(build_order_item_rows(order_id, created_at, items, total_tax, known_products))
+        if item_rows:
+            conn.execute(insert(models.OrderItem), item_rows)
+        log(f"Backfilled {len(rows)} orders up to {rows[-1][0]}")
+
+    return sum(backfill_in_batches(engine, select_batch(orders), apply_batch, batch_size) for orders in tables)
@@ -0,0 +1,59 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Tuple
+from passlib.context import CryptContext
+from app import config
+
+class HasherBusy(RuntimeError):
+    """Too many hash operations are already queued; the caller should retry later"""
+
+def make_context(rounds: int) -> CryptContext:
+    # min == max == default: any hash made with other rounds is flagged for rehash
+    return CryptContext(
+        schemes=["pbkdf2_sha256"], deprecated="auto",
+        pbkdf2_sha256__default_rounds=rounds,
+        pbkdf2_sha256__min_rounds=rounds,
+        pbkdf2_sha256__max_rounds=rounds,
+    )
+
+class PasswordHasher:
+    """Runs PBKDF2 hashing and verification off the event loop.
+
+    Work goes to a fixed pool of threads (hashlib releases the GIL while
+    hashing, so they run in parallel). At most `max_pending` operations may
+    be running or queued; beyond that callers get HasherBusy right away
+    instead of piling up behind a login storm. `workers=0` hashes inline.
+    """
+
+    def __init__(self, rounds: int, workers: int, max_pending: int):
+        self.context = make_context(rounds)
+        self.max_pending = max_pending
+        self.pending = 0
+        self.rejected = 0
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password-hash") if workers > 0 else None
+
+    async def _run(self, fn, *args):
+        if self._executor is None:
+            return fn(*args)
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise HasherBusy("Password hashing queue is full")
+        self.pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+        finally:
+            self.pending -= 1
+
+    async def hash(self, password: str) -> str:
+        return await self._run(self.context.hash, password)
+
+    async def verify(self, password: str, hashed: str) -> bool:
+        return await self._run(self.context.verify, password, hashed)
+
+    async def verify_and_update(self, password: str, hashed: str) -> Tuple[bool, Optional[str]]:
+        """(valid, new_hash); new_hash is set when the stored hash uses old parameters"""
+        return await self._run(self.context.verify_and_update, password, hashed)
+
+password_hasher = PasswordHasher(
+    config.PASSWORD_HASH_ROUNDS, config.PASSWORD_HASH_WORKERS, config.PASSWORD_HASH_MAX_PENDING
+)
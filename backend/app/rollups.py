@@ -0,0 +1,194 @@
+"""Pre-aggregated sales rollups for the /reports endpoints.
+
+sync_orders adds each accepted batch to the rollups in the same
+transaction as the orders, so reports never scan `orders`. The rollups
+can be rebuilt from scratch with rebuild_rollups.py.
+"""
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional
+from sqlalchemy import select, delete
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import Engine
+from app import archive, models
+
+UNCATEGORIZED = "Uncategorized"
+REBUILD_BATCH_SIZE = 5000
+# Orders changed this close to the start of a rebuild are re-checked at the end
+REBUILD_OVERLAP = timedelta(minutes=5)
+
+def hour_bucket(moment: datetime) -> datetime:
+    return moment.replace(minute=0, second=0, microsecond=0)
+
+def counts_in_rollups(status: Optional[str]) -> bool:
+    return status != "void"
+
+class RollupDelta:
+    """Increments for one batch of orders, applied with a single upsert per table"""
+
+    def __init__(self):
+        self.hourly = defaultdict(lambda: [0, 0.0, 0.0])
+        self.category = defaultdict(lambda: [0, 0.0, 0.0])
+
+    def add_order(self, created_at: datetime, payment_method: str, total_amount, total_tax):
+        bucket = self.hourly[(hour_bucket(created_at), payment_method or "unknown")]
+        bucket[0] += 1
+        bucket[1] += total_amount or 0.0
+        bucket[2] += total_tax or 0.0
+
+    def add_item(self, created_at: datetime, category: Optional[str], quantity, unit_price, tax_amount):
+        bucket = self.category[(created_at.date(), category or UNCATEGORIZED)]
+        bucket[0] += quantity or 0
+        bucket[1] += (unit_price or 0.0) * (quantity or 0)
+        bucket[2] += tax_amount or 0.0
+
+    def __bool__(self):
+        return bool(self.hourly or self.category)
+
+    def apply(self, conn):
+        """Add this delta to the rollup tables (conn may be a Session or Connection).
+
+        Rows are upserted in key order, so concurrent syncs lock shared
+        rollup rows in the same order and cannot deadlock each other.
+        """
+        if self.hourly:
+            _upsert_add(conn, models.SalesHourly.__table__, ["bucket_start", "payment_method"], [
+                {"bucket_start": k[0], "payment_method": k[1],
+                 "order_count": v[0], "gross_total": v[1], "tax_total": v[2]}
+                for k, v in sorted(self.hourly.items())
+            ])
+        if self.category:
+            _upsert_add(conn, models.CategorySalesDaily.__table__, ["day", "category"], [
+                {"day": k[0], "category": k[1],
+                 "quantity": v[0], "net_sales": v[1], "tax_total": v[2]}
+                for k, v in sorted(self.category.items())
+            ])
+
+def _upsert_add(conn, table, key_columns: List[str], rows: List[dict]):
+    dialect = conn.get_bind().dialect.name if hasattr(conn, "get_bind") else conn.dialect.name
+    insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+    stmt = insert(table)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=key_columns,
+        set_={
+            name: table.c[name] + stmt.excluded[name]
+            for name in rows[0] if name not in key_columns
+        },
+    )
+    conn.execute(stmt, rows)
+
+def delta_for_orders(orders: Iterable, item_rows: Iterable[dict], categories: Dict[int, str]) -> RollupDelta:
+    """Rollup increments for orders being ingested by sync_orders"""
+    delta = RollupDelta()
+    counted = set()
+    for order in orders:
+        if counts_in_rollups(order.status):
+            counted.add(order.id)
+            delta.add_order(order.created_at, order.payment_method, order.total_amount, order.total_tax)
+    for row in item_rows:
+        if row["order_id"] in counted:
+            delta.add_item(
+                row["created_at"], categories.get(row["product_id"]),
+                row["quantity"], row["unit_price"], row["tax_amount"]
+            )
+    return delta
+
+# --- Rebuild ---
+
+def _order_stream(conn, orders, after_key, limit):
+    query = (
+        select(orders.c.id, orders.c.created_at, orders.c.payment_method, orders.c.total_amount,
+               orders.c.total_tax, orders.c.status, orders.c.updated_at)
+        .order_by(orders.c.id)
+        .limit(limit)
+    )
+    if after_key is not None:
+        query = query.where(orders.c.id > after_key)
+    return conn.execute(query).fetchall()
+
+def _items_for(conn, order_ids: List[str]):
+    items = models.OrderItem.__table__
+    return conn.execute(
+        select(items.c.order_id, items.c.created_at, models.Product.category,
+               items.c.quantity, items.c.unit_price, items.c.tax_amount)
+        .outerjoin(models.Product, models.Product.id == items.c.product_id)
+        .where(items.c.order_id.in_(order_ids))
+    ).fetchall()
+
+def _add_batch(conn, delta: RollupDelta, rows) -> None:
+    counted = [r.id for r in rows if counts_in_rollups(r.status)]
+    for r in rows:
+        if counts_in_rollups(r.status):
+            delta.add_order(r.created_at, r.payment_method, r.total_amount, r.total_tax)
+    for start in range(0, len(counted), 500):
+        for item in _items_for(conn, counted[start:start + 500]):
+            delta.add_item(item.created_at, item.category, item.quantity, item.unit_price, item.tax_amount)
+
+def rebuild_rollups(engine: Engine, batch_size: int = REBUILD_BATCH_SIZE, log=print) -> int:
+    """Recompute every rollup from orders and order_items.
+
+    Orders, archived ones included, are streamed in keyset batches without
+    holding a write lock.
+    The final short transaction swaps the rollups in and folds in any order
+    that was synced while the scan ran, so live ingestion can continue.
+    Run backfill_order_items.py first so category rollups see every order.
+    """
+    started = datetime.utcnow()
+    horizon = started - REBUILD_OVERLAP
+    delta = RollupDelta()
+    recent_seen = set()
+    total = 0
+    with engine.connect() as conn:
+        # Archived orders count too; an order moved mid-scan may be read twice
+        # or not at all, so avoid rebuilding while the archiver is running
+        for table in archive.order_tables(conn):
+            after_key = None
+            while True:
+                rows = _order_stream(conn, table, after_key, batch_size)
+                conn.rollback()  # Don't pin an old snapshot between batches
+                if not rows:
+                    break
+                _add_batch(conn, delta, rows)
+                recent_seen.update(r.id for r in rows if r.updated_at and r.updated_at >= horizon)
+                total += len(rows)
+                after_key = rows[-1].id
+                log(f"Scanned {total} orders")
+
+    with engine.begin() as conn:
+        # Take the write lock before looking for late orders, so a sync that
+        # commits after this point adds to the rebuilt rollups instead
+        if conn.dialect.name == "postgresql":
+            conn.exec_driver_sql("LOCK TABLE sales_hourly, sales_category_daily IN EXCLUSIVE MODE")
+        conn.execute(delete(models.SalesHourly))
+        conn.execute(delete(models.CategorySalesDaily))
+        orders = models.Order.__table__
+        late = conn.execute(
+            select(orders.c.id, orders.c.created_at, orders.c.payment_method, orders.c.total_amount,
+                   orders.c.total_tax, orders.c.status, orders.c.updated_at)
+            .where(orders.c.updated_at >= horizon)
+        ).fetchall()
+        late = [r for r in late if r.id not in recent_seen]
+        if late:
+            _add_batch(conn, delta, late)
+            total += len(late)
+        if delta:
+            delta.apply(conn)
+    return total
+
+# --- Queries ---
+
+def sales_query(start: datetime, end: datetime):
+    hourly = models.SalesHourly.__table__
+    return (
+        select(hourly.c.bucket_start, hourly.c.payment_method, hourly.c.order_count,
+               hourly.c.gross_total, hourly.c.tax_total)
+        .where(models.SalesHourly.bucket_start >= start, models.SalesHourly.bucket_start < end)
+        .order_by(models.SalesHourly.bucket_start)
+    )
+
+def category_query(start: datetime, end: datetime):
+    daily = models.CategorySalesDaily.__table__
+    return (
+        select(daily.c.category, daily.c.quantity, daily.c.net_sales, daily.c.tax_total)
+        .where(models.CategorySalesDaily.day >= start.date(), models.CategorySalesDaily.day < end.date())
+    )
@@ -0,0 +1,139 @@
+"""Ghana tax rules. Mirrors frontend/src/modules/TaxEngine.ts.
+
+`calculate_ghana_tax` follows `calculateGhanaTax` step for step in Decimal
+arithmetic and rounds each figure to the pesewa (half up).
+`verify_order_taxes` recomputes a whole batch of orders at once and
+returns the ones whose reported totals disagree.
+"""
+from decimal import Decimal, ROUND_HALF_UP
+from typing import Iterable, List, NamedTuple, Optional, Tuple
+from app.order_items import item_quantity, item_unit_price
+
+TAX_RATES = {
+    # Standard Ghana Statutory Levies (2025)
+    "NHIL": 0.025,    # 2.5% National Health Insurance Levy
+    "GETFund": 0.025, # 2.5% GETFund Levy
+    "COVID": 0.01,    # 1% COVID-19 Health Recovery Levy
+    "VAT": 0.15,      # 15% Value Added Tax (Calculated on [Base + Levies])
+}
+
+PESEWA = Decimal("0.01")
+# Terminals compute in floating point and do not round, so a reported total
+# within a pesewa of the exact figure is accepted
+TAX_TOLERANCE = Decimal("0.01")
+
+_RATES = {name: Decimal(str(rate)) for name, rate in TAX_RATES.items()}
+_LEVY_RATE = _RATES["NHIL"] + _RATES["GETFund"] + _RATES["COVID"]
+# Levies plus VAT on (base + levies), folded into one multiplier of the base.
+# Exact in Decimal, so it agrees with calculate_ghana_tax to the last digit.
+TOTAL_TAX_RATE = _LEVY_RATE + (1 + _LEVY_RATE) * _RATES["VAT"]
+GRAND_TOTAL_RATE = 1 + TOTAL_TAX_RATE
+
+class TaxBreakdown(NamedTuple):
+    base_amount: Decimal
+    nhil: Decimal
+    getfund: Decimal
+    covid: Decimal
+    vatable_amount: Decimal
+    vat: Decimal
+    total_tax: Decimal
+    grand_total: Decimal
+
+class TaxMismatch(NamedTuple):
+    order_id: str
+    expected_tax: Decimal
+    reported_tax: Optional[float]
+    expected_total: Decimal
+    reported_total: Optional[float]
+
+def to_decimal(amount) -> Decimal:
+    # Floats go through their shortest repr, so 45.1 is 45.1 and not 45.0999...
+    return amount if isinstance(amount, Decimal) else Decimal(str(amount))
+
+def to_pesewas(amount: Decimal) -> Decimal:
+    return amount.quantize(PESEWA, rounding=ROUND_HALF_UP)
+
+def calculate_ghana_tax(base_amount) -> TaxBreakdown:
+    base = to_decimal(base_amount)
+    nhil = base * _RATES["NHIL"]
+    getfund = base * _RATES["GETFund"]
+    covid = base * _RATES["COVID"]
+
+    levies = nhil + getfund + covid
+    vatable_amount = base + levies
+
+    vat = vatable_amount * _RATES["VAT"]
+
+    return TaxBreakdown(*(to_pesewas(value) for value in (
+        base, nhil, getfund, covid, vatable_amount, vat, levies + vat, base + levies + vat
+    )))
+
+def split_tax(total_tax) -> dict:
+    """Split collected tax into its statutory components.
+
+    Only each order's total_tax is stored, so the levies are taken in
+    their statutory proportion and rounded to the pesewa; VAT gets the
+    remainder, so the components always add up to `total_tax`.
+    """
+    tax = to_pesewas(to_decimal(total_tax))
+    base = tax / TOTAL_TAX_RATE
+    levies = {name: to_pesewas(base * _RATES[rate]) for name, rate in (("nhil", "NHIL"), ("getfund", "GETFund"), ("covid", "COVID"))}
+    return {**{name: float(value) for name, value in levies.items()}, "vat": float(tax - sum(levies.values()))}
+
+def _off_by_more_than_tolerance(reported, expected: Decimal) -> bool:
+    return reported is None or abs(to_decimal(reported) - expected) > TAX_TOLERANCE
+
+def _pesewa_price(price: float) -> Optional[int]:
+    # Whole-pesewa prices (nearly all of them) are summed as integers
+    exact = to_decimal(price) / PESEWA
+    return int(exact) if exact == exact.to_integral_value() else None
+
+def _expected_pesewas(base: int, rate: Tuple[int, int]) -> int:
+    # round-half-up of base * numerator / denominator, in integers
+    numerator, denominator = rate
+    return (2 * base * numerator + denominator) // (2 * denominator)
+
+def verify_order_taxes(orders: Iterable[tuple]) -> List[TaxMismatch]:
+    """Recompute tax for many orders in one pass.
+
+    `orders` yields (order_id, items, total_amount, total_tax) with items in
+    the terminal's items_json form. Each distinct price is converted once;
+    subtotals are exact integer pesewas and tax is one integer multiply by
+    TOTAL_TAX_RATE, which gives the same figures as calculate_ghana_tax.
+    Orders with fractional-pesewa prices fall back to Decimal. Returns the
+    orders whose total_tax or total_amount is off.
+    """
+    prices = {}
+    tax_rate = TOTAL_TAX_RATE.as_integer_ratio()
+    total_rate = GRAND_TOTAL_RATE.as_integer_ratio()
+    tolerance = int(TAX_TOLERANCE / PESEWA)
+    mismatches = []
+    for order_id, items, total_amount, total_tax in orders:
+        base = 0
+        for item in items or ():
+            price = item_unit_price(item)
+            try:
+                pesewas = prices[price]
+            except KeyError:
+                pesewas = prices[price] = _pesewa_price(price)
+            if pesewas is None:
+                break
+            base += pesewas * item_quantity(item)
+        else:
+            expected_tax = _expected_pesewas(base, tax_rate)
+            expected_total = _expected_pesewas(base, total_rate)
+            if (total_tax is None or total_amount is None
+                    or abs(total_tax * 100 - expected_tax) > tolerance
+                    or abs(total_amount * 100 - expected_total) > tolerance):
+                mismatches.append(TaxMismatch(
+                    order_id, expected_tax * PESEWA, total_tax, expected_total * PESEWA, total_amount
+                ))
+            continue
+
+        exact_base = sum((to_decimal(item_unit_price(item)) * item_quantity(item) for item in items), Decimal(0))
+        expected_tax = to_pesewas(exact_base * TOTAL_TAX_RATE)
+        expected_total = to_pesewas(exact_base * GRAND_TOTAL_RATE)
+        if (_off_by_more_than_tolerance(total_tax, expected_tax)
+                or _off_by_more_than_tolerance(total_amount, expected_total)):
+            mismatches.append(TaxMismatch(order_id, expected_tax, total_tax, expected_total, total_amount))
+    return mismatches
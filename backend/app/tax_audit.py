@@ -0,0 +1,91 @@
+"""Records orders whose reported tax disagrees with the server's tax engine.
+
+sync_orders checks every accepted batch with app.tax.verify_order_taxes in
+the same pass that builds the rows; the check needs no queries, and only
+flagged orders cost a write. Orders that reached the database before the
+check existed are verified with verify_order_tax.py.
+"""
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import Engine
+from app import archive, models
+from app.tax import TaxMismatch, verify_order_taxes
+
+VERIFY_BATCH_SIZE = 5000
+
+def discrepancy_rows(mismatches: List[TaxMismatch], created_at: Dict[str, datetime]) -> List[dict]:
+    now = datetime.utcnow()
+    return [{
+        "order_id": m.order_id,
+        "order_created_at": created_at.get(m.order_id),
+        "expected_tax": float(m.expected_tax),
+        "reported_tax": m.reported_tax,
+        "expected_total": float(m.expected_total),
+        "reported_total": m.reported_total,
+        "detected_at": now,
+    } for m in mismatches]
+
+def record_discrepancies(conn, rows: List[dict]):
+    """Upsert flagged orders (conn may be a Session or Connection); re-checks refresh the row"""
+    if not rows:
+        return
+    dialect = conn.get_bind().dialect.name if hasattr(conn, "get_bind") else conn.dialect.name
+    insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+    stmt = insert(models.TaxDiscrepancy.__table__)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["order_id"],
+        set_={name: stmt.excluded[name] for name in rows[0] if name != "order_id"},
+    )
+    conn.execute(stmt, rows)
+
+def verify_stored_orders(
+    engine: Engine,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    batch_size: int = VERIFY_BATCH_SIZE,
+    log=print,
+) -> Tuple[int, int]:
+    """Check historical orders, archived ones included, in keyset batches.
+
+    Returns (checked, flagged).
+    """
+    with engine.connect() as conn:
+        tables = archive.order_tables(conn)
+
+    checked = flagged = 0
+    for orders in tables:
+        query = select(orders.c.id, orders.c.created_at, orders.c.items_json, orders.c.total_amount, orders.c.total_tax)
+        if start is not None:
+            query = query.where(orders.c.created_at >= start)
+        if end is not None:
+            query = query.where(orders.c.created_at < end)
+
+        after_key = None
+        while True:
+            with engine.begin() as conn:
+                batch = query.order_by(orders.c.id).limit(batch_size)
+                if after_key is not None:
+                    batch = batch.where(orders.c.id > after_key)
+                rows = conn.execute(batch).all()
+                if not rows:
+                    break
+                mismatches = verify_order_taxes(
+                    (r.id, r.items_json, r.total_amount, r.total_tax) for r in rows
+                )
+                record_discrepancies(conn, discrepancy_rows(mismatches, {r.id: r.created_at for r in rows}))
+            checked += len(rows)
+            flagged += len(mismatches)
+            after_key = rows[-1].id
+            log(f"Checked {checked} orders, {flagged} flagged")
+    return checked, flagged
+
+def discrepancies_query(start: datetime, end: datetime, limit: int):
+    table = models.TaxDiscrepancy.__table__
+    return (
+        select(table)
+        .where(table.c.order_created_at >= start, table.c.order_created_at < end)
+        .order_by(table.c.order_created_at.desc())
+        .limit(limit)
+    )
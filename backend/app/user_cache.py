@@ -0,0 +1,66 @@
+import time
+from collections import OrderedDict
+from typing import Optional
+from sqlalchemy.orm import make_transient_to_detached
+from app import config, models
+
+class UserCache:
+    """Bounded TTL cache of authenticated users, keyed by token subject.
+
+    Entries hold column values rather than ORM objects, so nothing is shared
+    between sessions. users.py invalidates an entry whenever it changes the
+    user; the TTL bounds staleness for changes made by other workers.
+    """
+
+    def __init__(self, max_size: int, ttl_seconds: float):
+        self.max_size = max_size
+        self.ttl = ttl_seconds
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, subject: str) -> Optional[models.User]:
+        entry = self._entries.get(subject)
+        if entry is None or entry[0] < time.monotonic():
+            if entry is not None:
+                del self._entries[subject]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(subject)
+        self.hits += 1
+        user = models.User(**entry[1])
+        # Give it an identity so Session.merge(load=False) can attach it without a query
+        make_transient_to_detached(user)
+        return user
+
+    def put(self, subject: str, user: models.User):
+        if self.max_size <= 0 or self.ttl <= 0:
+            return
+        values = {column.key: getattr(user, column.key) for column in models.User.__table__.columns}
+        self._entries[subject] = (time.monotonic() + self.ttl, values)
+        self._entries.move_to_end(subject)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, *subjects: str):
+        for subject in subjects:
+            self._entries.pop(subject, None)
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+user_cache = UserCache(config.USER_CACHE_SIZE, config.USER_CACHE_TTL_SECONDS)
@@ -0,0 +1,17 @@
+import sys
+import os
+
+# Add backend to path
+sys.path.append(os.getcwd())
+
+from app import config
+from app.database import engine
+from app.archive import archive_orders
+
+if __name__ == "__main__":
+    # Optional age in days; defaults to ARCHIVE_AFTER_DAYS
+    days = int(sys.argv[1]) if len(sys.argv) > 1 else config.ARCHIVE_AFTER_DAYS
+    print(f"--- Archiving served orders older than {days} days "
+          f"(at most {config.ARCHIVE_MAX_ROWS_PER_SECOND} orders/s) ---")
+    total = archive_orders(engine, older_than_days=days)
+    print(f"SUCCESS: {total} orders moved to the monthly archive tables.")
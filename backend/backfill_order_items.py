@@ -0,0 +1,14 @@
+import sys
+import os
+
+# Add backend to path
+sys.path.append(os.getcwd())
+
+from app.database import engine
+from app.order_items import backfill_order_items, BACKFILL_BATCH_SIZE
+
+if __name__ == "__main__":
+    batch_size = int(sys.argv[1]) if len(sys.argv) > 1 else BACKFILL_BATCH_SIZE
+    print(f"--- Normalizing items_json into order_items (batches of {batch_size}) ---")
+    total = backfill_order_items(engine, batch_size=batch_size)
+    print(f"SUCCESS: {total} orders backfilled.")
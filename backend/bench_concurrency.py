@@ -0,0 +1,97 @@
+import sys
+import os
+import time
+import uuid
+import asyncio
+import tempfile
+from datetime import datetime, timedelta
+
+# Add backend to path, then run against a throwaway database
+sys.path.append(os.getcwd())
+os.chdir(tempfile.mkdtemp())
+
+import httpx
+from app.main import app
+from app.database import SessionLocal, engine
+from app import models, catalog, migrations
+from app.api.auth import create_access_token
+
+SYNC_ORDERS = 5000
+POLL_INTERVAL = 0.005
+
+
+def setup():
+    migrations.upgrade(engine, log=lambda message: None)
+    db = SessionLocal()
+    catalog.seed_default_products(db)
+    db.add(models.User(username="kds", email="kds@local", hashed_password="x", role="kitchen"))
+    db.commit()
+    db.close()
+    token = create_access_token({"sub": "kds"}, expires_delta=timedelta(minutes=10))
+    return {"Authorization": f"Bearer {token}"}
+
+
+def make_payload(count):
+    return [{
+        "id": str(uuid.uuid4()),
+        "items": [{"id": 1 + n % 4, "name": "Item", "price": 45.0, "quantity": 1}],
+        "total_amount": 45.0,
+        "total_tax": 9.0,
+        "status": "completed",
+        "payment_method": "cash",
+        "created_at": datetime.utcnow().isoformat(),
+    } for n in range(count)]
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+async def poll(client, headers, stop):
+    latencies = []
+    while not stop.is_set():
+        start = time.perf_counter()
+        response = await client.get("/kitchen/orders", headers=headers)
+        latencies.append(time.perf_counter() - start)
+        assert response.status_code == 200, response.text
+        await asyncio.sleep(POLL_INTERVAL)
+    return latencies
+
+
+async def measure(client, headers, payload):
+    stop = asyncio.Event()
+    poller = asyncio.create_task(poll(client, headers, stop))
+    if payload:
+        start = time.perf_counter()
+        response = await client.post("/sync/orders", json=payload, timeout=None)
+        sync_time = time.perf_counter() - start
+        assert response.status_code == 200, response.text
+    else:
+        await asyncio.sleep(2)
+        sync_time = 0.0
+    stop.set()
+    latencies = await poller
+    return latencies, sync_time
+
+
+def report(label, latencies, sync_time):
+    print(f"{label:14s} polls={len(latencies):5d} "
+          f"p50={percentile(latencies, 50) * 1000:7.1f}ms "
+          f"p99={percentile(latencies, 99) * 1000:7.1f}ms "
+          f"max={max(latencies) * 1000:7.1f}ms sync={sync_time:.2f}s")
+
+
+async def main(count):
+    headers = setup()
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        # Keep a realistic number of open orders on the kitchen screen
+        await client.post("/sync/orders", json=make_payload(50))
+        print(f"--- /kitchen/orders latency while POST /sync/orders uploads {count} orders ---")
+        report("idle", *await measure(client, headers, None))
+        report("during sync", *await measure(client, headers, make_payload(count)))
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else SYNC_ORDERS))
@@ -0,0 +1,99 @@
+import sys
+import os
+import time
+import asyncio
+import tempfile
+import contextlib
+import io
+
+# Add backend to path, then run against a throwaway database
+sys.path.append(os.getcwd())
+os.chdir(tempfile.mkdtemp())
+
+import httpx
+from app.main import app
+from app.database import SessionLocal, engine
+from app import models, config, migrations
+from app.api import auth
+from app.passwords import PasswordHasher, make_context
+
+CASHIERS = 12
+LOGINS_PER_CASHIER = 4
+POLL_INTERVAL = 0.005
+
+
+def setup():
+    migrations.upgrade(engine, log=lambda message: None)
+    # Stored with an older work factor, so the first login of each cashier rehashes
+    old_context = make_context(config.PASSWORD_HASH_ROUNDS // 2)
+    db = SessionLocal()
+    for n in range(CASHIERS):
+        db.add(models.User(
+            username=f"cashier{n}", email=f"cashier{n}@local",
+            hashed_password=old_context.hash(f"pw{n}"), role="cashier"
+        ))
+    db.commit()
+    db.close()
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+async def poll(client, stop):
+    # Cheap requests from other screens while the logins run
+    latencies = []
+    while not stop.is_set():
+        start = time.perf_counter()
+        await client.get("/")
+        latencies.append(time.perf_counter() - start)
+        await asyncio.sleep(POLL_INTERVAL)
+    return latencies
+
+
+async def login(client, n):
+    response = await client.post("/auth/login-json", json={"username": f"cashier{n}", "password": f"pw{n}"})
+    return response.status_code
+
+
+async def storm(label, hasher):
+    auth.password_hasher = hasher
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        stop = asyncio.Event()
+        poller = asyncio.create_task(poll(client, stop))
+        await asyncio.sleep(0.05)
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):  # login handlers print debug lines
+            statuses = await asyncio.gather(*(
+                login(client, n % CASHIERS) for n in range(CASHIERS * LOGINS_PER_CASHIER)
+            ))
+        elapsed = time.perf_counter() - start
+        stop.set()
+        latencies = await poller
+    ok = statuses.count(200)
+    print(f"{label:18s} logins/s={ok / elapsed:7.1f} ok={ok:3d} busy(503)={statuses.count(503):3d} "
+          f"other requests p50={percentile(latencies, 50) * 1000:6.1f}ms max={max(latencies) * 1000:7.1f}ms")
+    return statuses
+
+
+async def main(rounds, workers, total):
+    await storm("inline", PasswordHasher(rounds, 0, total))
+    await storm(f"pool ({workers} threads)", PasswordHasher(rounds, workers, total))
+    statuses = await storm("pool, queue of 8", PasswordHasher(rounds, workers, 8))
+    assert 503 in statuses, "expected backpressure with a short queue"
+
+
+if __name__ == "__main__":
+    setup()
+    rounds = config.PASSWORD_HASH_ROUNDS
+    workers = config.PASSWORD_HASH_WORKERS
+    total = CASHIERS * LOGINS_PER_CASHIER
+    print(f"--- {total} concurrent logins, pbkdf2_sha256 rounds={rounds}, {os.cpu_count()} CPUs ---")
+    asyncio.run(main(rounds, workers, total))
+
+    db = SessionLocal()
+    assert all(u.hashed_password.startswith(f"$pbkdf2-sha256${rounds}$") for u in db.query(models.User))
+    db.close()
+    print("SUCCESS: every stored hash was upgraded to the configured work factor.")
@@ -0,0 +1,106 @@
+import sys
+import os
+import time
+import random
+import asyncio
+import tempfile
+from datetime import datetime, timedelta
+
+# Add backend to path, then run against a throwaway database
+sys.path.append(os.getcwd())
+os.chdir(tempfile.mkdtemp())
+
+import httpx
+from sqlalchemy import insert, select, func
+from app.main import app
+from app.database import SessionLocal, engine
+from app import models, catalog, migrations, rollups
+from app.api.auth import create_access_token
+
+ORDERS = 1_000_000
+BATCH = 10_000
+DAYS = 90
+METHODS = ["cash", "momo", "card"]
+
+
+def populate(count):
+    migrations.upgrade(engine, log=lambda message: None)
+    db = SessionLocal()
+    catalog.seed_default_products(db)
+    db.add(models.User(username="boss", email="boss@local", hashed_password="x", role="admin"))
+    db.commit()
+    db.close()
+
+    rng = random.Random(42)
+    now = datetime.utcnow()
+    with engine.begin() as conn:
+        for start in range(0, count, BATCH):
+            orders, items = [], []
+            for n in range(start, min(count, start + BATCH)):
+                created = now - timedelta(seconds=rng.randrange(DAYS * 86400))
+                product_id = 1 + n % 4
+                quantity = 1 + n % 3
+                orders.append({
+                    "id": f"order-{n:08d}", "total_amount": 45.0 * quantity, "total_tax": 9.0 * quantity,
+                    "status": "completed", "payment_method": METHODS[n % 3], "created_at": created,
+                    "updated_at": created, "items_json": [], "kitchen_status": "served",
+                })
+                items.append({
+                    "order_id": f"order-{n:08d}", "product_id": product_id, "name": "Item",
+                    "quantity": quantity, "unit_price": 45.0, "tax_amount": 9.0 * quantity, "created_at": created,
+                })
+            conn.execute(insert(models.Order), orders)
+            conn.execute(insert(models.OrderItem), items)
+    return {"Authorization": f"Bearer {create_access_token({'sub': 'boss'})}"}
+
+
+def naive_report(start):
+    # What a report costs without rollups: a GROUP BY over every order in range
+    with engine.connect() as conn:
+        return conn.execute(
+            select(func.date(models.Order.created_at), models.Order.payment_method,
+                   func.count(), func.sum(models.Order.total_amount), func.sum(models.Order.total_tax))
+            .where(models.Order.created_at >= start, models.Order.status != "void")
+            .group_by(func.date(models.Order.created_at), models.Order.payment_method)
+        ).fetchall()
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+async def fetch_reports(headers, start):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        # First request pays for app and connection warm-up
+        await client.get("/reports/tax", headers=headers)
+        timings = {}
+        for path in ("/reports/sales", "/reports/payment-methods", "/reports/categories", "/reports/tax"):
+            begin = time.perf_counter()
+            response = await client.get(path, params={"start": start.isoformat()}, headers=headers)
+            timings[path] = time.perf_counter() - begin
+            assert response.status_code == 200, response.text
+        sales = (await client.get("/reports/sales", params={"start": start.isoformat()}, headers=headers)).json()
+    return timings, sales
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else ORDERS
+    print(f"--- Reports over {count} orders spread across {DAYS} days ---")
+    headers, seconds = timed(populate, count)
+    print(f"populate       {seconds:8.2f}s")
+    total, seconds = timed(rollups.rebuild_rollups, engine, rollups.REBUILD_BATCH_SIZE, lambda message: None)
+    print(f"rebuild        {seconds:8.2f}s ({total / seconds:,.0f} orders/s)")
+
+    start = datetime.utcnow() - timedelta(days=DAYS + 1)
+    scan, seconds = timed(naive_report, start)
+    print(f"GROUP BY scan  {seconds * 1000:8.1f}ms")
+    timings, sales = asyncio.run(fetch_reports(headers, start))
+    for path, seconds in timings.items():
+        print(f"{path:24s} {seconds * 1000:8.1f}ms")
+
+    assert sum(bucket["order_count"] for bucket in sales) == count
+    assert abs(sum(bucket["gross_total"] for bucket in sales) - sum(row[3] for row in scan)) < 1.0
+    print("SUCCESS: rollup totals match a full scan of orders.")
@@ -0,0 +1,85 @@
+import sys
+import os
+import time
+import uuid
+import tempfile
+import threading
+from datetime import datetime
+
+# Add backend to path
+sys.path.append(os.getcwd())
+
+from sqlalchemy import select, func
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+from app import models
+from app.database import create_db_engine
+
+WRITERS = 4
+READERS = 8
+DURATION = 5.0
+
+
+def writer(Session, stop, stats):
+    while not stop.is_set():
+        db = Session()
+        try:
+            db.add(models.Order(
+                id=str(uuid.uuid4()), total_amount=45.0, total_tax=9.0, status="completed",
+                payment_method="cash", created_at=datetime.utcnow(), items_json=[]
+            ))
+            db.add(models.InventoryLog(product_id=1, quantity_change=-1, reason="sale"))
+            db.commit()
+            stats["writes"] += 1
+        except OperationalError:
+            db.rollback()
+            stats["write_errors"] += 1
+        finally:
+            db.close()
+
+
+def reader(Session, stop, stats):
+    while not stop.is_set():
+        db = Session()
+        start = time.perf_counter()
+        try:
+            db.execute(
+                select(func.count()).select_from(models.Order)
+                .where(models.Order.kitchen_status.in_(["pending", "preparing", "ready"]))
+            ).scalar()
+            stats["reads"] += 1
+            stats["read_latency"].append(time.perf_counter() - start)
+        except OperationalError:
+            stats["read_errors"] += 1
+        finally:
+            db.close()
+
+
+def run(profile):
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_db_engine(f"sqlite:///{tmp}/load.db", profile=profile)
+        models.Base.metadata.create_all(bind=engine)
+        Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+        stats = {"writes": 0, "reads": 0, "write_errors": 0, "read_errors": 0, "read_latency": []}
+        stop = threading.Event()
+        threads = [threading.Thread(target=writer, args=(Session, stop, stats)) for _ in range(WRITERS)]
+        threads += [threading.Thread(target=reader, args=(Session, stop, stats)) for _ in range(READERS)]
+        for t in threads:
+            t.start()
+        time.sleep(DURATION)
+        stop.set()
+        for t in threads:
+            t.join()
+        engine.dispose()
+
+    latency = sorted(stats["read_latency"]) or [0.0]
+    p99 = latency[min(len(latency) - 1, int(len(latency) * 0.99))]
+    print(f"{profile:10s} writes/s={stats['writes'] / DURATION:8.1f} reads/s={stats['reads'] / DURATION:8.1f} "
+          f"read_p99={p99 * 1000:6.1f}ms locked_errors={stats['write_errors'] + stats['read_errors']}")
+
+
+if __name__ == "__main__":
+    print(f"--- {WRITERS} writers / {READERS} readers for {DURATION:.0f}s per profile ---")
+    for profile in ("default", "production"):
+        run(profile)
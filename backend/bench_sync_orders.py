@@ -0,0 +1,119 @@
+import sys
+import os
+import time
+import uuid
+import tempfile
+from datetime import datetime
+
+# Add backend to path
+sys.path.append(os.getcwd())
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app import models
+from app.api.sync import OrderSchema, ingest_orders
+
+ORDER_COUNT = 2000
+ITEMS_PER_ORDER = 3
+PRODUCT_COUNT = 50
+
+
+def legacy_sync(db, orders):
+    """The original per-row loop from sync_orders, kept for comparison."""
+    synced_count = 0
+    for order_data in orders:
+        existing_order = db.query(models.Order).filter(models.Order.id == order_data.id).first()
+        if existing_order:
+            continue
+
+        db.add(models.Order(
+            id=order_data.id,
+            total_amount=order_data.total_amount,
+            total_tax=order_data.total_tax,
+            status=order_data.status,
+            payment_method=order_data.payment_method,
+            created_at=order_data.created_at,
+            items_json=order_data.items,
+            amount_tendered=order_data.amount_tendered,
+            change_due=order_data.change_due,
+            reference_number=order_data.reference_number
+        ))
+
+        for item in order_data.items:
+            product_id = item.get('id')
+            quantity = item.get('quantity', 1)
+            if product_id:
+                product = db.query(models.Product).filter(models.Product.id == product_id).first()
+                if product:
+                    product.stock_quantity -= quantity
+                    db.add(models.InventoryLog(
+                        product_id=product.id,
+                        quantity_change=-quantity,
+                        reason="sale",
+                        timestamp=order_data.created_at
+                    ))
+        synced_count += 1
+    return synced_count
+
+
+def make_orders(count):
+    orders = []
+    for n in range(count):
+        items = [
+            {"id": (n + i) % PRODUCT_COUNT + 1, "name": "Item", "price": 10.0, "quantity": 1 + i}
+            for i in range(ITEMS_PER_ORDER)
+        ]
+        orders.append(OrderSchema(
+            id=str(uuid.uuid4()),
+            items=items,
+            total_amount=60.0,
+            total_tax=9.0,
+            status="completed",
+            payment_method="cash",
+            created_at=datetime.utcnow(),
+        ))
+    return orders
+
+
+def run(label, sync_fn, orders):
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{tmp}/bench.db")
+        models.Base.metadata.create_all(bind=engine)
+        Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+        db = Session()
+        db.add_all(
+            models.Product(name=f"P{i}", price=10.0, category="Main", tax_group="VAT_standard", stock_quantity=1000)
+            for i in range(PRODUCT_COUNT)
+        )
+        db.commit()
+
+        start = time.perf_counter()
+        synced = sync_fn(db, orders)
+        db.commit()
+        elapsed = time.perf_counter() - start
+
+        # Second pass must be a no-op (idempotency)
+        again = sync_fn(db, orders)
+        db.commit()
+        stock = sum(p.stock_quantity for p in db.query(models.Product))
+        logs = db.query(models.InventoryLog).count()
+        db.close()
+        engine.dispose()
+
+    per_1000 = elapsed / len(orders) * 1000
+    print(f"{label:8s} synced={synced} resync={again} stock={stock} logs={logs} "
+          f"total={elapsed:.3f}s per_1000={per_1000 * 1000:.1f}ms")
+    return per_1000, stock, logs
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else ORDER_COUNT
+    orders = make_orders(count)
+    print(f"--- Syncing {count} orders x {ITEMS_PER_ORDER} items ---")
+    legacy = run("legacy", legacy_sync, orders)
+    bulk = run("bulk", lambda db, batch: len(ingest_orders(db, batch)), orders)
+
+    if legacy[1:] != bulk[1:]:
+        print("FAILED: bulk ingest left different stock/log totals")
+        sys.exit(1)
+    print(f"Speedup: {legacy[0] / bulk[0]:.1f}x")
@@ -0,0 +1,90 @@
+import sys
+import os
+import time
+import random
+import tempfile
+from datetime import datetime, timedelta
+
+# Add backend to path, then run against a throwaway database
+sys.path.append(os.getcwd())
+os.chdir(tempfile.mkdtemp())
+
+from sqlalchemy import insert, select, func
+from app.database import engine
+from app import models, migrations, tax, tax_audit
+
+LINE_ITEMS = 1_000_000
+ITEMS_PER_ORDER = 4
+BATCH = 10_000
+PRICES = [45.0, 30.0, 25.0, 15.0, 12.5, 7.99, 3.5]
+# One order in this many under-reports its tax
+WRONG_EVERY = 997
+
+
+def make_orders(line_items):
+    rng = random.Random(21)
+    now = datetime.utcnow()
+    orders = []
+    for n in range(line_items // ITEMS_PER_ORDER):
+        items = [{"productId": rng.randint(1, 4), "name": "Item", "price": rng.choice(PRICES),
+                  "quantity": rng.randint(1, 3), "taxAmount": 0} for _ in range(ITEMS_PER_ORDER)]
+        base = sum(item["price"] * item["quantity"] for item in items)
+        # What TaxEngine.ts sends: unrounded floating point
+        levies = base * 0.025 + base * 0.025 + base * 0.01
+        total_tax = levies + (base + levies) * 0.15
+        if n % WRONG_EVERY == 0:
+            total_tax = round(total_tax * 0.9, 2)
+        orders.append((f"order-{n:08d}", items, base + total_tax, total_tax, now - timedelta(minutes=n)))
+    return orders
+
+
+def naive(orders):
+    # One full breakdown per order, every price converted on every line
+    flagged = 0
+    for order_id, items, total_amount, total_tax, _ in orders:
+        base = sum(tax.to_decimal(item["price"]) * item["quantity"] for item in items)
+        breakdown = tax.calculate_ghana_tax(base)
+        if abs(tax.to_decimal(total_tax) - breakdown.total_tax) > tax.TAX_TOLERANCE:
+            flagged += 1
+    return flagged
+
+
+def populate(orders):
+    migrations.upgrade(engine, log=lambda message: None)
+    with engine.begin() as conn:
+        for start in range(0, len(orders), BATCH):
+            conn.execute(insert(models.Order), [{
+                "id": order_id, "items_json": items, "total_amount": total_amount, "total_tax": total_tax,
+                "status": "completed", "payment_method": "cash", "created_at": created, "updated_at": created,
+            } for order_id, items, total_amount, total_tax, created in orders[start:start + BATCH]])
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    line_items = int(sys.argv[1]) if len(sys.argv) > 1 else LINE_ITEMS
+    orders = make_orders(line_items)
+    expected = len(range(0, len(orders), WRONG_EVERY))
+    print(f"--- Tax verification over {len(orders) * ITEMS_PER_ORDER} line items ({len(orders)} orders) ---")
+
+    flagged, seconds = timed(naive, orders)
+    print(f"per-order breakdown  {seconds:7.2f}s ({line_items / seconds:,.0f} line items/s)")
+    assert flagged == expected
+
+    mismatches, seconds = timed(tax.verify_order_taxes, [o[:4] for o in orders])
+    print(f"batched verify       {seconds:7.2f}s ({line_items / seconds:,.0f} line items/s)")
+    assert len(mismatches) == expected
+
+    _, seconds = timed(populate, orders)
+    print(f"populate             {seconds:7.2f}s")
+    (checked, flagged), seconds = timed(tax_audit.verify_stored_orders, engine, None, None,
+                                        tax_audit.VERIFY_BATCH_SIZE, lambda message: None)
+    print(f"historical verify    {seconds:7.2f}s ({line_items / seconds:,.0f} line items/s, incl. reads)")
+    with engine.connect() as conn:
+        recorded = conn.execute(select(func.count()).select_from(models.TaxDiscrepancy)).scalar()
+    assert checked == len(orders) and flagged == recorded == expected
+    print(f"SUCCESS: {expected} under-reported orders flagged, no false positives.")
@@ -0,0 +1,21 @@
+import sys
+import os
+
+# Add backend to path
+sys.path.append(os.getcwd())
+
+from app.database import engine, SessionLocal
+from app.inventory_ledger import compact, check_consistency
+
+if __name__ == "__main__":
+    print("--- Compacting inventory_logs into daily snapshots ---")
+    compact(engine)
+    db = SessionLocal()
+    mismatches = check_consistency(db)
+    db.close()
+    if mismatches:
+        for m in mismatches:
+            print(f"Product {m['product_id']}: stock {m['stock_quantity']} != ledger {m['ledger_quantity']}")
+        print(f"FAILED: {len(mismatches)} products disagree with the ledger.")
+        sys.exit(1)
+    print("SUCCESS: stock matches snapshots plus ledger for every product.")
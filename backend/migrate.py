@@ -0,0 +1,28 @@
+import sys
+import os
+
+# Add backend to path
+sys.path.append(os.getcwd())
+
+from app import migrations
+from app.database import engine
+
+def main(args):
+    command = args[0] if args else "upgrade"
+    if command == "current":
+        version = migrations.current_version(engine)
+        print(f"Schema version: {version if version is not None else 'none recorded'} "
+              f"(latest {migrations.LATEST_VERSION})")
+    elif command == "history":
+        for migration in migrations.MIGRATIONS:
+            print(f"{migration.version:4d}  {migration.description}")
+    elif command == "upgrade":
+        target = int(args[1]) if len(args) > 1 else migrations.LATEST_VERSION
+        version = migrations.upgrade(engine, target=target)
+        print(f"Migration complete. Schema version: {version}")
+    else:
+        print("Usage: python migrate.py [upgrade [version] | current | history]")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
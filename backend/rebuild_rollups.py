@@ -0,0 +1,14 @@
+import sys
+import os
+
+# Add backend to path
+sys.path.append(os.getcwd())
+
+from app.database import engine
+from app.rollups import rebuild_rollups, REBUILD_BATCH_SIZE
+
+if __name__ == "__main__":
+    batch_size = int(sys.argv[1]) if len(sys.argv) > 1 else REBUILD_BATCH_SIZE
+    print(f"--- Rebuilding sales rollups from orders (batches of {batch_size}) ---")
+    total = rebuild_rollups(engine, batch_size=batch_size)
+    print(f"SUCCESS: {total} orders folded into the rollups.")
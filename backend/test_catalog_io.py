@@ -0,0 +1,161 @@
+"""Bulk catalog import/export: batching, versions, per-row errors, dry runs.
+
+    python test_catalog_io.py
+"""
+import sys
+import os
+import io
+import json
+import tempfile
+
+# Add backend to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import select, func, text
+from sqlalchemy.orm import sessionmaker
+from app import models, catalog, catalog_io
+from app.database import create_db_engine
+
+engine = create_db_engine(f"sqlite:///{tempfile.mkdtemp()}/catalog.db")
+models.Base.metadata.create_all(bind=engine)
+Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+def run_import(db, text, file_format="csv", **options):
+    rows = catalog_io.read_rows(io.BytesIO(text.encode()), file_format)
+    return catalog_io.import_products(db, rows, **options).as_dict()
+
+
+def product_count(db):
+    return db.scalar(select(func.count()).select_from(models.Product))
+
+
+def test_import_batches_bump_version_once_each():
+    db = Session()
+    catalog.seed_default_products(db)
+    start_version = catalog.get_catalog_version(db)
+    lines = ["name,price,category,tax_group,stock_quantity"]
+    lines += [f"Dish {n},{10 + n},Main,VAT_standard,{n % 20}" for n in range(1000)]
+    lines += ["Broken,abc,Main,VAT_standard,1", "No Category,5,,VAT_standard,1"]
+    report = run_import(db, "\n".join(lines) + "\n", batch_size=250)
+    assert (report["created"], report["failed"], report["batches"]) == (1000, 2, 5), report
+    assert [e["row"] for e in report["errors"]] == [1001, 1002], report["errors"]
+    assert catalog.get_catalog_version(db) == start_version + 5
+    versions = set(db.scalars(select(models.Product.version).where(models.Product.name.like("Dish %"))))
+    assert len(versions) == 4, versions
+    db.close()
+
+
+def test_updates_are_logged_and_dry_run_keeps_nothing():
+    db = Session()
+    jollof = db.scalar(select(models.Product).where(models.Product.name == "Jollof Rice"))
+    stock, version = jollof.stock_quantity, catalog.get_catalog_version(db)
+    update = json.dumps({"id": jollof.id, "price": 47.5, "stock_quantity": stock + 10}) + "\n"
+
+    dry = run_import(db, update, "ndjson", dry_run=True)
+    assert (dry["updated"], dry["catalog_version"]) == (1, None), dry
+    db.expire_all()
+    assert (jollof.price, jollof.stock_quantity) == (45.0, stock)
+    assert catalog.get_catalog_version(db) == version
+
+    report = run_import(db, update + "{oops\n", "ndjson")
+    assert (report["updated"], report["failed"]) == (1, 1), report
+    db.expire_all()
+    assert (jollof.price, jollof.stock_quantity, jollof.version) == (47.5, stock + 10, version + 1)
+    logged = db.scalar(select(models.InventoryLog.quantity_change).where(
+        models.InventoryLog.product_id == jollof.id, models.InventoryLog.reason == "adjustment"))
+    assert logged == 10
+    db.close()
+
+
+def test_export_round_trips():
+    db = Session()
+    exported = []
+    after_id = None
+    while True:
+        rows = catalog_io.export_batch(db, after_id, limit=100)
+        if not rows:
+            break
+        exported.append(catalog_io.format_rows(rows, "csv", header=after_id is None))
+        after_id = rows[-1][0]
+    text = "".join(exported)
+    assert text.count("\n") == product_count(db) + 1
+    # Re-importing an unchanged export only updates, and changes nothing
+    before = product_count(db)
+    report = run_import(db, text)
+    assert (report["created"], report["updated"], report["failed"]) == (0, before, 0), report
+    assert product_count(db) == before
+    db.close()
+
+
+def test_out_of_range_values_fail_only_their_row():
+    db = Session()
+    jollof = db.scalar(select(models.Product).where(models.Product.name == "Jollof Rice"))
+    lines = [
+        json.dumps({"id": jollof.id, "price": 46.0}),
+        json.dumps({"id": jollof.id, "stock_quantity": 10 ** 23}),
+        json.dumps({"name": "Range Check", "price": 5, "category": "Side", "tax_group": "VAT_standard"}),
+    ]
+    report = run_import(db, "\n".join(lines) + "\n", "ndjson")
+    assert (report["rows"], report["updated"], report["created"], report["failed"]) == (3, 1, 1, 1), report
+    assert [e["row"] for e in report["errors"]] == [2], report["errors"]
+    db.close()
+
+
+def test_failed_batch_is_retried_row_by_row():
+    db = Session()
+    # A database-level failure that validation cannot catch
+    db.execute(text(
+        "CREATE TRIGGER reject_poison BEFORE INSERT ON products WHEN NEW.name = 'Poison' "
+        "BEGIN SELECT RAISE(ABORT, 'rejected by trigger'); END"
+    ))
+    db.commit()
+    try:
+        version = catalog.get_catalog_version(db)
+        lines = ["name,price,category,tax_group"]
+        lines += ["Kept One,5,Side,VAT_standard", "Poison,5,Side,VAT_standard", "Kept Two,5,Side,VAT_standard"]
+        report = run_import(db, "\n".join(lines) + "\n")
+        assert (report["created"], report["failed"], report["batches"]) == (2, 1, 1), report
+        # The row-by-row retry still spends one version on the batch
+        assert report["catalog_version"] == catalog.get_catalog_version(db) == version + 1, report
+        assert report["errors"] == [{"row": 2, "error": "not saved: rejected by trigger"}], report["errors"]
+        names = set(db.scalars(select(models.Product.name).where(models.Product.name.in_(["Kept One", "Kept Two", "Poison"]))))
+        assert names == {"Kept One", "Kept Two"}, names
+
+        # A dry run counts the same rows and still keeps nothing
+        dry = run_import(db, "name,price,category,tax_group\nPoison,5,Side,VAT_standard\nDry Only,5,Side,VAT_standard\n", dry_run=True)
+        assert (dry["created"], dry["failed"]) == (1, 1), dry
+        assert db.scalar(select(models.Product).where(models.Product.name == "Dry Only")) is None
+    finally:
+        db.execute(text("DROP TRIGGER reject_poison"))
+        db.commit()
+        db.close()
+
+
+def test_created_product_clears_tombstone_of_reused_id():
+    db = Session()
+    last = db.scalar(select(models.Product).order_by(models.Product.id.desc()).limit(1))
+    last_id = last.id
+    db.delete(last)
+    catalog.mark_product_deleted(db, last_id)
+    db.commit()
+    report = run_import(db, "name,price,category,tax_group\nReused Id,5,Side,VAT_standard\n")
+    assert report["created"] == 1, report
+    # SQLite hands the highest deleted rowid to the next insert
+    reused = db.scalar(select(models.Product.id).where(models.Product.name == "Reused Id"))
+    assert reused == last_id, (reused, last_id)
+    assert db.get(models.ProductTombstone, reused) is None
+    db.close()
+
+
+if __name__ == "__main__":
+    failed = False
+    for name, check in list(globals().items()):
+        if name.startswith("test_"):
+            try:
+                check()
+                print(f"SUCCESS: {name}")
+            except AssertionError as e:
+                failed = True
+                print(f"FAILED: {name}: {e}")
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,171 @@
+"""Streaming accounting exports: filters, archived orders, gzip, flat memory.
+
+    python test_exports.py
+"""
+import sys
+import csv
+import io
+import json
+import zlib
+import asyncio
+import tracemalloc
+from datetime import datetime, timedelta
+
+import testkit  # Test database, set before the app is imported
+from sqlalchemy import insert
+from sqlalchemy.orm import sessionmaker
+from app import archive, exports, models
+from app.database import engine
+
+Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+NOW = datetime(2024, 6, 15, 12, 0)
+
+
+def order_rows(count, start, shift_id, prefix):
+    return [{
+        "id": f"{prefix}-{n:07d}",
+        "shift_id": shift_id,
+        "total_amount": 121.9,
+        "total_tax": 21.9,
+        "status": "completed",
+        "payment_method": "cash",
+        "kitchen_status": "served",
+        # Pairs share a timestamp, so the keyset must break ties on id
+        "created_at": start + timedelta(minutes=n // 2),
+        "items_json": [{"id": 1, "name": "Jollof Rice", "price": 45.0, "quantity": 1}],
+    } for n in range(count)]
+
+
+def export(sources, columns, file_format="csv", gzip=False, batch_size=exports.EXPORT_BATCH_SIZE):
+    async def collect():
+        return [chunk async for chunk in exports.encode(exports.keyset_rows(sources, batch_size), columns, file_format, gzip)]
+    return b"".join(asyncio.run(collect()))
+
+
+def order_sources(start=None, end=None, shift_id=None):
+    with Session() as db:
+        return exports.order_export_queries(db, start, end, shift_id)
+
+
+_data_ready = False
+
+
+def setup_data():
+    """Fresh schema and fixture rows, once per run.
+
+    Built on first use rather than at import: under pytest the app's engine
+    may be shared with other test files, which reset the schema themselves.
+    """
+    global _data_ready
+    if _data_ready:
+        return
+    archive._archive_metadata.drop_all(bind=engine)
+    models.Base.metadata.drop_all(bind=engine)
+    models.Base.metadata.create_all(bind=engine)
+    with Session() as db:
+        db.add_all([
+            models.Shift(id=1, start_time=NOW - timedelta(days=200), end_time=NOW - timedelta(days=199)),
+            models.Shift(id=2, start_time=NOW - timedelta(hours=2)),
+        ])
+        db.execute(insert(models.Order), order_rows(300, NOW - timedelta(days=200), 1, "old"))
+        db.execute(insert(models.Order), order_rows(250, NOW - timedelta(hours=1), 2, "new"))
+        db.add(models.Product(id=1, name="Jollof Rice", price=45.0, category="Main", tax_group="VAT_standard"))
+        db.execute(insert(models.InventoryLog), [
+            {"product_id": 1, "quantity_change": -1, "reason": "sale", "timestamp": NOW - timedelta(minutes=n)}
+            for n in range(500)
+        ])
+        db.commit()
+    archive.archive_orders(engine, now=NOW, older_than_days=90, log=lambda message: None)
+    _data_ready = True
+
+
+def test_orders_include_archives_in_time_order():
+    setup_data()
+    text = export(order_sources(), exports.ORDER_COLUMNS, batch_size=64).decode()
+    rows = list(csv.DictReader(io.StringIO(text)))
+    assert len(rows) == 550, len(rows)
+    assert len({row["id"] for row in rows}) == 550
+    # Archived months first, then the live table, each in time order
+    assert rows[0]["id"] == "old-0000000" and rows[-1]["id"] == "new-0000249"
+    assert [row["created_at"] for row in rows] == sorted(row["created_at"] for row in rows)
+    assert json.loads(rows[0]["items_json"])[0]["name"] == "Jollof Rice"
+
+
+def test_order_filters():
+    setup_data()
+    with Session() as db:
+        assert len(order_sources()) == 1 + len(archive.archived_months(db))
+    # A range within the live table skips every archive
+    recent = order_sources(start=NOW - timedelta(days=1))
+    assert len(recent) == 1
+    lines = export(recent, exports.ORDER_COLUMNS, "ndjson", batch_size=100).decode().splitlines()
+    assert len(lines) == 250 and json.loads(lines[0])["shift_id"] == 2
+
+    first_hour = order_sources(start=NOW - timedelta(days=200), end=NOW - timedelta(days=200) + timedelta(minutes=30))
+    assert len(export(first_hour, exports.ORDER_COLUMNS, "ndjson").decode().splitlines()) == 60
+    by_shift = export(order_sources(shift_id=1), exports.ORDER_COLUMNS, "ndjson").decode().splitlines()
+    assert len(by_shift) == 300 and {json.loads(line)["shift_id"] for line in by_shift} == {1}
+
+
+def test_inventory_logs_and_gzip():
+    setup_data()
+    query = exports.inventory_log_export_query(NOW - timedelta(minutes=100), NOW)
+    data = export([query], exports.INVENTORY_LOG_COLUMNS, gzip=True, batch_size=30)
+    assert data[:2] == b"\x1f\x8b"
+    rows = list(csv.DictReader(io.StringIO(zlib.decompress(data, wbits=31).decode())))
+    # The log at NOW falls outside the half-open range
+    assert len(rows) == 100 and rows[0]["product_name"] == "Jollof Rice"
+    with Session() as db:
+        assert exports.shift_window(db, 2)[1] is None
+        assert exports.shift_window(db, 99) is None
+
+
+def test_empty_csv_export_has_header():
+    setup_data()
+    empty = order_sources(start=NOW + timedelta(days=1), end=NOW + timedelta(days=2))
+    assert export(empty, exports.ORDER_COLUMNS).decode().splitlines() == [",".join(exports.ORDER_COLUMNS)]
+    assert export(empty, exports.ORDER_COLUMNS, "ndjson") == b""
+
+
+def peak_export_memory(start, end):
+    async def drain():
+        total = 0
+        async for chunk in exports.encode(exports.keyset_rows(order_sources(start, end)), exports.ORDER_COLUMNS, "csv", True):
+            total += len(chunk)
+        return total
+    tracemalloc.start()
+    asyncio.run(drain())
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak
+
+
+def test_memory_stays_flat():
+    setup_data()
+    start = NOW + timedelta(days=10)
+    with Session() as db:
+        for offset in range(0, 40000, 5000):
+            db.execute(insert(models.Order), order_rows(5000, start + timedelta(minutes=offset // 2), None, f"bulk{offset}"))
+        db.commit()
+    small = peak_export_memory(start, start + timedelta(minutes=1000))  # 2,000 orders
+    large = peak_export_memory(start, start + timedelta(days=30))  # 40,000 orders
+    # Twenty times the rows, roughly the same peak: one batch at a time
+    assert large < small * 1.5, (small, large)
+
+
+if __name__ == "__main__":
+    tests = [
+        test_orders_include_archives_in_time_order,
+        test_order_filters,
+        test_inventory_logs_and_gzip,
+        test_empty_csv_export_has_header,
+        test_memory_stays_flat,
+    ]
+    for test in tests:
+        try:
+            test()
+            print(f"SUCCESS: {test.__name__}")
+        except AssertionError as e:
+            print(f"FAILED: {test.__name__}: {e}")
+            sys.exit(1)
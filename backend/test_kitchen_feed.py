@@ -0,0 +1,203 @@
+"""Kitchen Display feed: the SSE stream, and ?since= polling with its cursor.
+
+    python test_kitchen_feed.py
+"""
+import sys
+import json
+import asyncio
+from datetime import datetime, timedelta
+from contextlib import asynccontextmanager
+
+from testkit import order, reset_schema
+import httpx
+from fastapi import HTTPException
+from sqlalchemy import update
+from app import events, models
+from app.api import kitchen
+from app.database import SessionLocal
+from app.events import hub
+from app.main import app
+
+# Longest a test waits for the next event before failing
+EVENT_TIMEOUT = 5
+
+
+def parse(chunk: str):
+    """(event type, data) of one Server-Sent Event"""
+    lines = dict(line.split(": ", 1) for line in chunk.strip().splitlines())
+    return lines["event"], json.loads(lines["data"])
+
+
+async def next_event(stream):
+    return parse(await asyncio.wait_for(anext(stream), EVENT_TIMEOUT))
+
+
+@asynccontextmanager
+async def admin_client():
+    # Requests and the stream share one event loop, as they do in the server
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        await client.post("/auth/seed-admin")
+        login = await client.post("/auth/login-json", json={"username": "admin", "password": "admin123"})
+        yield client, login.json()["access_token"]
+
+
+def test_stream_sends_snapshot_then_events():
+    reset_schema()
+
+    async def scenario():
+        async with admin_client() as (client, token):
+            headers = {"Authorization": f"Bearer {token}"}
+            await client.post("/sync/orders", json=[order("k-1")])
+            response = await kitchen.stream_kitchen_orders(token=token, authorization=None)
+            stream = response.body_iterator
+            try:
+                event_type, snapshot = await next_event(stream)
+                assert event_type == "snapshot" and [o["id"] for o in snapshot] == ["k-1"], snapshot
+
+                await client.post("/sync/orders", json=[order("k-2"), order("k-2")])
+                event_type, created = await next_event(stream)
+                assert (event_type, created["id"], created["kitchen_status"]) == ("order_created", "k-2", "pending")
+
+                # The repeated k-2 is announced once: the next event is the status change
+                await client.post("/kitchen/orders/k-1/status", headers=headers, json={"status": "ready"})
+                assert await next_event(stream) == ("status_changed", {"id": "k-1", "kitchen_status": "ready"})
+                await client.post("/kitchen/orders/k-1/status", headers=headers, json={"status": "served"})
+                assert await next_event(stream) == ("order_removed", {"id": "k-1"})
+            finally:
+                await stream.aclose()
+        # Closing the stream unsubscribes it
+        assert hub.subscriber_count(kitchen.KITCHEN_TOPIC) == 0
+
+    asyncio.run(scenario())
+
+
+def test_subscriber_that_falls_behind_gets_a_fresh_snapshot():
+    reset_schema()
+
+    async def scenario():
+        async with admin_client() as (client, token):
+            await client.post("/sync/orders", json=[order("k-1")])
+            response = await kitchen.stream_kitchen_orders(token=None, authorization=f"Bearer {token}")
+            stream = response.body_iterator
+            try:
+                # The stream subscribes when it starts, so the queue size applies to the first read
+                real_size = events.SUBSCRIBER_QUEUE_SIZE
+                events.SUBSCRIBER_QUEUE_SIZE = 2
+                try:
+                    assert (await next_event(stream))[0] == "snapshot"
+                finally:
+                    events.SUBSCRIBER_QUEUE_SIZE = real_size
+                await client.post("/sync/orders", json=[order(f"burst-{n}") for n in range(3)])
+                # Three events overflowed a queue of two: the stream starts over
+                event_type, snapshot = await next_event(stream)
+                assert event_type == "snapshot" and len(snapshot) == 4, snapshot
+            finally:
+                await stream.aclose()
+
+    asyncio.run(scenario())
+
+
+def test_stream_requires_a_token():
+    async def scenario():
+        for token, authorization in ((None, None), ("not-a-token", None)):
+            try:
+                await kitchen.stream_kitchen_orders(token=token, authorization=authorization)
+            except HTTPException as e:
+                assert e.status_code == 401
+            else:
+                raise AssertionError("stream opened without a valid token")
+        assert hub.subscriber_count(kitchen.KITCHEN_TOPIC) == 0
+
+    asyncio.run(scenario())
+
+
+def test_stream_that_never_starts_or_fails_does_not_stay_subscribed():
+    reset_schema()
+
+    async def failing_snapshot():
+        raise RuntimeError("database went away")
+
+    async def scenario():
+        async with admin_client() as (client, token):
+            # The client went away before the body started
+            response = await kitchen.stream_kitchen_orders(token=token, authorization=None)
+            await response.body_iterator.aclose()
+            assert hub.subscriber_count(kitchen.KITCHEN_TOPIC) == 0
+
+            stream = events.sse_events(kitchen.KITCHEN_TOPIC, failing_snapshot)
+            try:
+                await anext(stream)
+            except RuntimeError:
+                pass
+            else:
+                raise AssertionError("snapshot error was swallowed")
+            assert hub.subscriber_count(kitchen.KITCHEN_TOPIC) == 0
+
+    asyncio.run(scenario())
+
+
+def set_updated_at(order_id, moment, kitchen_status=None):
+    values = {"updated_at": moment}
+    if kitchen_status:
+        values["kitchen_status"] = kitchen_status
+    with SessionLocal() as db:
+        db.execute(update(models.Order).where(models.Order.id == order_id).values(**values))
+        db.commit()
+
+
+def test_since_returns_changes_removals_and_cursor():
+    reset_schema()
+    cursor = datetime(2024, 1, 1, 12)
+
+    async def scenario():
+        async with admin_client() as (client, token):
+            headers = {"Authorization": f"Bearer {token}"}
+            await client.post("/sync/orders", json=[order("old"), order("late"), order("done"), order("new")])
+            full = (await client.get("/kitchen/orders", headers=headers)).json()
+            assert len(full) == 4
+            # Slim projection: nothing beyond what the display shows
+            assert set(full[0]) == {"id", "status", "kitchen_status", "items_json", "created_at", "updated_at"}
+
+            set_updated_at("old", cursor - kitchen.CURSOR_OVERLAP - timedelta(seconds=1))
+            # Committed just before the cursor, so a strict `> since` would skip it
+            set_updated_at("late", cursor - timedelta(seconds=3))
+            set_updated_at("done", cursor + timedelta(seconds=5), kitchen_status="served")
+            set_updated_at("new", cursor + timedelta(seconds=10))
+
+            async def poll(since):
+                response = await client.get("/kitchen/orders", headers=headers, params={"since": since})
+                assert response.status_code == 200, response.text
+                return response.json()
+
+            changes = await poll(cursor.isoformat())
+            assert [o["id"] for o in changes["orders"]] == ["late", "new"], changes
+            assert changes["removed"] == ["done"]
+            assert changes["cursor"] == (cursor + timedelta(seconds=10)).isoformat()
+
+            # An offset-aware cursor means the same instant
+            aware = await poll((cursor + timedelta(hours=1)).isoformat() + "+01:00")
+            assert aware == changes
+
+            # Polling from the returned cursor re-reads only the overlap window
+            again = await poll(changes["cursor"])
+            assert [o["id"] for o in again["orders"]] == ["new"] and again["removed"] == []
+            assert again["cursor"] == changes["cursor"]
+
+            # Nothing changed: the cursor stays where the client left it
+            quiet = (cursor + timedelta(hours=1)).isoformat()
+            assert await poll(quiet) == {"orders": [], "removed": [], "cursor": quiet}
+
+    asyncio.run(scenario())
+
+
+if __name__ == "__main__":
+    failed = False
+    for name, check in list(globals().items()):
+        if name.startswith("test_"):
+            try:
+                check()
+                print(f"SUCCESS: {name}")
+            except AssertionError as e:
+                failed = True
+                print(f"FAILED: {name}: {e}")
+    sys.exit(1 if failed else 0)
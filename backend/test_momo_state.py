@@ -0,0 +1,124 @@
+"""In-process MoMo status cache: TTL expiry, size limit, eviction order.
+
+    python test_momo_state.py
+"""
+import sys
+import os
+from contextlib import contextmanager
+
+# Add backend to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app import momo_state
+from app.momo_state import TransactionStateStore
+
+
+class FakeClock:
+    """Stands in for the time module inside momo_state"""
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+@contextmanager
+def fake_clock():
+    real = momo_state.time
+    momo_state.time = FakeClock()
+    try:
+        yield momo_state.time
+    finally:
+        momo_state.time = real
+
+
+def test_put_and_get():
+    store = TransactionStateStore(max_size=10, ttl_seconds=60)
+    store.put("t1", "PENDING")
+    assert store.get("t1") == "PENDING"
+    store.put("t1", "SUCCESS")
+    # Moving to a final status keeps one entry, in the finished bucket
+    assert (store.get("t1"), len(store)) == ("SUCCESS", 1)
+    assert store.memory_report()["final"] == 1 and store.memory_report()["pending"] == 0
+    assert store.get("unknown") is None
+
+
+def test_entries_expire_after_ttl():
+    with fake_clock() as clock:
+        store = TransactionStateStore(max_size=10, ttl_seconds=60)
+        store.put("old", "SUCCESS")
+        clock.now += 30
+        store.put("young", "PENDING")
+        clock.now += 31
+        # get drops an expired entry on sight
+        assert store.get("old") is None
+        assert store.get("young") == "PENDING"
+        assert store.expirations == 1
+        clock.now += 30
+        assert store.expire() == 1
+        assert len(store) == 0 and store.expirations == 2
+
+
+def test_status_change_renews_ttl():
+    with fake_clock() as clock:
+        store = TransactionStateStore(max_size=10, ttl_seconds=60)
+        store.put("t1", "PENDING")
+        clock.now += 50
+        store.put("t1", "SUCCESS")
+        clock.now += 50
+        assert store.get("t1") == "SUCCESS"
+
+
+def test_full_store_evicts_finished_entries_first():
+    store = TransactionStateStore(max_size=3, ttl_seconds=60)
+    store.put("p1", "PENDING")
+    store.put("f1", "SUCCESS")
+    store.put("p2", "PENDING")
+    store.put("f2", "FAILED")
+    # The oldest finished entry goes, though a pending one is older
+    assert store.get("f1") is None
+    assert [store.get(t) for t in ("p1", "p2", "f2")] == ["PENDING", "PENDING", "FAILED"]
+    store.put("f3", "EXPIRED")
+    assert store.get("f2") is None and len(store) == 3
+    assert store.evictions == 2
+
+
+def test_pending_entries_are_evicted_when_nothing_finished():
+    store = TransactionStateStore(max_size=2, ttl_seconds=60)
+    for transaction_id in ("p1", "p2", "p3"):
+        store.put(transaction_id, "PENDING")
+    assert store.get("p1") is None
+    assert [store.get(t) for t in ("p2", "p3")] == ["PENDING", "PENDING"]
+    assert store.evictions == 1
+
+
+def test_expired_entries_are_cleared_before_evicting():
+    with fake_clock() as clock:
+        store = TransactionStateStore(max_size=2, ttl_seconds=60)
+        store.put("stale", "SUCCESS")
+        store.put("live", "PENDING")
+        clock.now += 61
+        store.put("live", "SUCCESS")
+        store.put("new", "PENDING")
+        # The stale entry expired, so no live entry had to be evicted
+        assert store.evictions == 0 and store.expirations == 1
+        assert (store.get("live"), store.get("new")) == ("SUCCESS", "PENDING")
+
+
+def test_zero_size_disables_the_cache():
+    store = TransactionStateStore(max_size=0, ttl_seconds=60)
+    store.put("t1", "SUCCESS")
+    assert store.get("t1") is None and len(store) == 0
+
+
+if __name__ == "__main__":
+    failed = False
+    for name, check in list(globals().items()):
+        if name.startswith("test_"):
+            try:
+                check()
+                print(f"SUCCESS: {name}")
+            except AssertionError as e:
+                print(f"FAILED: {name}: {e}")
+                failed = True
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,154 @@
+"""Archiving old served orders must not lose, duplicate or hide any order.
+
+    python test_order_archive.py
+"""
+import sys
+import os
+import tempfile
+from datetime import datetime, timedelta
+
+# Add backend to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import select, func, insert
+from sqlalchemy.orm import sessionmaker
+from app import models, catalog, archive, rollups
+from app.api.sync import OrderSchema, ingest_orders
+from app.order_items import backfill_order_items
+from app.database import create_db_engine
+
+engine = create_db_engine(f"sqlite:///{tempfile.mkdtemp()}/archive.db")
+models.Base.metadata.create_all(bind=engine)
+Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+NOW = datetime.utcnow()
+
+
+def order(n, days_ago):
+    return OrderSchema(
+        id=f"order-{n:04d}", items=[{"id": 1 + n % 4, "name": "Item", "price": 45.0, "quantity": 1}],
+        total_amount=54.86, total_tax=9.86, status="completed", payment_method="cash",
+        created_at=NOW - timedelta(days=days_ago, hours=n % 24),
+    )
+
+
+def hot_count(db):
+    return db.scalar(select(func.count()).select_from(models.Order))
+
+
+def sales_total():
+    with engine.connect() as conn:
+        return conn.execute(select(func.sum(models.SalesHourly.order_count))).scalar()
+
+
+def test_archive_moves_old_served_orders():
+    db = Session()
+    catalog.seed_default_products(db)
+    # 300 orders over ~200 days; the newest 90 days stay hot
+    orders = [order(n, n * 2 // 3) for n in range(300)]
+    ingest_orders(db, orders)
+    db.execute(models.Order.__table__.update().values(kitchen_status="served"))
+    unserved = orders[-1].id
+    db.execute(models.Order.__table__.update().where(models.Order.id == unserved).values(kitchen_status="ready"))
+    db.commit()
+    horizon = NOW - timedelta(days=90)
+    old_served = sum(1 for o in orders if o.created_at < horizon and o.id != unserved)
+
+    moved = archive.archive_orders(engine, now=NOW, older_than_days=90, batch_size=40,
+                                   max_rows_per_second=100000, log=lambda m: None)
+    assert moved == old_served, (moved, old_served)
+    assert hot_count(db) == len(orders) - old_served
+    assert db.scalar(select(func.min(models.Order.created_at)).where(models.Order.id != unserved)) >= horizon
+    months = archive.archived_months(db)
+    assert len(months) >= 3, months
+    assert db.scalar(select(func.sum(models.OrderArchive.order_count))) == old_served
+
+    # Read-through by ID, hot or cold
+    row, archived = archive.get_order(db, orders[-2].id)
+    assert archived is True and row["total_tax"] == 9.86
+    assert archive.get_order(db, orders[0].id)[1] is False
+    assert archive.get_order(db, "order-missing") is None
+
+    # A terminal resending archived orders does not create duplicates
+    assert ingest_orders(db, orders[-5:]) == []
+    db.commit()
+    assert hot_count(db) == len(orders) - old_served
+
+    # Rollup rebuilds still see archived orders
+    before = sales_total()
+    rollups.rebuild_rollups(engine, log=lambda m: None)
+    assert sales_total() == before == len(orders)
+
+    # Nothing left to move on a second run
+    assert archive.archive_orders(engine, now=NOW, older_than_days=90, log=lambda m: None) == 0
+    db.close()
+
+
+def test_rate_limit_paces_batches():
+    db = Session()
+    db.execute(models.Order.__table__.update().values(kitchen_status="served"))
+    db.commit()
+    db.close()
+    started = datetime.utcnow()
+    moved = archive.archive_orders(engine, now=NOW, older_than_days=1, batch_size=20,
+                                   max_rows_per_second=200, log=lambda m: None)
+    elapsed = (datetime.utcnow() - started).total_seconds()
+    assert moved > 20, moved
+    assert elapsed >= moved / 200 * 0.9, (moved, elapsed)
+
+
+def test_resent_order_archived_early_is_not_ingested_again():
+    # Archived by hand with a shorter horizon than ARCHIVE_AFTER_DAYS
+    db = Session()
+    recent = order(9000, days_ago=10)
+    ingest_orders(db, [recent])
+    db.execute(models.Order.__table__.update().where(models.Order.id == recent.id).values(kitchen_status="served"))
+    db.commit()
+    product_id = recent.items[0]["id"]
+    stock = db.get(models.Product, product_id).stock_quantity
+    logs = db.scalar(select(func.count()).select_from(models.InventoryLog))
+    assert archive.archive_orders(engine, now=NOW, older_than_days=7, log=lambda m: None) >= 1
+    assert archive.get_order(db, recent.id)[1] is True
+
+    assert ingest_orders(db, [recent]) == []
+    db.commit()
+    db.expire_all()
+    assert db.get(models.Order, recent.id) is None
+    assert db.get(models.Product, product_id).stock_quantity == stock
+    assert db.scalar(select(func.count()).select_from(models.InventoryLog)) == logs
+    db.close()
+
+
+def test_backfill_covers_archived_legacy_orders():
+    # Orders synced before order_items existed, one of them archived since
+    db = Session()
+    legacy = [("legacy-archived", NOW - timedelta(days=200)), ("legacy-hot", NOW - timedelta(days=1))]
+    db.execute(insert(models.Order), [{
+        "id": order_id, "total_amount": 121.9, "total_tax": 21.9, "status": "completed",
+        "payment_method": "cash", "kitchen_status": "served", "created_at": created_at,
+        "items_json": [{"id": 2, "name": "Item", "price": 50.0, "quantity": 2}],
+    } for order_id, created_at in legacy])
+    db.commit()
+    archive.archive_orders(engine, now=NOW, older_than_days=90, log=lambda m: None)
+    assert archive.get_order(db, "legacy-archived")[1] is True
+
+    assert backfill_order_items(engine, batch_size=10, log=lambda m: None) == 2
+    items = db.execute(select(models.OrderItem.order_id, models.OrderItem.quantity, models.OrderItem.tax_amount)
+                       .where(models.OrderItem.order_id.like("legacy-%")).order_by(models.OrderItem.order_id)).all()
+    assert [(i.order_id, i.quantity) for i in items] == [("legacy-archived", 2), ("legacy-hot", 2)], items
+    assert items[0].tax_amount == 21.9
+    # Resumable: a second run finds nothing left to do
+    assert backfill_order_items(engine, log=lambda m: None) == 0
+    db.close()
+
+
+if __name__ == "__main__":
+    failed = False
+    for name, check in list(globals().items()):
+        if name.startswith("test_"):
+            try:
+                check()
+                print(f"SUCCESS: {name}")
+            except AssertionError as e:
+                failed = True
+                print(f"FAILED: {name}: {e}")
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,104 @@
+"""Password hashing pool: backpressure on /auth/login and transparent rehash.
+
+    python test_passwords.py
+"""
+import sys
+import time
+import asyncio
+import threading
+from contextlib import contextmanager
+
+from testkit import fresh_app, reset_schema
+import httpx
+from app import models
+from app.api import auth
+from app.database import SessionLocal
+from app.main import app
+from app.passwords import PasswordHasher, make_context
+
+# Low work factors keep the test fast; only the difference between them matters
+ROUNDS = 1000
+OLD_ROUNDS = 500
+
+
+@contextmanager
+def hasher_in_use(hasher):
+    real = auth.password_hasher
+    auth.password_hasher = hasher
+    try:
+        yield hasher
+    finally:
+        auth.password_hasher = real
+
+
+def add_user(username, password, rounds):
+    with SessionLocal() as db:
+        db.add(models.User(username=username, email=f"{username}@local", role="cashier",
+                           hashed_password=make_context(rounds).hash(password)))
+        db.commit()
+
+
+def stored_hash(username):
+    with SessionLocal() as db:
+        return db.query(models.User.hashed_password).filter(models.User.username == username).scalar()
+
+
+def test_full_hash_queue_fails_fast_with_503():
+    reset_schema()
+    add_user("cashier", "pw", ROUNDS)
+
+    async def scenario():
+        with hasher_in_use(PasswordHasher(ROUNDS, workers=1, max_pending=1)) as hasher:
+            async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+                # A hash job that holds the only slot until released
+                release = threading.Event()
+                busy = asyncio.create_task(hasher._run(release.wait))
+                await asyncio.sleep(0)
+                try:
+                    started = time.perf_counter()
+                    response = await client.post("/auth/login", data={"username": "cashier", "password": "pw"})
+                    elapsed = time.perf_counter() - started
+                finally:
+                    release.set()
+                    await busy
+                assert response.status_code == 503, response.text
+                assert response.headers["Retry-After"] == "1"
+                # Rejected up front, not after waiting behind the queued job
+                assert elapsed < 1, elapsed
+                assert hasher.rejected == 1
+
+                response = await client.post("/auth/login", data={"username": "cashier", "password": "pw"})
+                assert response.status_code == 200, response.text
+
+    asyncio.run(scenario())
+
+
+def test_login_upgrades_old_hash_once():
+    with fresh_app() as client, hasher_in_use(PasswordHasher(ROUNDS, workers=2, max_pending=8)):
+        add_user("veteran", "pw", OLD_ROUNDS)
+        old = stored_hash("veteran")
+
+        assert client.post("/auth/login", data={"username": "veteran", "password": "pw"}).status_code == 200
+        upgraded = stored_hash("veteran")
+        assert upgraded != old and upgraded.startswith(f"$pbkdf2-sha256${ROUNDS}$"), upgraded
+
+        # Already at the configured work factor: the next login leaves it alone
+        assert client.post("/auth/login-json", json={"username": "veteran", "password": "pw"}).status_code == 200
+        assert stored_hash("veteran") == upgraded
+
+        # A wrong password never rewrites the hash
+        assert client.post("/auth/login", data={"username": "veteran", "password": "nope"}).status_code == 401
+        assert stored_hash("veteran") == upgraded
+
+
+if __name__ == "__main__":
+    failed = False
+    for name, check in list(globals().items()):
+        if name.startswith("test_"):
+            try:
+                check()
+                print(f"SUCCESS: {name}")
+            except AssertionError as e:
+                failed = True
+                print(f"FAILED: {name}: {e}")
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,71 @@
+"""Delta catalog sync: ETag / 304, ?since= deltas, tombstones, full resend.
+
+    python test_product_sync.py
+"""
+import sys
+
+from testkit import fresh_app
+
+NEW_PRODUCT = {"name": "Kelewele", "price": 15.0, "category": "Side", "tax_group": "VAT_standard", "stock_quantity": 40}
+
+
+def test_unchanged_catalog_is_a_304():
+    with fresh_app() as client:
+        first = client.get("/sync/products")
+        etag, version = first.headers["ETag"], int(first.headers["X-Catalog-Version"])
+        assert etag == f'"catalog-{version}"' and len(first.json()) == 4
+
+        cached = client.get("/sync/products", headers={"If-None-Match": etag})
+        assert cached.status_code == 304 and cached.content == b""
+        assert cached.headers["ETag"] == etag
+
+        # Any change moves the ETag, so the old one no longer matches
+        client.post("/products", json=NEW_PRODUCT)
+        changed = client.get("/sync/products", headers={"If-None-Match": etag})
+        assert changed.status_code == 200 and changed.headers["ETag"] != etag
+        assert len(changed.json()) == 5
+
+
+def test_since_returns_only_changes_and_tombstones():
+    with fresh_app() as client:
+        products = client.get("/sync/products").json()
+        version = int(client.get("/sync/products").headers["X-Catalog-Version"])
+
+        empty = client.get("/sync/products", params={"since": version}).json()
+        assert empty == {"version": version, "full": False, "products": [], "deleted": []}
+
+        created = client.post("/products", json=NEW_PRODUCT).json()
+        repriced = dict(products[0], price=products[0]["price"] + 1)
+        client.put(f"/products/{repriced['id']}", json=repriced)
+        assert client.delete(f"/products/{products[1]['id']}").status_code == 200
+
+        delta = client.get("/sync/products", params={"since": version}).json()
+        assert delta["full"] is False and delta["version"] > version
+        assert sorted(p["id"] for p in delta["products"]) == sorted([created["id"], repriced["id"]])
+        assert [p["price"] for p in delta["products"] if p["id"] == repriced["id"]] == [repriced["price"]]
+        assert delta["deleted"] == [products[1]["id"]]
+
+        # Caught up: the next delta is empty again
+        caught_up = client.get("/sync/products", params={"since": delta["version"]}).json()
+        assert (caught_up["products"], caught_up["deleted"]) == ([], [])
+
+
+def test_cursor_from_the_future_gets_a_full_resend():
+    with fresh_app() as client:
+        version = int(client.get("/sync/products").headers["X-Catalog-Version"])
+        body = client.get("/sync/products", params={"since": version + 100}).json()
+        assert body["full"] is True and body["version"] == version
+        assert len(body["products"]) == 4 and body["deleted"] == []
+
+
+if __name__ == "__main__":
+    failed = False
+    for name, check in list(globals().items()):
+        if name.startswith("test_"):
+            try:
+                check()
+                print(f"SUCCESS: {name}")
+            except AssertionError as e:
+                failed = True
+                print(f"FAILED: {name}: {e}")
+    sys.exit(1 if failed else 0)
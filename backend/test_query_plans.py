@@ -0,0 +1,116 @@
+"""EXPLAIN QUERY PLAN checks that hot queries keep using their indexes.
+
+    python test_query_plans.py
+"""
+import sys
+import os
+import tempfile
+
+# Add backend to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import select
+from app import models
+from app.database import create_db_engine
+from datetime import datetime
+from app.api.kitchen import open_orders_query, changed_orders_query
+from app.api.shifts import active_shift_query, shift_totals_query, shift_history_query
+from app.order_items import top_sellers_query
+from app.inventory_ledger import snapshot_at_query, _uncovered_sum
+from app.archive import archive_candidates_query, archive_table
+from app.exports import inventory_log_export_query, page_query
+
+engine = create_db_engine(f"sqlite:///{tempfile.mkdtemp()}/plans.db")
+models.Base.metadata.create_all(bind=engine)
+
+
+def query_plan(statement):
+    """Plan for a statement exactly as SQLAlchemy sends it to SQLite."""
+    compiled = statement.compile(dialect=engine.dialect, compile_kwargs={"render_postcompile": True})
+    params = tuple(compiled.params[name] for name in compiled.positiontup)
+    with engine.connect() as conn:
+        rows = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {compiled}", params).fetchall()
+    return " | ".join(row[-1] for row in rows)
+
+
+def assert_uses_index(statement, index_name, sorted_by_index=True):
+    plan = query_plan(statement)
+    assert f"INDEX {index_name}" in plan, plan
+    if sorted_by_index:
+        assert "TEMP B-TREE" not in plan, plan
+
+
+def test_kitchen_orders_use_partial_index():
+    assert_uses_index(open_orders_query(), "ix_orders_open_kitchen_created_at")
+
+
+def test_kitchen_changes_use_updated_at_index():
+    assert_uses_index(changed_orders_query(datetime.utcnow()), "ix_orders_updated_at")
+
+
+def test_active_shift_lookup_uses_index():
+    assert_uses_index(active_shift_query(1), "ix_shifts_user_active", sorted_by_index=False)
+
+
+def test_shift_history_uses_index():
+    page = datetime(2024, 1, 1)
+    assert_uses_index(shift_history_query(20), "ix_shifts_start_time")
+    assert_uses_index(shift_history_query(20, page, 10), "ix_shifts_start_time")
+    assert_uses_index(shift_history_query(20, user_id=1), "ix_shifts_user_start_time")
+    assert_uses_index(shift_history_query(20, page, 10, user_id=1, start=datetime(2023, 1, 1)), "ix_shifts_user_start_time")
+
+
+def test_inventory_history_uses_index():
+    history = (
+        select(models.InventoryLog)
+        .where(models.InventoryLog.product_id == 1)
+        .order_by(models.InventoryLog.timestamp)
+    )
+    assert_uses_index(history, "ix_inventory_logs_product_timestamp")
+
+
+def test_top_sellers_use_covering_index():
+    plan = query_plan(top_sellers_query(datetime(2024, 1, 1)))
+    assert "COVERING INDEX ix_order_items_created_product" in plan, plan
+
+
+def test_shift_close_out_uses_covering_index():
+    plan = query_plan(shift_totals_query(1))
+    assert "COVERING INDEX ix_orders_shift_close_out" in plan, plan
+
+
+def test_stock_as_of_uses_snapshot_and_ledger_indexes():
+    assert_uses_index(snapshot_at_query(1, datetime(2024, 1, 1)), "sqlite_autoindex_inventory_snapshots_1")
+    plan = query_plan(select(_uncovered_sum(1, datetime(2024, 1, 1), 100, until=datetime(2024, 1, 2))))
+    assert "INDEX ix_inventory_logs_product_timestamp" in plan, plan
+    assert "INTEGER PRIMARY KEY (rowid>?)" in plan, plan
+
+
+def test_archival_walks_created_at_index():
+    assert_uses_index(archive_candidates_query(datetime(2024, 1, 1), 500), "ix_orders_created_at")
+
+
+def test_exports_walk_time_indexes():
+    start, after = datetime(2024, 1, 1), (datetime(2024, 1, 2), 1)
+    archived = archive_table("2024_01")
+    archived.create(bind=engine, checkfirst=True)
+    for table, index in ((models.Order.__table__, "ix_orders_created_at"), (archived, "ix_orders_archive_2024_01_created_at")):
+        query = select(table.c.id, table.c.created_at).where(table.c.created_at >= start)
+        # Order ids are strings, so ties on created_at are sorted per run of equal times, never the whole range
+        plan = query_plan(page_query(query, table.c.created_at, table.c.id, after, 1000))
+        assert f"INDEX {index}" in plan and "TEMP B-TREE FOR ORDER BY" not in plan, plan
+    query, time_column, id_column = inventory_log_export_query(start, None)
+    assert_uses_index(page_query(query, time_column, id_column, after, 1000), "ix_inventory_logs_timestamp")
+
+
+if __name__ == "__main__":
+    failed = False
+    for name, check in list(globals().items()):
+        if name.startswith("test_"):
+            try:
+                check()
+                print(f"SUCCESS: {name}")
+            except AssertionError as e:
+                print(f"FAILED: {name}: {e}")
+                failed = True
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,143 @@
+"""Chunked, resumable order sync: per-order results, savepoint fallback, resume cursor.
+
+    python test_sync_chunked.py
+"""
+import sys
+from contextlib import contextmanager
+
+from testkit import fresh_app, order
+from sqlalchemy import select, func
+from app import models
+from app.api import sync
+from app.database import SessionLocal
+
+
+@contextmanager
+def patched(name, replacement):
+    real = getattr(sync, name)
+    setattr(sync, name, replacement(real))
+    try:
+        yield
+    finally:
+        setattr(sync, name, real)
+
+
+def stock(client, product_id=1):
+    return {p["id"]: p["stock_quantity"] for p in client.get("/sync/products").json()}[product_id]
+
+
+def catalog_version(client):
+    return int(client.get("/sync/products").headers["X-Catalog-Version"])
+
+
+def stored(*order_ids):
+    with SessionLocal() as db:
+        return set(db.scalars(select(models.Order.id).where(models.Order.id.in_(order_ids))))
+
+
+def sync_chunked(client, orders, chunk_size):
+    response = client.post("/sync/orders/chunked", params={"chunk_size": chunk_size}, json=orders)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def test_results_per_order_across_chunks():
+    with fresh_app() as client:
+        client.post("/sync/orders", json=[order("seen-before")])
+        before = stock(client)
+        payload = [order("a"), order("seen-before"), order("b"), {"id": "broken", "items": []}, order("a")]
+        body = sync_chunked(client, payload, chunk_size=2)
+
+        assert [(r["id"], r["status"]) for r in body["results"]] == [
+            ("a", "accepted"), ("seen-before", "duplicate"), ("b", "accepted"),
+            ("broken", "rejected"), ("a", "duplicate"),
+        ], body["results"]
+        assert body["results"][3]["error"]
+        assert (body["accepted"], body["duplicates"], body["rejected"]) == (2, 2, 1)
+        assert (body["cursor"], body["complete"]) == (5, True)
+        assert stock(client) == before - 2
+
+
+def test_failed_bulk_chunk_falls_back_to_savepoints():
+    def poisoned(ingest_orders):
+        # Writes the batch, then fails: the savepoint must undo the poisoned order's rows
+        def ingest(db, orders, catalog_version=None):
+            accepted = ingest_orders(db, orders, catalog_version)
+            if any(o.id.startswith("poison") for o in orders):
+                raise ValueError("poisoned order")
+            return accepted
+        return ingest
+
+    with fresh_app() as client:
+        client.post("/sync/orders", json=[order("dup")])
+        before, version = stock(client), catalog_version(client)
+        with SessionLocal() as db:
+            logs = db.scalar(select(func.count()).select_from(models.InventoryLog))
+        with patched("ingest_orders", poisoned):
+            body = sync_chunked(client, [order("ok-1"), order("poison-1", quantity=5), order("dup"), order("ok-2")], 10)
+
+        assert [(r["id"], r["status"]) for r in body["results"]] == [
+            ("ok-1", "accepted"), ("poison-1", "rejected"), ("dup", "duplicate"), ("ok-2", "accepted"),
+        ], body["results"]
+        assert body["results"][1]["error"] == "poisoned order"
+        assert body["complete"] is True
+        assert stored("ok-1", "ok-2", "poison-1") == {"ok-1", "ok-2"}
+        # Only the two accepted orders moved stock or wrote inventory logs
+        assert stock(client) == before - 2
+        with SessionLocal() as db:
+            assert db.scalar(select(func.count()).select_from(models.InventoryLog)) == logs + 2
+        # The orders retried one by one share one catalog version
+        assert catalog_version(client) == version + 1
+
+
+def test_unsaved_chunk_stops_with_resume_cursor():
+    def crashing(ingest_chunk):
+        def run(db, chunk):
+            if any(o.id.startswith("crash") for o in chunk):
+                raise RuntimeError("database went away")
+            return ingest_chunk(db, chunk)
+        return run
+
+    with fresh_app() as client:
+        payload = [order("c-1"), order("c-2"), order("crash-3"), order("c-4"), order("c-5")]
+        with patched("_ingest_chunk", crashing):
+            body = sync_chunked(client, payload, chunk_size=2)
+        # The first chunk is acknowledged; nothing from the failed chunk on is
+        assert [r["id"] for r in body["results"]] == ["c-1", "c-2"]
+        assert (body["cursor"], body["complete"]) == (2, False)
+        assert stored(*(o["id"] for o in payload)) == {"c-1", "c-2"}
+
+        # The terminal resends from the cursor once the database is back
+        resumed = sync_chunked(client, payload[body["cursor"]:], chunk_size=2)
+        assert (resumed["accepted"], resumed["cursor"], resumed["complete"]) == (3, 3, True)
+        assert len(stored(*(o["id"] for o in payload))) == 5
+
+
+def test_sync_without_stock_change_keeps_catalog_version():
+    with fresh_app() as client:
+        version = catalog_version(client)
+        client.post("/sync/orders", json=[order("no-stock", quantity=0)])
+        client.post("/sync/orders", json=[order("no-stock")])
+        assert stored("no-stock") == {"no-stock"}
+        assert catalog_version(client) == version
+        client.post("/sync/orders", json=[order("sold")])
+        assert catalog_version(client) == version + 1
+
+
+def test_chunk_size_is_clamped():
+    with fresh_app() as client:
+        body = sync_chunked(client, [order(f"z-{n}") for n in range(3)], chunk_size=0)
+        assert (body["accepted"], body["cursor"], body["complete"]) == (3, 3, True)
+
+
+if __name__ == "__main__":
+    failed = False
+    for name, check in list(globals().items()):
+        if name.startswith("test_"):
+            try:
+                check()
+                print(f"SUCCESS: {name}")
+            except AssertionError as e:
+                failed = True
+                print(f"FAILED: {name}: {e}")
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,97 @@
+"""The server tax engine must agree with frontend/src/modules/TaxEngine.ts.
+
+    python test_tax.py
+"""
+import sys
+import os
+import random
+from decimal import Decimal
+
+# Add backend to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.tax import TAX_RATES, TAX_TOLERANCE, calculate_ghana_tax, split_tax, verify_order_taxes
+
+
+def calculate_ghana_tax_float(base_amount):
+    """TaxEngine.ts line for line (JavaScript numbers are IEEE doubles, like Python floats)"""
+    nhil = base_amount * TAX_RATES["NHIL"]
+    getfund = base_amount * TAX_RATES["GETFund"]
+    covid = base_amount * TAX_RATES["COVID"]
+    levies = nhil + getfund + covid
+    vat = (base_amount + levies) * TAX_RATES["VAT"]
+    return levies + vat, base_amount + levies + vat
+
+
+def test_known_breakdown():
+    breakdown = calculate_ghana_tax(100)
+    assert breakdown.nhil == Decimal("2.50")
+    assert breakdown.covid == Decimal("1.00")
+    assert breakdown.vatable_amount == Decimal("106.00")
+    assert breakdown.vat == Decimal("15.90")
+    assert breakdown.total_tax == Decimal("21.90")
+    assert breakdown.grand_total == Decimal("121.90")
+    # 0.5 pesewa rounds up, not to even
+    assert calculate_ghana_tax("0.50").total_tax == Decimal("0.11")
+
+
+def test_split_tax_adds_up_to_collected_tax():
+    # The tax on a 100 base splits exactly as calculate_ghana_tax does
+    assert split_tax(21.9) == {"nhil": 2.5, "getfund": 2.5, "covid": 1.0, "vat": 15.9}
+    rng = random.Random(7)
+    for _ in range(2000):
+        tax = Decimal(rng.randrange(0, 10000000)) / 100
+        assert sum(Decimal(str(value)) for value in split_tax(tax).values()) == tax, tax
+
+
+def test_matches_frontend_within_a_pesewa():
+    # Rounding moves the figure by at most half a pesewa, plus float error on the terminal
+    limit = TAX_TOLERANCE / 2 + Decimal("1e-9")
+    rng = random.Random(21)
+    for _ in range(20000):
+        base = rng.randrange(0, 500000) / 100
+        total_tax, grand_total = calculate_ghana_tax_float(base)
+        breakdown = calculate_ghana_tax(base)
+        assert abs(Decimal(str(total_tax)) - breakdown.total_tax) <= limit, base
+        assert abs(Decimal(str(grand_total)) - breakdown.grand_total) <= limit, base
+
+
+def test_batch_flags_only_wrong_orders():
+    rng = random.Random(3)
+    orders, wrong = [], set()
+    for n in range(2000):
+        items = [{"productId": rng.randint(1, 4), "price": rng.choice([12.5, 45.0, 7.99, 30.1]),
+                  "quantity": rng.randint(1, 5)} for _ in range(rng.randint(1, 6))]
+        total_tax, grand_total = calculate_ghana_tax_float(sum(i["price"] * i["quantity"] for i in items))
+        if n % 50 == 0:
+            total_tax -= 0.05
+            wrong.add(f"order-{n}")
+        orders.append((f"order-{n}", items, grand_total, total_tax))
+    orders.append(("missing-tax", orders[1][1], orders[1][2], None))
+    wrong.add("missing-tax")
+    # Prices finer than a pesewa take the Decimal path
+    fractional = [{"price": 0.125, "quantity": 3}]
+    total_tax, grand_total = calculate_ghana_tax_float(0.375)
+    orders.append(("fractional-ok", fractional, grand_total, total_tax))
+    orders.append(("fractional-wrong", fractional, grand_total, total_tax + 0.02))
+    wrong.add("fractional-wrong")
+    mismatches = verify_order_taxes(orders)
+    flagged = {m.order_id for m in mismatches}
+    assert flagged == wrong, sorted(flagged ^ wrong)[:5]
+    for m in mismatches:
+        items = next(o[1] for o in orders if o[0] == m.order_id)
+        breakdown = calculate_ghana_tax(sum(Decimal(str(i["price"])) * i["quantity"] for i in items))
+        assert (m.expected_tax, m.expected_total) == (breakdown.total_tax, breakdown.grand_total), m
+
+
+if __name__ == "__main__":
+    failed = False
+    for name, check in list(globals().items()):
+        if name.startswith("test_"):
+            try:
+                check()
+                print(f"SUCCESS: {name}")
+            except AssertionError as e:
+                failed = True
+                print(f"FAILED: {name}: {e}")
+    sys.exit(1 if failed else 0)
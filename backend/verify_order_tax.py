@@ -0,0 +1,17 @@
+import sys
+import os
+from datetime import datetime
+
+# Add backend to path
+sys.path.append(os.getcwd())
+
+from app.database import engine
+from app.tax_audit import verify_stored_orders
+
+if __name__ == "__main__":
+    # Optional ISO dates: python verify_order_tax.py [start] [end]
+    start = datetime.fromisoformat(sys.argv[1]) if len(sys.argv) > 1 else None
+    end = datetime.fromisoformat(sys.argv[2]) if len(sys.argv) > 2 else None
+    print("--- Verifying order tax against the server tax engine ---")
+    checked, flagged = verify_stored_orders(engine, start, end)
+    print(f"SUCCESS: {checked} orders checked, {flagged} flagged (see /reports/tax-discrepancies).")
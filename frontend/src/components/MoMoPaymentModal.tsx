@@ -9,6 +9,7 @@ interface MoMoPaymentModalProps {
 }
 
 const API_URL = import.meta.env.VITE_API_URL || 'http://localhost:8000';
+const STATUS_WAIT_SECONDS = 25;
 
 const MoMoPaymentModal: React.FC<MoMoPaymentModalProps> = ({ isOpen, onClose, amount, onSuccess }) => {
     const [mode, setMode] = useState<'phone' | 'qr'>('phone');
@@ -30,14 +31,17 @@ const MoMoPaymentModal: React.FC<MoMoPaymentModalProps> = ({ isOpen, onClose, am
         }
     }, [isOpen]);
 
-    // Poll for status when pending
+    // Wait for the payment result with long-polling: the server answers as
+    // soon as the status changes, or after STATUS_WAIT_SECONDS with PENDING
     useEffect(() => {
-        let interval: NodeJS.Timeout;
+        if (status !== 'pending' || !transactionId) return;
+        let cancelled = false;
 
-        if (status === 'pending' && transactionId) {
-            interval = setInterval(async () => {
+        const waitForResult = async () => {
+            while (!cancelled) {
                 try {
-                    const res = await fetch(`${API_URL}/momo/status/${transactionId}`);
+                    const res = await fetch(`${API_URL}/momo/status/${transactionId}?wait=${STATUS_WAIT_SECONDS}`);
+                    if (cancelled) return;
                     if (res.ok) {
                         const data = await res.json();
                         if (data.status === 'SUCCESS') {
@@ -47,18 +51,28 @@ const MoMoPaymentModal: React.FC<MoMoPaymentModalProps> = ({ isOpen, onClose, am
                                 onSuccess();
                                 onClose();
                             }, 2000);
+                            return;
                         } else if (data.status === 'FAILED') {
                             setStatus('failed');
                             setMessage('Payment Declined or Failed.');
+                            return;
+                        } else if (data.status === 'EXPIRED') {
+                            setStatus('failed');
+                            setMessage('Payment request timed out.');
+                            return;
                         }
+                    } else {
+                        await new Promise(resolve => setTimeout(resolve, 1000));
                     }
                 } catch (e) {
                     console.error("Polling error", e);
+                    await new Promise(resolve => setTimeout(resolve, 1000));
                 }
-            }, 1000);
-        }
+            }
+        };
+        waitForResult();
 
-        return () => clearInterval(interval);
+        return () => { cancelled = true; };
     }, [status, transactionId, onSuccess, onClose]);
 
     const handlePay = async (simulatedPhone?: string) => {
@@ -30,6 +30,7 @@ export interface Order {
     amountTendered?: number;
     changeDue?: number;
     referenceNumber?: string;
+    shiftId?: number; // Shift open when the sale was made (for close-out)
     createdAt: Date;
     synced: boolean;
 }
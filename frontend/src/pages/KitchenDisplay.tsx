@@ -20,6 +20,7 @@ const KitchenDisplay: React.FC = () => {
     const { token, user } = useAuth(); // Get user for role check
     const [orders, setOrders] = useState<KitchenOrder[]>([]);
     const [error, setError] = useState('');
+    const [live, setLive] = useState(false);
 
     // Cashiers are in "Observation Mode" only
     const isReadOnly = user?.role === 'cashier';
@@ -42,11 +43,50 @@ const KitchenDisplay: React.FC = () => {
         }
     };
 
+    const byCreatedAt = (a: KitchenOrder, b: KitchenOrder) => a.created_at.localeCompare(b.created_at);
+
     useEffect(() => {
-        fetchOrders();
-        // Poll every 10 seconds
-        const interval = setInterval(fetchOrders, 10000);
-        return () => clearInterval(interval);
+        if (!token) return;
+
+        // Live feed: one snapshot, then incremental events. EventSource
+        // reconnects on its own; poll only while the stream is down.
+        let fallback: ReturnType<typeof setInterval> | null = null;
+        const stopFallback = () => {
+            if (fallback) clearInterval(fallback);
+            fallback = null;
+        };
+        const source = new EventSource(`${API_URL}/kitchen/stream?token=${encodeURIComponent(token)}`);
+
+        source.addEventListener('snapshot', (e) => {
+            stopFallback();
+            setLive(true);
+            setOrders(JSON.parse((e as MessageEvent).data));
+            setError('');
+        });
+        source.addEventListener('order_created', (e) => {
+            const order: KitchenOrder = JSON.parse((e as MessageEvent).data);
+            setOrders(prev => [...prev.filter(o => o.id !== order.id), order].sort(byCreatedAt));
+        });
+        source.addEventListener('status_changed', (e) => {
+            const { id, kitchen_status } = JSON.parse((e as MessageEvent).data);
+            setOrders(prev => prev.map(o => o.id === id ? { ...o, kitchen_status } : o));
+        });
+        source.addEventListener('order_removed', (e) => {
+            const { id } = JSON.parse((e as MessageEvent).data);
+            setOrders(prev => prev.filter(o => o.id !== id));
+        });
+        source.onerror = () => {
+            setLive(false);
+            if (!fallback) {
+                fetchOrders();
+                fallback = setInterval(fetchOrders, 10000);
+            }
+        };
+
+        return () => {
+            source.close();
+            stopFallback();
+        };
     }, [token]);
 
     const updateStatus = async (orderId: string, newStatus: string) => {
@@ -60,7 +100,10 @@ const KitchenDisplay: React.FC = () => {
                 body: JSON.stringify({ status: newStatus })
             });
             if (res.ok) {
-                fetchOrders(); // Refresh immediately
+                // The stream confirms the change; apply it locally right away
+                setOrders(prev => newStatus === 'served'
+                    ? prev.filter(o => o.id !== orderId)
+                    : prev.map(o => o.id === orderId ? { ...o, kitchen_status: newStatus as KitchenOrder['kitchen_status'] } : o));
             }
         } catch (e) {
             console.error(e);
@@ -96,7 +139,7 @@ const KitchenDisplay: React.FC = () => {
                 </h1>
                 <div className="flex items-center space-x-4">
                     <span className="text-sm text-gray-500 animate-pulse">
-                        Auto-refreshing (10s)
+                        {live ? 'Live' : 'Auto-refreshing (10s)'}
                     </span>
                     <button
                         onClick={fetchOrders}
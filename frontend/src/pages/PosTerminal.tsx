@@ -96,7 +96,8 @@ const PosTerminal: React.FC = () => {
                 synced: false,
                 amountTendered: details?.amountTendered,
                 changeDue: details?.changeDue,
-                referenceNumber: details?.referenceNumber
+                referenceNumber: details?.referenceNumber,
+                shiftId: activeShift?.id
             });
 
             // Trigger immediate sync for Kitchen Display
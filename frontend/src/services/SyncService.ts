@@ -1,6 +1,8 @@
 import { db } from '../db/db';
 
 const API_URL = import.meta.env.VITE_API_URL || 'http://localhost:8000';
+const SYNC_BATCH_SIZE = 200;
+const CATALOG_VERSION_KEY = 'catalogVersion';
 
 export const SyncService = {
     async syncOrders() {
@@ -31,25 +33,46 @@ export const SyncService = {
                 created_at: o.createdAt,
                 amount_tendered: o.amountTendered,
                 change_due: o.changeDue,
-                reference_number: o.referenceNumber
+                reference_number: o.referenceNumber,
+                shift_id: o.shiftId
             }));
 
-            const response = await fetch(`${API_URL}/sync/orders`, {
-                method: 'POST',
-                headers: { 'Content-Type': 'application/json' },
-                body: JSON.stringify(payload)
-            });
+            // Upload in batches; the server commits in chunks and acknowledges
+            // each order, so a dropped connection only costs the current batch.
+            for (let start = 0; start < payload.length; start += SYNC_BATCH_SIZE) {
+                const batch = payload.slice(start, start + SYNC_BATCH_SIZE);
+                const localIds = unsyncedOrders.slice(start, start + SYNC_BATCH_SIZE).map(o => o.id!);
 
-            if (response.ok) {
-                // Mark as synced
-                const ids = unsyncedOrders.map(o => o.id!);
-                if (ids.length > 0) {
-                    await db.orders.where('id').anyOf(ids).modify({ synced: true });
+                const response = await fetch(`${API_URL}/sync/orders/chunked`, {
+                    method: 'POST',
+                    headers: { 'Content-Type': 'application/json' },
+                    body: JSON.stringify(batch)
+                });
+
+                if (!response.ok) {
+                    console.error('Sync failed', await response.text());
+                    return;
+                }
+
+                const result = await response.json();
+                // Mark acknowledged orders (accepted or already on server) as synced
+                const acked = localIds.filter((_, i) =>
+                    i < result.cursor && result.results[i]?.status !== 'rejected'
+                );
+                if (acked.length > 0) {
+                    await db.orders.where('id').anyOf(acked).modify({ synced: true });
+                }
+                result.results
+                    .filter((r: any) => r.status === 'rejected')
+                    .forEach((r: any) => console.error(`Order ${r.id} rejected by server: ${r.error}`));
+
+                // Server stopped early; resume from the cursor on the next cycle
+                if (!result.complete) {
+                    console.warn(`Sync stopped at ${start + result.cursor}/${payload.length}, will resume`);
+                    return;
                 }
-                console.log('Sync successful');
-            } else {
-                console.error('Sync failed', await response.text());
             }
+            console.log('Sync successful');
         } catch (error) {
             console.error('Sync error (network likely down)', error);
         }
@@ -57,9 +80,22 @@ export const SyncService = {
 
     async syncProducts() {
         try {
-            const response = await fetch(`${API_URL}/sync/products`);
+            // Ask only for what changed since the catalog version we last applied
+            const knownVersion = localStorage.getItem(CATALOG_VERSION_KEY);
+            const url = knownVersion !== null
+                ? `${API_URL}/sync/products?since=${knownVersion}`
+                : `${API_URL}/sync/products`;
+            const headers: Record<string, string> = {};
+            if (knownVersion !== null) {
+                headers['If-None-Match'] = `"catalog-${knownVersion}"`;
+            }
+
+            const response = await fetch(url, { headers });
+            if (response.status === 304) return;
             if (response.ok) {
-                const products = await response.json();
+                const body = await response.json();
+                const isDelta = knownVersion !== null && !body.full;
+                const products = Array.isArray(body) ? body : body.products;
                 // products from backend: {id, name, price, category, tax_group}
                 // local DB: {id, name, price, category, taxGroup}
 
@@ -74,10 +110,21 @@ export const SyncService = {
                     unit: p.unit
                 }));
 
-                // Clear existing products and replace with backend data (source of truth)
-                await db.products.clear();
-                await db.products.bulkAdd(mappedProducts);
-                console.log(`Synced ${mappedProducts.length} products (replaced local data)`);
+                if (isDelta) {
+                    await db.products.bulkPut(mappedProducts);
+                    await db.products.bulkDelete(body.deleted);
+                    console.log(`Synced ${mappedProducts.length} changed / ${body.deleted.length} deleted products`);
+                } else {
+                    // Clear existing products and replace with backend data (source of truth)
+                    await db.products.clear();
+                    await db.products.bulkAdd(mappedProducts);
+                    console.log(`Synced ${mappedProducts.length} products (replaced local data)`);
+                }
+
+                const version = response.headers.get('X-Catalog-Version');
+                if (version !== null) {
+                    localStorage.setItem(CATALOG_VERSION_KEY, version);
+                }
             }
         } catch (error) {
             console.error('Product sync failed', error);